@@ -1,6 +1,7 @@
 import pandas as pd
 import re
 from pathlib import Path
+from aliases import canonicalize
 
 base_path = Path(__file__).resolve().parent.parent
 
@@ -15,8 +16,18 @@ def load_data():
 
 # Function to process incident data, accepting the path as an argument
 def load_count_data():
-    """Load the Data from CSV file."""
-    actor_per_country_df = pd.read_csv(base_path / 'data/cyber_events.csv')  # Dynamic Path
+    """Load the Data from the cyber events spreadsheet and save the per-country counts."""
+    actor_per_country_df = pd.read_excel(base_path / 'data/cyber_events.xlsx', dtype={'actor': str})  # Dynamic Path
+    actors_per_country = count_actors_per_country(actor_per_country_df)
+
+    # Save Results in the CSV file in the 'data' directory
+    actors_per_country.to_csv(base_path / 'data/actors_per_country.csv', index=False)
+    return actors_per_country
+
+def count_actors_per_country(actor_per_country_df):
+    """Count the distinct actors seen in each country, with the list of their names."""
+    # Use the canonical MITRE group name for actors known under an alias
+    actor_per_country_df = actor_per_country_df.assign(actor=canonicalize(actor_per_country_df['actor']))
 
     # Group data by 'actor' and 'country' columns
     actor_country_counts = actor_per_country_df.groupby(['country', 'actor']).size().reset_index(name='actor_count')
@@ -29,7 +40,9 @@ def load_count_data():
 
     # Merge the actor list with the actor count per country
     actors_per_country = pd.merge(actors_per_country, actor_list_per_country, on='country')
-
-    # Save Results in the CSV file in the 'data' directory
     actors_per_country['actor_list'] = actors_per_country['actor_list'].apply(lambda x: ', '.join(map(str, x)))  # Ensure clean string format
-    actors_per_country.to_csv(base_path / 'data/actors_per_country.csv', index=False)
+    return actors_per_country
+
+def fill_coordinates(actors_per_country, coordinates):
+    """Add the latitude/longitude of each country from the country coordinates reference table."""
+    return actors_per_country.merge(coordinates[['country', 'latitude', 'longitude']], on='country', how='left')
@@ -0,0 +1,149 @@
+# aggregates.py
+import pandas as pd
+import memory
+
+# Severity categories of a technique's average VERIS severity
+SEVERITY_BINS = [0, 4.0, 6.0, 7.5, 10.0]
+SEVERITY_LABELS = ['Low', 'Moderate', 'High', 'Critical']
+SEVERITY_ORDER = pd.CategoricalDtype(SEVERITY_LABELS, ordered=True)
+
+# Per-actor chart aggregates, each indexed by actor
+average_severity = None
+severity_counts = None
+capability_counts = None
+nist_violations = None
+ttp_complexity = None
+
+# Complexity columns and hover text of every technique, indexed by technique ID (joined per actor on lookup)
+ttp_hover = None
+
+
+def get_actor_ttps(groups):
+    """
+    Returns the exploded actor x TTP table (one row per distinct pair).
+    """
+    return pd.DataFrame(
+        [(actor, ttp) for actor, ttps in groups.items() for ttp in ttps],
+        columns=['actor', 'ttp']
+    ).drop_duplicates(ignore_index=True)
+
+
+def build_ttp_hover_table(complexity_df):
+    """
+    Builds the hover text of every technique once, instead of on every profile load.
+    """
+    df = complexity_df[['ID', 'complexity score', 'name', 'tactics', 'sub-technique of']]
+    # string concatenation needs plain object columns (compact mode stores some as categoricals)
+    df = df.astype({column: object for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)})
+    df['position'] = range(len(df))
+
+    # Fill N/A for hover data in 'sub-technique of' column
+    df['sub-technique of'] = df['sub-technique of'].fillna('N/A')
+
+    # Extract the TTP ID without the decimal points (e.g., T1548 from T1548.005)
+    df['ID_base'] = df['ID'].str.split('.').str[0]
+
+    # Create the hover text with the URL for each TTP ID (using the base ID)
+    df['hover_text'] = (
+        'ID: ' + df['ID'].astype(str) + '<br>' +
+        'Complexity Score: ' + df['complexity score'].astype(str) + '<br>' +
+        'Name: ' + df['name'] + '<br>' +
+        'Tactics: ' + df['tactics'] + '<br>' +
+        'Sub-Technique Of: ' + df['sub-technique of'] + '<br>' +
+        '<b>Link:</b> <a href="https://attack.mitre.org/techniques/' + df['ID_base'] +
+        '" target="_blank">https://attack.mitre.org/techniques/' + df['ID_base'] + '</a>'
+    )
+    return df
+
+
+def build_aggregates(groups, veris_cache, nist_df, complexity_df):
+    """
+    Returns the per-actor aggregate tables (by module global name) for the given data.
+    """
+    veris_df_action, veris_df_attribute = veris_cache
+    actor_ttps = get_actor_ttps(groups)
+
+    # Average severity of each technique does not depend on the actor: compute and bin it once
+    technique_severity = veris_df_action.groupby('attack_object_id', observed=True)['severity'].mean().reset_index()
+    technique_severity.columns = ['ttp', 'severity']
+    technique_severity['severity_level'] = pd.cut(technique_severity['severity'], bins=SEVERITY_BINS, labels=SEVERITY_LABELS, right=True)
+
+    average_severity = actor_ttps.merge(technique_severity, on='ttp').sort_values(['actor', 'ttp']).set_index('actor')
+
+    severity_counts = (
+        average_severity.groupby(['actor', 'severity_level'], observed=False).size()
+        .reset_index(name='count')
+        .set_index('actor')
+    )
+
+    capability_counts = (
+        actor_ttps.merge(veris_df_attribute, left_on='ttp', right_on='attack_object_id')
+        .groupby(['actor', 'capability_group'], observed=True)['capability_id'].count()
+        .reset_index()
+        .set_index('actor')
+    )
+
+    # filter duplicates per actor (a control violated by two techniques is one record),
+    # keeping the first mapping row
+    nist_df = nist_df.reset_index(drop=True).rename_axis('position').reset_index()
+    nist_violations = (
+        actor_ttps.merge(nist_df, left_on='ttp', right_on='attack_object_id')
+        .sort_values(['actor', 'position'])
+        .drop_duplicates(subset=['actor', 'capability_id'])
+        .groupby(['actor', 'capability_group'], observed=True)['capability_id'].count()
+        .reset_index()
+        .set_index('actor')
+    )
+
+    # only the actor -> technique rows are kept per actor, the hover text once per technique
+    ttp_hover = build_ttp_hover_table(complexity_df)
+    ttp_complexity = memory.compact_frame(
+        actor_ttps.merge(ttp_hover[['ID', 'position']], left_on='ttp', right_on='ID')
+        .sort_values(['actor', 'position'])
+        [['actor', 'ID']],
+        'ttp_complexity'
+    ).set_index('actor')
+    ttp_hover = ttp_hover.drop(columns='position').set_index('ID')
+
+    return {
+        'average_severity': average_severity, 'severity_counts': severity_counts,
+        'capability_counts': capability_counts, 'nist_violations': nist_violations,
+        'ttp_complexity': ttp_complexity, 'ttp_hover': ttp_hover,
+    }
+
+
+def lookup(table, actor):
+    """
+    Returns the rows of a per-actor table for one actor, or an empty frame with the same columns.
+    """
+    if actor in table.index:
+        return table.loc[[actor]].reset_index(drop=True)
+    return table.iloc[0:0].reset_index(drop=True)
+
+
+def get_veris_data(actor):
+    """
+    Returns (the actor's techniques with their average severity, the techniques per severity level,
+    the VERIS attribute capabilities per group) of one actor.
+    """
+    counts = lookup(severity_counts, actor)
+    if counts.empty:
+        counts = pd.DataFrame({'severity_level': pd.Categorical(SEVERITY_LABELS, dtype=SEVERITY_ORDER), 'count': 0})
+    else:
+        counts['severity_level'] = counts['severity_level'].astype(SEVERITY_ORDER)
+    return lookup(average_severity, actor), counts, lookup(capability_counts, actor)
+
+
+def get_nist_violations(actor):
+    """
+    Returns the number of distinct NIST controls the actor's techniques violate, per control group.
+    """
+    return lookup(nist_violations, actor)
+
+
+def get_ttp_complexity(actor):
+    """
+    Returns the complexity rows (with prebuilt hover text) of the actor's TTPs.
+    """
+    ttps = lookup(ttp_complexity, actor)
+    return ttps.join(ttp_hover, on='ID')
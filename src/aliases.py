@@ -0,0 +1,117 @@
+# aliases.py
+import difflib
+from collections import namedtuple
+from pathlib import Path
+from urllib.parse import quote, unquote
+import pandas as pd
+
+base_path = Path(__file__).resolve().parent.parent
+
+# Normalized alias -> canonical group name, ATT&CK ID -> group name, key prefix -> keys for
+# fuzzy matching, and the fuzzy matches already looked up
+AliasIndex = namedtuple('AliasIndex', ['keys', 'ids', 'blocks', 'fuzzy'])
+
+# Initialize a variable to cache the alias index
+index = None
+
+# Fuzzy candidates must share this many leading characters of the normalized key
+BLOCK_SIZE = 2
+FUZZY_CUTOFF = 0.85
+# Upper bound on memoized fuzzy lookups, since they come from user input
+FUZZY_MEMO_SIZE = 4096
+
+
+def normalize(name):
+    """
+    Lookup key for a group name, alias or URL slug: case-folded letters and digits only,
+    so 'APT-C-36', 'apt c 36' and the slug 'apt-c-36' all give 'aptc36'.
+    """
+    return ''.join(char for char in unquote(str(name)).casefold() if char.isalnum())
+
+
+def slugify(group):
+    """URL path segment for a group name; resolve() maps it back to the group."""
+    return quote(group.lower().replace(' ', '-'), safe='@')
+
+
+def load_data():
+    """Builds the alias index once and caches it for reuse."""
+    global index
+    if index is None:
+        index = build_index(load_group_mapping())
+
+
+def load_group_mapping():
+    """Loads the MITRE group names, IDs and associated groups."""
+    return pd.read_csv(base_path / 'data/threat_actor_groups_aliases.csv')
+
+
+def build_index(group_mapping):
+    """
+    Indexes every group by its name, its ATT&CK ID and each of its associated groups.
+    A name always wins over an alias; an alias shared by several groups is left out.
+    """
+    keys = {}
+    ids = dict(zip(group_mapping['id'], group_mapping['name']))
+    for group_id, name in ids.items():
+        keys[normalize(name)] = name
+        keys.setdefault(normalize(group_id), name)
+
+    alias_groups = {}
+    for name, associated in zip(group_mapping['name'], group_mapping['associated groups']):
+        if isinstance(associated, str):
+            for alias in associated.split(','):
+                if alias.strip():
+                    alias_groups.setdefault(normalize(alias), set()).add(name)
+    for key, names in alias_groups.items():
+        if len(names) == 1 and key not in keys:
+            keys[key] = names.pop()
+
+    # Block the keys on their prefix so a fuzzy lookup only compares against a handful of them
+    blocks = {}
+    for key in keys:
+        blocks.setdefault(key[:BLOCK_SIZE], []).append(key)
+    return AliasIndex(keys, ids, blocks, {})
+
+
+def resolve(name, fuzzy=False, alias_index=None):
+    """
+    Returns the canonical group name for a group name, alias, ATT&CK ID or URL slug, or None.
+    Exact (normalized) matches are a dict lookup. With fuzzy set, a name without one gets the
+    closest key sharing the same prefix instead (memoized): a guess, only fit for suggestions.
+    """
+    if alias_index is None:
+        load_data()
+        alias_index = index
+    if name is None:
+        return None
+
+    key = normalize(name)
+    group = alias_index.keys.get(key)
+    if group is not None or not fuzzy or len(key) <= BLOCK_SIZE:
+        return group
+
+    if key in alias_index.fuzzy:
+        return alias_index.fuzzy[key]
+    candidates = difflib.get_close_matches(key, alias_index.blocks.get(key[:BLOCK_SIZE], []), n=1, cutoff=FUZZY_CUTOFF)
+    group = alias_index.keys[candidates[0]] if candidates else None
+    if len(alias_index.fuzzy) < FUZZY_MEMO_SIZE:
+        alias_index.fuzzy[key] = group
+    return group
+
+
+def get_group_name(group_id, alias_index=None):
+    """Returns the group name of an ATT&CK group ID (e.g. G0018), or None."""
+    if alias_index is None:
+        load_data()
+        alias_index = index
+    return alias_index.ids.get(group_id)
+
+
+def canonicalize(names, alias_index=None):
+    """
+    Maps a Series of actor names to canonical group names where an exact alias match exists,
+    leaving the other names untouched. Each distinct name is resolved once.
+    """
+    resolved = {name: resolve(name, fuzzy=False, alias_index=alias_index) for name in names.dropna().unique()}
+    return names.map(lambda name: resolved.get(name) or name)
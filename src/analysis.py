@@ -1,9 +1,63 @@
 # analysis.py
 
+import os
+import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.io.json import to_json_plotly
 from dash import dcc, html
-from group_data import get_group_incidents, get_ttp_complexity_data
+
+# Lean figure mode, enabled with TAS_LEAN_FIGURES=1: figures carry a slim template, scatters
+# render with WebGL, the TTP hover text is one shared template over per-point columns and
+# scatters above SCATTER_POINT_LIMIT points are aggregated server side.
+lean = os.environ.get('TAS_LEAN_FIGURES', '0') == '1'
+SCATTER_POINT_LIMIT = 300
+
+# Template layout settings kept in lean mode (dropped: polar, ternary, 3D scene and colorscale defaults)
+LEAN_TEMPLATE_LAYOUT = ['autotypenumbers', 'colorway', 'font', 'hovermode', 'hoverlabel', 'paper_bgcolor',
+                        'plot_bgcolor', 'coloraxis', 'xaxis', 'yaxis', 'geo', 'shapedefaults', 'annotationdefaults', 'title']
+
+# Hover text of a technique, filled from the bar's x, y and customdata (name, tactics, parent, base ID)
+TTP_HOVER_TEMPLATE = (
+    'ID: %{x}<br>'
+    'Complexity Score: %{y}<br>'
+    'Name: %{customdata[0]}<br>'
+    'Tactics: %{customdata[1]}<br>'
+    'Sub-Technique Of: %{customdata[2]}<br>'
+    '<b>Link:</b> <a href="https://attack.mitre.org/techniques/%{customdata[3]}" target="_blank">'
+    'https://attack.mitre.org/techniques/%{customdata[3]}</a><extra></extra>'
+)
+
+# Score components as weighted in the total (scorer.get_score_for_threat_actor), for the score history chart
+SCORE_COMPONENT_WEIGHTS = {
+    'complexity': ('Complexity Score', 20),
+    'frequency': ('Frequency Score', 20),
+    'impact': ('Impact Score', 30),
+    'mitigation': ('Mitigation Score', 10),
+    'sector': ('Sector Score', 10),
+    'actor_type': ('Actor Type Score', 10),
+}
+
+
+def finish_figure(figure):
+    """
+    In lean mode, replaces the default template with its layout essentials and the
+    defaults of the trace types the figure actually uses.
+    """
+    if lean:
+        template = pio.templates[pio.templates.default].to_plotly_json()
+        trace_types = {trace.type for trace in figure.data}
+        figure.layout.template = go.layout.Template(
+            layout={key: template['layout'][key] for key in LEAN_TEMPLATE_LAYOUT if key in template['layout']},
+            data={trace_type: template['data'][trace_type] for trace_type in trace_types if trace_type in template['data']},
+        )
+    return figure
+
+
+def figure_bytes(figure):
+    """Size of a figure's JSON payload, as Dash sends it."""
+    return len(to_json_plotly(figure).encode('utf-8'))
 
 # Function to create the layout for the analysis page
 def display_analysis_layout(selected_group):
@@ -28,7 +82,7 @@ def display_analysis_layout(selected_group):
 # Function to create severity pie chart
 def create_severity_pie_chart(severity_counts):
     severity_colors = ['#00FF00', '#FFFF00', '#FFA500', '#FF0000']  # Green, Yellow, Orange, Red
-    return px.pie(
+    return finish_figure(px.pie(
         names=severity_counts['severity_level'],
         values=severity_counts['count'],
         title='Distribution of Techniques by Risk Severity',
@@ -36,21 +90,21 @@ def create_severity_pie_chart(severity_counts):
         color_discrete_sequence=severity_colors
     ).update_layout(
         height=800,  # Increase height
-    )
+    ))
 
 # Function to create capability pie chart
 def create_capability_pie_chart(capability_counts):
-    return px.pie(
+    return finish_figure(px.pie(
         capability_counts,
         names='capability_group',
         values='capability_id',
         title='Breakdown of Confidentiality, Integrity, and Availability Impact',
         color_discrete_sequence=['#FF9999', '#66B3FF', '#99FF99']
-    )
+    ))
 
 # Function to create NIST violations bar chart
 def create_nist_bar_chart(nist_violations):
-    return px.bar(
+    return finish_figure(px.bar(
         nist_violations,
         x='capability_id',
         y='capability_group',
@@ -59,19 +113,29 @@ def create_nist_bar_chart(nist_violations):
     ).update_layout(
         height=800,  # Increase height
         #idth=1000    # Increase width
-    )
+    ))
 
-# Function to create incidents scatter plot
-def create_incidents_scatter_plot(group_id, incident_data):
-    gf = get_group_incidents(group_id)
-    # Use .loc to safely assign the new 'year' column
-    gf.loc[:, 'year'] = gf['event_date'].dt.year
+# Function to create residual risk bar chart (uncovered vs covered techniques per actor)
+def create_residual_risk_bar_chart(residual_risk, top_n=30):
+    top_actors = residual_risk.head(top_n)
+    return finish_figure(px.bar(
+        top_actors,
+        x='actor',
+        y=['uncovered', 'covered'],
+        title='Actors Ranked by Techniques Left Uncovered',
+        labels={'value': 'Techniques', 'actor': 'Threat Actor', 'variable': 'Coverage'},
+        color_discrete_sequence=['#d62728', '#2ca02c'],
+        hover_data={'uncovered_ratio': ':.0%'},
+    ).update_layout(
+        height=700,
+    ))
 
-    # Group data by year, industry, and motive, then count the incidents
-    incident_counts = gf.groupby(['year', 'industry', 'motive']).size().reset_index(name='incident_count')
+# Function to create incidents scatter plot
+def create_incidents_scatter_plot(incident_counts):
+    # incident_counts holds the group's incidents counted by year, industry and motive (cube.slice_counts)
 
     # Create the stacked bar chart
-    return px.scatter(
+    return finish_figure(px.scatter(
     incident_counts,
     y='industry',  # X-axis is industry
     x='year',  # Y-axis is year
@@ -80,24 +144,21 @@ def create_incidents_scatter_plot(group_id, incident_data):
     hover_name='industry',  # Hover over to see industry details
     title='Incidents by Year, Motive, and Industry',
     labels={'incident_count': 'Number of Incidents', 'year': 'Year', 'motive': 'Motive'},
+    render_mode='webgl' if lean else 'auto',
 ).update_layout(
     height = 700,
     yaxis_title='Industry',  # X-axis is Industry
     xaxis_title='Year',  # Y-axis is Year
     legend_title_text='Motive',
     xaxis=dict(range=[2013, 2025]),  # Set fixed time range for y-axis
-)
+))
 
 
 
 # Function to create geographic plot for attacks
-def create_attack_geo_plot(group_id):
-    gf = get_group_incidents(group_id)
-    
-    # Group by country and count the number of incidents
-    country_incident_counts = gf.groupby('country').size().reset_index(name='incident_count')
-
-    return px.choropleth(
+def create_attack_geo_plot(country_incident_counts):
+    # country_incident_counts holds the group's incidents counted by country (cube.slice_counts)
+    return finish_figure(px.choropleth(
         country_incident_counts,
         locations='country',
         locationmode='country names',
@@ -108,11 +169,13 @@ def create_attack_geo_plot(group_id):
         color_continuous_scale=px.colors.sequential.Reds,  # Color scale for shading
     ).update_layout(
         height = 800,
-    )
+    ))
     
 # Function to create CVSS scores scatter plot
 def create_cvss_scatter_plot(cvss_scores):
-    return px.scatter(
+    if lean:
+        return create_lean_cvss_scatter_plot(cvss_scores)
+    return finish_figure(px.scatter(
         cvss_scores,
         x='year',
         y='cvss',
@@ -128,50 +191,89 @@ def create_cvss_scatter_plot(cvss_scores):
         marker=dict(size=20)  # Set uniform size for all symbols
     ).update_xaxes(
         autorange='reversed'
-    )
+    ))
 
-# Function to create TTP complexity bar chart
-def create_ttp_complexity_bar_chart(selected_group, ttp_input):
-    # Check if ttp_input is provided as a list
-    if selected_group and ttp_input:
-        ttp_ids = ttp_input
-        
-        # Load complexity_df
-        complexity_df = get_ttp_complexity_data()
-        filtered_df = complexity_df[complexity_df['ID'].isin(ttp_ids)].copy()
-        
-        # Fill N/A for hover data in 'sub-technique of' column
-        filtered_df['sub-technique of'] = filtered_df['sub-technique of'].fillna('N/A')
-
-        # Extract the TTP ID without the decimal points (e.g., T1548 from T1548.005)
-        filtered_df['ID_base'] = filtered_df['ID'].apply(lambda x: x.split('.')[0])
-
-        # Create the hover text with the URL for each TTP ID (using the base ID)
-        filtered_df['hover_text'] = (
-            'ID: ' + filtered_df['ID'].astype(str) + '<br>' +
-            'Complexity Score: ' + filtered_df['complexity score'].astype(str) + '<br>' +
-            'Name: ' + filtered_df['name'] + '<br>' +
-            'Tactics: ' + filtered_df['tactics'] + '<br>' +
-            'Sub-Technique Of: ' + filtered_df['sub-technique of'] + '<br>' +
-            '<b>Link:</b> <a href="https://attack.mitre.org/techniques/' + filtered_df['ID_base'] + 
-            '" target="_blank">https://attack.mitre.org/techniques/' + filtered_df['ID_base'] + '</a>'
+# Lean CVSS scatter: numeric years, WebGL markers, and one marker per (year, severity, score)
+# sized by its CVE count once there are more than SCATTER_POINT_LIMIT CVEs
+def create_lean_cvss_scatter_plot(cvss_scores):
+    points = cvss_scores[['year', 'cvss', 'severity', 'cve']].assign(year=pd.to_numeric(cvss_scores['year'], errors='coerce'))
+    hover = {'cve': True}
+    if len(points) > SCATTER_POINT_LIMIT:
+        points = (
+            points.assign(cvss=points['cvss'].round(1))
+            .groupby(['year', 'severity', 'cvss'], as_index=False, sort=False)
+            .agg(cves=('cve', 'size'), cve=('cve', 'first'))
         )
+        hover = {'cves': True, 'cve': True}
+    figure = px.scatter(
+        points,
+        x='year',
+        y='cvss',
+        color='severity',
+        size='cves' if 'cves' in points else None,
+        hover_data=hover,
+        title='CVEs Exploited',
+        labels={'year': 'Year', 'cvss': 'CVSS Score', 'cves': 'CVEs', 'cve': 'e.g.' if 'cves' in points else 'CVE'},
+        render_mode='webgl',
+    ).update_layout(
+        height=800,
+    ).update_xaxes(
+        autorange='reversed', tickformat='d'
+    )
+    if 'cves' not in points:
+        figure.update_traces(marker=dict(size=20))
+    return finish_figure(figure)
 
+# Function to create the score history line chart (total score and its weighted components over time)
+def create_score_history_chart(history):
+    # history holds the actor's recorded scores, oldest first (score_history.get_trend)
+    figure = go.Figure()
+    if history.empty:
+        return finish_figure(figure.update_layout(title='Score History (no recorded scores yet)'))
+    figure.add_trace(go.Scatter(x=history['recorded_at'], y=history['score'], name='Score', mode='lines+markers', line_shape='hv'))
+    for column, (label, weight) in SCORE_COMPONENT_WEIGHTS.items():
+        figure.add_trace(go.Scatter(
+            x=history['recorded_at'], y=history[column] * weight, name=label, mode='lines',
+            line_shape='hv', visible='legendonly',
+        ))
+    return finish_figure(figure.update_layout(
+        title='Score History',
+        xaxis_title='Recorded',
+        yaxis_title='Score',
+        yaxis=dict(range=[0, 100]),
+        height=500,
+    ))
 
-        # Create the bar chart with color scale based on 'complexity score'
-        figure = px.bar(
-            filtered_df,
-            x='ID',
-            y='complexity score',
-            color='complexity score',
-            color_continuous_scale=px.colors.sequential.Viridis_r,
-            hover_data={'hover_text': True}  # Use hover_text for hover data
-        )
+# Function to create TTP complexity bar chart
+def create_ttp_complexity_bar_chart(selected_group, ttp_complexity):
+    # ttp_complexity holds the group's rows from aggregates.get_ttp_complexity, hover text included
+    if selected_group and not ttp_complexity.empty:
+        if lean:
+            # One shared hover template over the per-technique columns instead of a full string per bar
+            figure = px.bar(
+                ttp_complexity,
+                x='ID',
+                y='complexity score',
+                color='complexity score',
+                color_continuous_scale=px.colors.sequential.Viridis_r,
+                custom_data=['name', 'tactics', 'sub-technique of', 'ID_base'],
+            )
+            figure.update_traces(hovertemplate=TTP_HOVER_TEMPLATE)
+        else:
+            # Create the bar chart with color scale based on 'complexity score'
+            figure = px.bar(
+                ttp_complexity,
+                x='ID',
+                y='complexity score',
+                color='complexity score',
+                color_continuous_scale=px.colors.sequential.Viridis_r,
+                hover_data={'hover_text': True}  # Use hover_text for hover data
+            )
 
-        figure.update_traces(
-            hovertemplate='%{customdata}<extra></extra>',  # Format hover template
-            customdata=filtered_df['hover_text']  # Pass custom hover text
-        )
+            figure.update_traces(
+                hovertemplate='%{customdata}<extra></extra>',  # Format hover template
+                customdata=ttp_complexity['hover_text']  # Pass custom hover text
+            )
 
         figure.update_layout(
             title='TTP Complexity Scores',
@@ -179,7 +281,7 @@ def create_ttp_complexity_bar_chart(selected_group, ttp_input):
             yaxis_title='Complexity Score',
         )
 
-        return figure
+        return finish_figure(figure)
     else:
         # Return an empty figure if no valid input is provided
         return go.Figure()
\ No newline at end of file
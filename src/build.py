@@ -0,0 +1,265 @@
+# build.py
+import argparse
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+from cve_store import file_digest
+
+base_path = Path(__file__).resolve().parent.parent
+
+# Content hashes of every step's inputs and output at its last build
+manifest_path = base_path / 'data/build_manifest.json'
+
+# A derived artifact: the file it writes, the data files it is built from, its builder and the
+# code the builder relies on ('module.name' of a function or constant), hashed by its source alone
+# so unrelated edits elsewhere in those modules don't mark the step stale
+Step = namedtuple('Step', ['output', 'inputs', 'build', 'code'])
+
+
+def build_actors_per_country(path):
+    from actor_per_country import count_actors_per_country
+    events = pd.read_excel(base_path / 'data/cyber_events.xlsx', dtype={'actor': str})
+    count_actors_per_country(events).to_csv(path, index=False)
+
+
+def build_actors_per_country_lat_lon(path):
+    from actor_per_country import fill_coordinates
+    actors = pd.read_csv(base_path / 'data/actors_per_country.csv')
+    coordinates = pd.read_csv(base_path / 'data/country_coordinates.csv')
+    fill_coordinates(actors, coordinates).to_csv(path, index=False)
+
+
+def build_mitigation_results(path):
+    from cvwe_data import build_mitigation_results
+    ttp_cves_cwes = pd.read_csv(base_path / 'data/ttp_cves_cwes.csv')
+    cwe_mitigations = pd.read_csv(base_path / 'data/cwe_mitigations.csv')
+    build_mitigation_results(ttp_cves_cwes, cwe_mitigations).to_csv(path)
+
+
+def build_techniques_without_mitigations(path):
+    from group_data import find_techniques_without_mitigations
+    with open(base_path / 'data/enterprise-attack.json', 'r') as f:
+        attack_data = json.load(f)
+    find_techniques_without_mitigations(attack_data).to_csv(path, index=False)
+
+
+def build_incident_list_processed(path):
+    from incident import load_incident_data
+    load_incident_data().to_csv(path, index=False)
+
+
+STEPS = {
+    'actors_per_country': Step(
+        'data/actors_per_country.csv',
+        ['data/cyber_events.xlsx', 'data/threat_actor_groups_aliases.csv'],
+        build_actors_per_country,
+        ['actor_per_country.count_actors_per_country', 'aliases.canonicalize', 'aliases.resolve',
+         'aliases.normalize', 'aliases.build_index', 'aliases.load_group_mapping'],
+    ),
+    'actors_per_country_lat_lon': Step(
+        'data/actors_per_country_filled_lat_lon.csv',
+        ['data/actors_per_country.csv', 'data/country_coordinates.csv'],
+        build_actors_per_country_lat_lon,
+        ['actor_per_country.fill_coordinates'],
+    ),
+    'mitigation_results': Step(
+        'data/mitigation_results.csv',
+        ['data/ttp_cves_cwes.csv', 'data/cwe_mitigations.csv'],
+        build_mitigation_results,
+        ['cvwe_data.build_mitigation_results'],
+    ),
+    'techniques_without_mitigations': Step(
+        'data/techniques_without_mitigations.csv',
+        ['data/enterprise-attack.json'],
+        build_techniques_without_mitigations,
+        ['group_data.find_techniques_without_mitigations'],
+    ),
+    'incident_list_processed': Step(
+        'data/incident_list_processed.csv',
+        ['data/cyber_operations_incidents.csv'],
+        build_incident_list_processed,
+        ['incident.load_incident_data', 'incident.tag_incident_data'],
+    ),
+}
+
+
+def code_digest(obj):
+    """SHA-256 of a function's source, or of a constant's repr."""
+    source = inspect.getsource(obj) if callable(obj) else repr(obj)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def code_digests(step):
+    """Hashes of the step's builder and of every function or constant it relies on, by 'module.name'."""
+    digests = {f'build.{step.build.__name__}': code_digest(step.build)}
+    for reference in step.code:
+        module_name, name = reference.rsplit('.', 1)
+        digests[reference] = code_digest(getattr(importlib.import_module(module_name), name))
+    return digests
+
+
+def upstream_steps(name):
+    """Steps whose output is one of this step's inputs."""
+    return {other for other, step in STEPS.items() if step.output in STEPS[name].inputs}
+
+
+def required_steps(targets):
+    """The targets plus every step they transitively depend on."""
+    required = set()
+    todo = list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in required:
+            required.add(name)
+            todo.extend(upstream_steps(name))
+    return required
+
+
+def load_manifest():
+    if manifest_path.exists():
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(manifest):
+    tmp_path = manifest_path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def run_step(name, previous, force=False, dry_run=False):
+    """
+    Rebuilds one artifact if its inputs' content or its own output changed since the last build.
+    Runs in a worker process; returns the step's status, hashes and timing.
+    """
+    step = STEPS[name]
+    start = time.perf_counter()
+
+    missing = [source for source in step.inputs if not (base_path / source).exists()]
+    if missing:
+        return {'step': name, 'status': 'failed', 'error': f"missing input {', '.join(missing)}", 'seconds': 0.0}
+
+    inputs = {source: file_digest(base_path / source) for source in step.inputs}
+    code = code_digests(step)
+    output_path = base_path / step.output
+    changed = []
+    if previous is None:
+        changed.append('never built')
+    else:
+        changed += [source for source in inputs if previous['inputs'].get(source) != inputs[source]]
+        changed += [reference for reference in code if previous.get('code', {}).get(reference) != code[reference]]
+        if not output_path.exists() or file_digest(output_path) != previous['output']:
+            changed.append(step.output)
+    fresh = not force and not changed
+    if fresh or dry_run:
+        result = {'step': name, 'status': 'fresh' if fresh else 'stale', 'seconds': time.perf_counter() - start}
+        if changed:
+            result['reason'] = f"changed: {', '.join(changed)}"
+        return result
+
+    # Write next to the output and swap it in, so readers (and the hot reloader) never see a partial file
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    try:
+        step.build(tmp_path)
+        os.replace(tmp_path, output_path)
+    except Exception as e:
+        tmp_path.unlink(missing_ok=True)
+        return {'step': name, 'status': 'failed', 'error': repr(e), 'seconds': time.perf_counter() - start}
+
+    return {
+        'step': name,
+        'status': 'built',
+        'inputs': inputs,
+        'code': code,
+        'output': file_digest(output_path),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def build(targets=None, force=False, jobs=None, dry_run=False):
+    """
+    Brings the given artifacts (default: all) up to date. Steps run in parallel as soon as
+    the steps producing their inputs are done; a failed step skips everything downstream of it.
+    In a dry run, everything downstream of a stale step is reported stale as well.
+    Returns the per-step results in completion order.
+    """
+    unknown = set(targets or []) - set(STEPS)
+    if unknown:
+        raise ValueError(f"Unknown build steps: {', '.join(sorted(unknown))}")
+
+    manifest = load_manifest()
+    waiting = {name: upstream_steps(name) for name in required_steps(targets or STEPS)}
+    finished = {}
+    results = []
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        running = {}
+        while waiting or running:
+            for name, upstream in list(waiting.items()):
+                if not upstream <= finished.keys():
+                    continue
+                del waiting[name]
+                blocked = [dep for dep in upstream if finished[dep] in ('failed', 'skipped')]
+                stale = [dep for dep in upstream if finished[dep] == 'stale']
+                if blocked:
+                    finished[name] = 'skipped'
+                    results.append({'step': name, 'status': 'skipped', 'error': f"{', '.join(blocked)} did not build", 'seconds': 0.0})
+                elif stale:
+                    # a dry run doesn't rebuild the upstream output, so this step's input would change too
+                    finished[name] = 'stale'
+                    results.append({'step': name, 'status': 'stale', 'reason': f"upstream {', '.join(stale)} stale", 'seconds': 0.0})
+                else:
+                    running[pool.submit(run_step, name, manifest.get(name), force, dry_run)] = name
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                finished[running.pop(future)] = result['status']
+                results.append(result)
+                if result['status'] == 'built':
+                    manifest[result['step']] = {
+                        'inputs': result['inputs'],
+                        'code': result['code'],
+                        'output': result['output'],
+                        'built_at': datetime.now(timezone.utc).isoformat(),
+                        'seconds': round(result['seconds'], 3),
+                    }
+                    save_manifest(manifest)
+    return results
+
+
+def print_report(results, elapsed):
+    """Prints one line per step, slowest first, and the wall time against the summed step time."""
+    for result in sorted(results, key=lambda r: r['seconds'], reverse=True):
+        line = f"{result['step']:<32} {result['status']:<8} {result['seconds']:8.2f}s"
+        if 'error' in result or 'reason' in result:
+            line += f"  {result.get('error') or result['reason']}"
+        print(line)
+    print(f"{'total':<32} {'':<8} {elapsed:8.2f}s (steps: {sum(r['seconds'] for r in results):.2f}s)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild the derived data files whose inputs changed.')
+    parser.add_argument('targets', nargs='*', help=f"steps to build (default: all): {', '.join(STEPS)}")
+    parser.add_argument('--force', action='store_true', help='rebuild even if the inputs are unchanged')
+    parser.add_argument('--jobs', type=int, default=None, help='number of parallel worker processes')
+    parser.add_argument('--dry-run', action='store_true', help='only report which steps are stale')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = build(args.targets, force=args.force, jobs=args.jobs, dry_run=args.dry_run)
+    print_report(results, time.perf_counter() - start)
+    sys.exit(1 if any(r['status'] in ('failed', 'skipped') for r in results) else 0)
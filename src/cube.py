@@ -0,0 +1,117 @@
+# cube.py
+import numpy as np
+import pandas as pd
+import group_data
+import sql_backend
+
+# Dimensions of the incident count cube
+DIMENSIONS = ['actor', 'country', 'industry', 'year', 'motive', 'event_type']
+
+# Initialize variables to cache the cube: the sorted labels of every dimension (and label text ->
+# code), one row of dimension codes per non-empty cell (cells sorted by actor), the cell counts,
+# and actor code -> first cell (so an actor's cells are one contiguous range)
+labels = None
+label_codes = None
+cells = None
+counts = None
+actor_offsets = None
+
+
+def load_data():
+    """Builds the incident cube from the loaded incidents and caches it for reuse."""
+    globals().update(build_cube(load_incident_columns(group_data.incidents_data)))
+
+
+def load_incident_columns(incidents):
+    """Returns the incident columns the cube is built from, with the event year."""
+    if sql_backend.enabled:
+        incidents = sql_backend.query(
+            f"SELECT actor, country, industry, motive, event_type, event_date FROM {sql_backend.resolve_table('incidents')}",
+            parse_dates=['event_date']
+        )
+    columns = incidents[['actor', 'country', 'industry', 'motive', 'event_type']].copy()
+    columns['year'] = incidents['event_date'].dt.year.astype('Int64')
+    return columns
+
+
+def build_cube(incidents):
+    """
+    Aggregates incidents into a sparse count cube over DIMENSIONS.
+    Each dimension is dictionary encoded against its sorted labels; missing values get
+    the code len(labels), so they are kept in the cell counts but never grouped or matched.
+    """
+    dimension_labels = {}
+    dimension_codes = []
+    for dimension in DIMENSIONS:
+        values = incidents[dimension]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        dimension_labels[dimension] = pd.Index(values.dropna().unique()).sort_values()
+        codes = dimension_labels[dimension].get_indexer(values)
+        codes[codes < 0] = len(dimension_labels[dimension])
+        dimension_codes.append(codes.astype(np.min_scalar_type(len(dimension_labels[dimension]))))
+
+    # One row per distinct combination, ordered by actor (then the other dimensions)
+    if len(incidents):
+        cube_cells, cell_counts = np.unique(np.column_stack(dimension_codes), axis=0, return_counts=True)
+    else:
+        cube_cells, cell_counts = np.empty((0, len(DIMENSIONS)), dtype=np.uint8), np.empty(0, dtype=np.int64)
+    actors = dimension_labels['actor']
+    offsets = np.searchsorted(cube_cells[:, 0], np.arange(len(actors) + 1)) if len(cube_cells) else np.zeros(len(actors) + 1, dtype=np.int64)
+
+    return {
+        'labels': dimension_labels,
+        'label_codes': {
+            dimension: {str(label): code for code, label in enumerate(dimension_labels[dimension])}
+            for dimension in DIMENSIONS
+        },
+        'cells': cube_cells,
+        'counts': cell_counts.astype(np.uint32),
+        'actor_offsets': offsets,
+    }
+
+
+def codes_for(dimension, values):
+    """Codes of the given labels in a dimension (matched as strings, so '2023' finds 2023)."""
+    if not isinstance(values, (list, tuple, set, np.ndarray, pd.Index)):
+        values = [values]
+    by_text = label_codes[dimension]
+    return np.array([by_text[str(value)] for value in values if str(value) in by_text], dtype=np.int64)
+
+
+def slice_counts(by, **filters):
+    """
+    Returns incident counts grouped by the given dimensions, for the cells matching the filters
+    (dimension=label or list of labels), as a DataFrame sorted like a pandas groupby.
+    e.g. slice_counts(['actor'], industry='Finance', year=2023)
+    """
+    if cells is None:
+        load_data()
+
+    selected_cells, selected_counts = cells, counts
+    actors = filters.pop('actor', None)
+    if actors is not None:
+        # an actor's cells are contiguous, so filtering on actors is a few slices
+        ranges = [np.arange(actor_offsets[code], actor_offsets[code + 1]) for code in codes_for('actor', actors)]
+        rows = np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+        selected_cells, selected_counts = cells[rows], counts[rows]
+
+    mask = np.ones(len(selected_cells), dtype=bool)
+    for dimension, values in filters.items():
+        mask &= np.isin(selected_cells[:, DIMENSIONS.index(dimension)], codes_for(dimension, values))
+
+    # missing values are left out of the groups, like groupby's dropna
+    columns = [DIMENSIONS.index(dimension) for dimension in by]
+    for column, dimension in zip(columns, by):
+        mask &= selected_cells[:, column] < len(labels[dimension])
+    group_cells = selected_cells[mask][:, columns]
+
+    if len(group_cells):
+        keys, inverse = np.unique(group_cells, axis=0, return_inverse=True)
+        totals = np.bincount(inverse.reshape(-1), weights=selected_counts[mask]).astype(np.int64)
+    else:
+        keys, totals = np.empty((0, len(columns)), dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    result = pd.DataFrame({dimension: labels[dimension][keys[:, i]] for i, dimension in enumerate(by)})
+    result['incident_count'] = totals
+    return result
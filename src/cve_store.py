@@ -0,0 +1,180 @@
+# cve_store.py
+import gzip
+import hashlib
+import json
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+
+base_path = Path(__file__).resolve().parent.parent
+
+# Locally downloaded NVD JSON feeds (nvdcve-1.1-*.json[.gz] or NVD 2.0 API pages) and the store built from them
+feed_path = base_path / 'data/nvd'
+legacy_path = base_path / 'data/cve_to_cwe.xlsx'
+store_path = base_path / 'data/cve_store.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cves (
+    cve_id   TEXT PRIMARY KEY,
+    cvss_v3  REAL,
+    cvss_v2  REAL,
+    severity TEXT,
+    cwe_id   TEXT,
+    source   TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS feed_files (
+    name        TEXT PRIMARY KEY,
+    size        INTEGER,
+    mtime       REAL,
+    sha256      TEXT,
+    cve_count   INTEGER,
+    imported_at TEXT
+);
+'''
+
+# NVD rows always win, the legacy spreadsheet only fills CVEs no feed has covered
+UPSERT_FEED = '''
+INSERT INTO cves (cve_id, cvss_v3, cvss_v2, severity, cwe_id, source) VALUES (?, ?, ?, ?, ?, 'nvd')
+ON CONFLICT(cve_id) DO UPDATE SET
+    cvss_v3 = excluded.cvss_v3, cvss_v2 = excluded.cvss_v2,
+    severity = excluded.severity, cwe_id = excluded.cwe_id, source = excluded.source
+'''
+UPSERT_LEGACY = '''
+INSERT INTO cves (cve_id, cvss_v3, cvss_v2, severity, cwe_id, source) VALUES (?, ?, ?, ?, ?, 'xlsx')
+ON CONFLICT(cve_id) DO UPDATE SET
+    cvss_v3 = excluded.cvss_v3, cvss_v2 = excluded.cvss_v2,
+    severity = excluded.severity, cwe_id = excluded.cwe_id
+WHERE cves.source = 'xlsx'
+'''
+
+
+def connect():
+    """Open the store, creating the tables on first use."""
+    conn = sqlite3.connect(store_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def file_digest(path):
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_nvd_feed(path):
+    """
+    Yields (cve_id, cvss_v3, cvss_v2, severity, cwe_id) rows from an NVD 1.1 feed
+    (CVE_Items) or an NVD 2.0 API response (vulnerabilities).
+    """
+    opener = gzip.open if path.suffix == '.gz' else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        feed = json.load(f)
+
+    for item in feed.get('CVE_Items', []):
+        impact = item.get('impact', {})
+        v3 = impact.get('baseMetricV3', {})
+        v2 = impact.get('baseMetricV2', {})
+        cwes = [desc['value'] for problem in item['cve'].get('problemtype', {}).get('problemtype_data', [])
+                for desc in problem.get('description', [])]
+        yield (
+            item['cve']['CVE_data_meta']['ID'],
+            v3.get('cvssV3', {}).get('baseScore'),
+            v2.get('cvssV2', {}).get('baseScore'),
+            (v3.get('cvssV3', {}).get('baseSeverity') or v2.get('severity') or '').lower() or None,
+            ', '.join(cwes) or None,
+        )
+
+    for vulnerability in feed.get('vulnerabilities', []):
+        cve = vulnerability['cve']
+        metrics = cve.get('metrics', {})
+        v3 = (metrics.get('cvssMetricV31') or metrics.get('cvssMetricV30') or [{}])[0]
+        v2 = (metrics.get('cvssMetricV2') or [{}])[0]
+        cwes = [desc['value'] for weakness in cve.get('weaknesses', []) for desc in weakness.get('description', [])]
+        yield (
+            cve['id'],
+            v3.get('cvssData', {}).get('baseScore'),
+            v2.get('cvssData', {}).get('baseScore'),
+            (v3.get('cvssData', {}).get('baseSeverity') or v2.get('baseSeverity') or '').lower() or None,
+            ', '.join(dict.fromkeys(cwes)) or None,
+        )
+
+
+def parse_legacy_spreadsheet(path):
+    """Yields the same rows from the old cve_to_cwe.xlsx spreadsheet."""
+    cwe_df = pd.read_excel(path, usecols=['CVE-ID', 'CVSS-V3', 'CVSS-V2', 'SEVERITY', 'CWE-ID'])
+    cwe_df['SEVERITY'] = cwe_df['SEVERITY'].str.lower()
+    cwe_df = cwe_df.astype(object).where(cwe_df.notna(), None)
+    yield from cwe_df[['CVE-ID', 'CVSS-V3', 'CVSS-V2', 'SEVERITY', 'CWE-ID']].itertuples(index=False, name=None)
+
+
+def import_file(conn, path, parser, statement):
+    """
+    Imports one source file unless it is unchanged since the last import.
+    Returns the number of CVEs imported (0 when skipped).
+    """
+    stat = path.stat()
+    known = conn.execute('SELECT size, mtime, sha256 FROM feed_files WHERE name = ?', (path.name,)).fetchone()
+    if known and known[0] == stat.st_size and known[1] == stat.st_mtime:
+        return 0
+
+    sha256 = file_digest(path)
+    if known and known[2] == sha256:
+        # touched but not changed, only remember the new mtime
+        conn.execute('UPDATE feed_files SET mtime = ? WHERE name = ?', (stat.st_mtime, path.name))
+        return 0
+
+    rows = list(parser(path))
+    with conn:
+        conn.executemany(statement, rows)
+        conn.execute(
+            'INSERT OR REPLACE INTO feed_files (name, size, mtime, sha256, cve_count, imported_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (path.name, stat.st_size, stat.st_mtime, sha256, len(rows), datetime.now(timezone.utc).isoformat())
+        )
+    return len(rows)
+
+
+def update_store():
+    """
+    Incrementally imports the legacy spreadsheet and every new or changed NVD feed file.
+    Returns a dict of file name -> CVEs imported, for the files that were (re)imported.
+    """
+    imported = {}
+    with connect() as conn:
+        if legacy_path.exists():
+            imported[legacy_path.name] = import_file(conn, legacy_path, parse_legacy_spreadsheet, UPSERT_LEGACY)
+
+        # sorted so the NVD "modified"/"recent" feeds are applied after the yearly ones
+        feeds = sorted(list(feed_path.glob('*.json')) + list(feed_path.glob('*.json.gz'))) if feed_path.exists() else []
+        for path in feeds:
+            imported[path.name] = import_file(conn, path, parse_nvd_feed, UPSERT_FEED)
+    conn.close()
+    return {name: count for name, count in imported.items() if count}
+
+
+def lookup_cves(cve_ids):
+    """
+    Returns the enrichment (capability_id, cvss_v3, cvss_v2, severity, cwe_id) of the given CVEs
+    through primary key lookups on the store.
+    """
+    conn = connect()
+    try:
+        return pd.read_sql_query(
+            'SELECT cve_id AS capability_id, cvss_v3, cvss_v2, severity, cwe_id FROM cves '
+            'WHERE cve_id IN (SELECT value FROM json_each(?))',
+            conn,
+            params=(json.dumps(sorted(set(cve_ids))),)
+        )
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        feed_path = Path(sys.argv[1])
+    for name, count in update_store().items():
+        print(f"Imported {count} CVEs from {name}")
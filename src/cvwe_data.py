@@ -1,29 +1,50 @@
 import pandas as pd
+import numpy as np
 import re
 from pathlib import Path 
+from cve_store import update_store, lookup_cves
+import sql_backend
+import memory
 
 base_path = Path(__file__).resolve().parent.parent
 
 # Initialize variables to cache the loaded data
 cached_data = None
 cve_with_scores = None  # Ensure this variable is declared globally
+cve_rows_by_ttp = None  # TTP -> row positions in cve_with_scores
 cwe_mitigations = None
 
 def load_data():
     """Load the CVSS data and cache it for reuse."""
     global cached_data
     global cve_with_scores
+    global cve_rows_by_ttp
     global cwe_mitigations
 
     if cached_data is None:
-        cached_data, cve_with_scores = load_cvss_data()
-    cwe_mitigations = load_cwe_mitigations()
+        cached_data, cve_with_scores, cve_rows_by_ttp = build_cvss_cache()
+    cwe_mitigations = build_cwe_mitigations_cache()
+
+def build_cvss_cache():
+    """Load the CVSS data into its cached form without touching the module cache."""
+    result, scores = load_cvss_data()
+    scores = memory.compact_frame(scores, 'cve')
+    rows_by_ttp = scores.groupby('attack_object_id', sort=False, observed=True).indices
+    if sql_backend.enabled:
+        sql_backend.ingest('cve_scores', scores, indexes=['attack_object_id'], index_label='row_label')
+    return result, scores, rows_by_ttp
+
+def build_cwe_mitigations_cache():
+    """Load the CWE mitigation ratios into their cached form without touching the module cache."""
+    mitigations = load_cwe_mitigations()
+    if sql_backend.enabled:
+        sql_backend.ingest('cwe_mitigations', mitigations, indexes=['ttp'])
+    return mitigations
 
 def load_cvss_data():
-    """Load and process CVSS data from CSV and Excel files."""
-    # Load the CSV and Excel files
+    """Load and process CVSS data from the CVE mapping and the CVE enrichment store."""
+    # Load the CSV file
     cve_df = pd.read_csv(base_path / 'data/cve_mapping.csv')
-    cwe_df = pd.read_excel(base_path / 'data/cve_to_cwe.xlsx')
 
     # Clean up and drop unnecessary columns in cve_df
     cve_df = cve_df.drop(columns=[
@@ -31,13 +52,9 @@ def load_cvss_data():
         'organization', 'creation_date', 'last_update', 
         'mapping_framework_version', 'mapping_framework', 'Unnamed: 0'])
 
-    # Rename columns in cwe_df and drop description
-    cwe_df.rename(columns={
-        "CVE-ID": "capability_id", "CVSS-V3": "cvss_v3", "CVSS-V2": "cvss_v2", 
-        "SEVERITY": "severity", "CWE-ID": "cwe_id", "ID": "id"
-    }, inplace=True)
-    cwe_df = cwe_df.drop(columns=['DESCRIPTION'])
-    cwe_df['severity'] = cwe_df['severity'].str.lower()
+    # Import new or changed NVD feeds, then look up only the CVEs we map
+    update_store()
+    cwe_df = lookup_cves(cve_df['capability_id'])
 
     # Merge cve_df with cwe_df on 'capability_id'
     cve_df = pd.merge(cve_df, cwe_df, how='left', on='capability_id')
@@ -50,7 +67,7 @@ def load_cvss_data():
     cve_df['cvss'] = cve_df['cvss_v3'].combine_first(cve_df['cvss_v2'])
 
     # Drop unneeded columns
-    cve_df.drop(columns=['id', 'cvss_v3', 'cvss_v2'], inplace=True)
+    cve_df.drop(columns=['cvss_v3', 'cvss_v2'], inplace=True)
 
     # Sort by 'year' to get the latest entries first
     df_sorted = cve_df.sort_values('year', ascending=False)
@@ -62,7 +79,7 @@ def load_cvss_data():
     result = df_sorted.groupby('attack_object_id').agg({
         'cve': lambda x: ', '.join(x),                        # Join CVEs by comma
         'cvss': ['max', 'mean'],                              # Get highest and average CVSS
-        'cwe_id': lambda x: ', '.join(x),                     # Join CWE IDs by comma
+        'cwe_id': lambda x: ', '.join(x.dropna()),            # Join CWE IDs by comma (CVEs missing from the store have none)
         'mapping_type': lambda x: x.value_counts().to_dict()   # Count mapping types
     }).reset_index()
 
@@ -74,87 +91,75 @@ def load_cvss_data():
 
     return result, df_sorted
 
-def extract_cvss_scores(ttps):
-    """Extract CVSS scores for the given TTPs."""
+def extract_cvss_scores(ttps, scores=None, rows_by_ttp=None):
+    """Extract CVSS scores for the given TTPs (from scores/rows_by_ttp when given, e.g. a reload's rebuilt data)."""
     global cve_with_scores
-    if cve_with_scores is None:
-        load_data()  # Ensure the data is loaded if it's not already
+    if scores is None:
+        if cve_with_scores is None:
+            load_data()  # Ensure the data is loaded if it's not already
+        scores, rows_by_ttp = cve_with_scores, cve_rows_by_ttp
 
-    return cve_with_scores.loc[cve_with_scores['attack_object_id'].isin(ttps)]
+    if sql_backend.enabled:
+        df = sql_backend.select_in('cve_scores', 'attack_object_id', set(ttps))
+        return df.set_index('row_label').rename_axis(None)
+
+    # Indexed lookup of each TTP's rows, kept in the original (latest year first) order
+    positions = [rows_by_ttp[ttp] for ttp in set(ttps) if ttp in rows_by_ttp]
+    positions = np.sort(np.concatenate(positions)) if positions else np.array([], dtype=int)
+    return scores.iloc[positions]
 
 
 def load_cwe_mitigations():
-    """Load and process TTP-CVE-CWE and CWE mitigations data from CSV files."""
-    # Load the TTP-CVE-CWE and CWE mitigations data
-    # ttp_cves_cwes_path = base_path / 'data/ttp_cves_cwes.csv'
-    # cwe_mitigations_path = base_path / 'data/cwe_mitigations.csv'
-
-    # # Read the CSV files
-    # ttp_cves_cwes_df = pd.read_csv(ttp_cves_cwes_path)
-    # cwe_mitigations_df = pd.read_csv(cwe_mitigations_path)
-
-    # # Clean and ensure columns are stripped of extra spaces
-    # ttp_cves_cwes_df.columns = ttp_cves_cwes_df.columns.str.strip()
-    # cwe_mitigations_df.columns = cwe_mitigations_df.columns.str.strip()
-
-    # # Split and clean the 'CWE-ID' column in the ttp_cves_cwes_df
-    # ttp_cves_cwes_df['CWE-ID'] = ttp_cves_cwes_df['CWE-ID'].str.split(',')
-    # ttp_cves_cwes_df['CWE-ID'] = ttp_cves_cwes_df['CWE-ID'].apply(lambda x: [cwe.strip() for cwe in x])
-
-    # # Ensure that the CWE-ID in cwe_mitigations_df is treated as a string for comparison
-    # cwe_mitigations_df['CWE-ID'] = cwe_mitigations_df['CWE-ID'].astype(str)
-
-    # # Initialize a list to store the final result with mitigation info
-    # mitigation_results = []
-
-    # # Loop through each TTP and check for CWE mitigations
-    # for index, row in ttp_cves_cwes_df.iterrows():
-    #     ttp = row['ttp']  # Get the TTP
-    #     cwes = row['CWE-ID']  # Get the associated CWE-IDs
-
-    #     mitigated_cwes = []
-    #     unmitigated_cwes = []
-
-    #     # Check each CWE-ID in the list
-    #     for cwe in cwes:
-    #         cwe = str(cwe).strip()  # Clean the CWE string
-    #         cwe_data = cwe_mitigations_df[cwe_mitigations_df['CWE-ID'] == cwe]  # Filter for this CWE in cwe_mitigations
-
-    #         if not cwe_data.empty:
-    #             potential_mitigation = cwe_data['Potential_Mitigations'].values[0]
-    #             if pd.notna(potential_mitigation) and potential_mitigation.strip():
-    #                 mitigated_cwes.append(cwe)  # This CWE has a mitigation
-    #             else:
-    #                 unmitigated_cwes.append(cwe)  # No mitigation data
-    #         else:
-    #             unmitigated_cwes.append(cwe)  # CWE not found
-
-    #     # Calculate the ratio of mitigated CWEs
-    #     total_cwes = len(cwes)
-    #     mitigated_count = len(mitigated_cwes)
-    #     mitigation_ratio = mitigated_count / total_cwes if total_cwes > 0 else 0
-
-    #     # Store the results
-    #     mitigation_results.append({
-    #         'ttp': ttp,
-    #         'total_cwes': total_cwes,
-    #         'mitigated_cwes': mitigated_cwes,
-    #         'unmitigated_cwes': unmitigated_cwes,
-    #         'mitigation_ratio': mitigation_ratio
-    #     })
-    #     m = pd.DataFrame(mitigation_results)
-    #     m.to_csv("mitigation_results.csv")
-    
+    """Load the per-TTP CWE mitigation ratios (built by build_mitigation_results)."""
     return pd.read_csv(base_path / 'data/mitigation_results.csv')
 
 
-def extract_cwe_mitigations(ttps):
+def build_mitigation_results(ttp_cves_cwes_df, cwe_mitigations_df):
+    """
+    Computes, for each TTP, which of its CWEs have a potential mitigation and the mitigated ratio.
+    Input: the TTP-CVE-CWE and CWE mitigations DataFrames (ttp_cves_cwes.csv, cwe_mitigations.csv).
+    """
+    # Clean and ensure columns are stripped of extra spaces
+    ttp_cves_cwes_df.columns = ttp_cves_cwes_df.columns.str.strip()
+    cwe_mitigations_df.columns = cwe_mitigations_df.columns.str.strip()
+
+    # CWEs that have a non-empty potential mitigation (first row of each CWE wins)
+    first_rows = cwe_mitigations_df.drop_duplicates('CWE-ID')
+    mitigations = first_rows['Potential_Mitigations']
+    has_mitigation = mitigations.notna() & (mitigations.astype(str).str.strip() != '')
+    mitigated = set(first_rows.loc[has_mitigation, 'CWE-ID'].astype(str))
+
+    # Initialize a list to store the final result with mitigation info
+    mitigation_results = []
+
+    # Loop through each TTP and check for CWE mitigations
+    for ttp, cwes in zip(ttp_cves_cwes_df['ttp'], ttp_cves_cwes_df['CWE-ID'].str.split(',')):
+        cwes = [cwe.strip() for cwe in cwes]
+        mitigated_cwes = [cwe for cwe in cwes if cwe in mitigated]
+        unmitigated_cwes = [cwe for cwe in cwes if cwe not in mitigated]  # No mitigation data or CWE not found
+
+        # Store the results, with the ratio of mitigated CWEs
+        mitigation_results.append({
+            'ttp': ttp,
+            'total_cwes': len(cwes),
+            'mitigated_cwes': mitigated_cwes,
+            'unmitigated_cwes': unmitigated_cwes,
+            'mitigation_ratio': len(mitigated_cwes) / len(cwes) if cwes else 0
+        })
+
+    return pd.DataFrame(mitigation_results)
+
+
+def extract_cwe_mitigations(ttps, mitigations=None):
     """Extract the mitigation_ratio column for specific TTPs and store in a global variable."""
     global cwe_mitigations
-    mitigations_df = cwe_mitigations # Load the CWE mitigation data
+    mitigations_df = cwe_mitigations if mitigations is None else mitigations # Load the CWE mitigation data
 
     # Filter only the rows where TTP is in the provided ttps list
-    filtered_mitigations = mitigations_df[mitigations_df['ttp'].isin(ttps)]
+    if sql_backend.enabled:
+        filtered_mitigations = sql_backend.select_in('cwe_mitigations', 'ttp', ttps)
+    else:
+        filtered_mitigations = mitigations_df[mitigations_df['ttp'].isin(ttps)]
 
     # If no mitigations are found for the TTPs, set the ratio to 0
     if filtered_mitigations.empty:
@@ -0,0 +1,178 @@
+# czml.py
+import hashlib
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import group_data
+import sql_backend
+
+base_path = Path(__file__).resolve().parent.parent
+
+# Packets per streamed part; the first part also carries the document packet with the clock
+PART_SIZE = 250
+
+# Points along every attack arc, and the arc height per degree of great circle distance (meters)
+ARC_POINTS = 24
+ARC_HEIGHT_PER_DEGREE = 15000
+
+# Timeline speed: one month of incidents every two seconds
+CLOCK_MULTIPLIER = 30 * 24 * 3600 / 2
+
+# Colors (RGBA) of the targeted countries and of the arcs from the attacker's country
+TARGET_COLOR = [220, 40, 40, 200]
+ARC_COLOR = [255, 140, 0, 255]
+
+# Initialize variables to cache the CZML document, serialized once as its parts, and its version
+# (a hash of the parts, so it is the same across restarts as long as the document is)
+parts = None
+version = None
+
+
+def load_data():
+    """Builds the CZML document from the loaded incidents and caches its serialized parts."""
+    globals().update(build_czml(load_incident_columns(group_data.incidents_data), load_coordinates()))
+
+
+def get_document():
+    """Returns (version, serialized CZML parts), building them on first use."""
+    if parts is None:
+        load_data()
+    return version, parts
+
+
+def load_coordinates():
+    """Returns country -> (longitude, latitude) of every country with coordinates."""
+    coordinates = pd.read_csv(base_path / 'data/country_coordinates.csv').dropna(subset=['latitude', 'longitude'])
+    return {country: (lon, lat) for country, lat, lon in zip(coordinates['country'], coordinates['latitude'], coordinates['longitude'])}
+
+
+def load_incident_columns(incidents):
+    """Returns the incident date, target country and attacker country columns."""
+    if sql_backend.enabled:
+        return sql_backend.query(f"SELECT event_date, country, actor_country FROM {sql_backend.resolve_table('incidents')}", parse_dates=['event_date'])
+    return incidents[['event_date', 'country', 'actor_country']]
+
+
+def month_intervals(months):
+    """ISO 8601 'start/end' interval of each monthly period."""
+    return [f'{month.start_time:%Y-%m-%dT00:00:00Z}/{(month + 1).start_time:%Y-%m-%dT00:00:00Z}' for month in months]
+
+
+def arc_positions(source, target):
+    """
+    Cartographic degrees (lon, lat, height, ...) of a raised arc along the great circle from source
+    to target, interpolated on the unit sphere and lifted proportionally to the distance.
+    """
+    lon, lat = np.radians([source[0], target[0]]), np.radians([source[1], target[1]])
+    ends = np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+    angle = np.arccos(np.clip(ends[0] @ ends[1], -1.0, 1.0))
+    t = np.linspace(0.0, 1.0, ARC_POINTS)
+    if angle < 1e-9:
+        points = np.repeat(ends[:1], ARC_POINTS, axis=0)
+    else:
+        points = (np.sin((1 - t) * angle)[:, None] * ends[0] + np.sin(t * angle)[:, None] * ends[1]) / np.sin(angle)
+    heights = np.sin(np.pi * t) * np.degrees(angle) * ARC_HEIGHT_PER_DEGREE
+    lons = np.degrees(np.arctan2(points[:, 1], points[:, 0]))
+    lats = np.degrees(np.arcsin(np.clip(points[:, 2], -1.0, 1.0)))
+    return np.round(np.column_stack([lons, lats, heights]), 4).reshape(-1).tolist()
+
+
+def build_packets(incidents, coordinates):
+    """
+    Turns incidents into CZML packets: a document packet with a clock spanning every incident,
+    one point per targeted country sized by its incidents of each month, and one arc per attacker
+    country -> target country pair and month, shown for that month. Packets are ordered by start time.
+    """
+    incidents = incidents.dropna(subset=['event_date'])
+    months = incidents['event_date'].dt.to_period('M')
+    if incidents.empty:
+        return [{'id': 'document', 'name': 'Threat actor incidents', 'version': '1.0'}]
+
+    start = months.min().start_time
+    end = (months.max() + 1).start_time
+    packets = [{
+        'id': 'document',
+        'name': 'Threat actor incidents',
+        'version': '1.0',
+        'clock': {
+            'interval': f'{start:%Y-%m-%dT00:00:00Z}/{end:%Y-%m-%dT00:00:00Z}',
+            'currentTime': f'{start:%Y-%m-%dT00:00:00Z}',
+            'multiplier': CLOCK_MULTIPLIER,
+            'range': 'LOOP_STOP',
+            'step': 'SYSTEM_CLOCK_MULTIPLIER',
+        },
+    }]
+
+    targets = pd.DataFrame({'country': incidents['country'].astype(object), 'month': months})
+    target_counts = targets.groupby(['country', 'month']).size()
+    timed = []
+    for country, counts in target_counts.groupby(level='country'):
+        if country not in coordinates:
+            continue
+        country_months = counts.index.get_level_values('month')
+        intervals = month_intervals(country_months)
+        timed.append((country_months.min(), {
+            'id': f'target/{country}',
+            'name': country,
+            'availability': intervals,
+            'description': f'{int(counts.sum())} incidents targeting {country}',
+            'position': {'cartographicDegrees': [*coordinates[country], 0]},
+            'point': {
+                'color': {'rgba': TARGET_COLOR},
+                'outlineColor': {'rgba': [255, 255, 255, 255]},
+                'outlineWidth': 1,
+                'heightReference': 'CLAMP_TO_GROUND',
+                'pixelSize': [
+                    {'interval': interval, 'number': float(6 + 4 * np.sqrt(count))}
+                    for interval, count in zip(intervals, counts.to_numpy())
+                ],
+            },
+        }))
+
+    arcs = pd.DataFrame({
+        'source': incidents['actor_country'].astype(object),
+        'target': incidents['country'].astype(object),
+        'month': months,
+    })
+    arc_counts = arcs.groupby(['source', 'target', 'month']).size()
+    arc_paths = {}
+    for (source, target, month), count in arc_counts.items():
+        if source == target or source not in coordinates or target not in coordinates:
+            continue
+        if (source, target) not in arc_paths:
+            arc_paths[source, target] = arc_positions(coordinates[source], coordinates[target])
+        timed.append((month, {
+            'id': f'arc/{source}/{target}/{month}',
+            'name': f'{source} -> {target}',
+            'availability': month_intervals([month])[0],
+            'description': f'{count} incidents from {source} against {target} in {month}',
+            'polyline': {
+                'positions': {'cartographicDegrees': arc_paths[source, target]},
+                'width': float(2 + np.log2(count)),
+                'arcType': 'NONE',
+                'material': {'polylineGlow': {'color': {'rgba': ARC_COLOR}, 'glowPower': 0.2}},
+            },
+        }))
+
+    timed.sort(key=lambda item: item[0])
+    return packets + [packet for _, packet in timed]
+
+
+def build_czml(incidents, coordinates):
+    """Builds the packets and serializes them once, as PART_SIZE packet JSON arrays, versioned by their hash."""
+    packets = build_packets(incidents, coordinates)
+    document_parts = [json.dumps(packets[i:i + PART_SIZE], separators=(',', ':')) for i in range(0, len(packets), PART_SIZE)]
+    digest = hashlib.sha256()
+    for part in document_parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return {'parts': document_parts, 'version': digest.hexdigest()[:16]}
+
+
+def iter_document(document_parts):
+    """Yields the whole CZML document as one JSON array, a part at a time."""
+    yield '['
+    for i, part in enumerate(document_parts):
+        yield (',' if i else '') + part[1:-1]
+    yield ']'
@@ -0,0 +1,213 @@
+# export.py
+import argparse
+import json
+import sys
+import numpy as np
+import pandas as pd
+import group_data
+import snapshot
+from group_data import get_ttps_of_group
+from aggregates import get_veris_data, get_nist_violations
+from cvwe_data import extract_cvss_scores
+from rescoring import get_scores, COMPONENTS
+from cube import slice_counts
+
+# Export formats and their HTTP content type
+FORMATS = {
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# Actors per Parquet row group: the most records the exporter holds at once
+BATCH_SIZE = 256
+
+# CVSS columns carried into the export
+CVSS_COLUMNS = ['cve', 'attack_object_id', 'year', 'severity', 'cwe_id', 'cvss']
+
+# Incident cube dimensions summarized per actor
+INCIDENT_DIMENSIONS = ['year', 'country', 'industry', 'motive', 'event_type']
+
+
+def plain(value):
+    """Converts numpy scalars and missing values into JSON/Arrow friendly Python values."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def incident_summary(actor):
+    """Incident count of an actor, and per year, country, industry, motive and event type, from the cube."""
+    summary = {'count': int(slice_counts(['actor'], actor=actor)['incident_count'].sum())}
+    for dimension in INCIDENT_DIMENSIONS:
+        counts = slice_counts([dimension], actor=actor)
+        summary[f'by_{dimension}'] = {str(label): int(count) for label, count in zip(counts[dimension], counts['incident_count'])}
+    return summary
+
+
+def profile_record(actor):
+    """
+    Everything the profile page shows for one actor, as one flat-ish record:
+    TTPs, score and its components, CVSS rows, NIST violation counts, VERIS severity and incidents.
+    """
+    ttps = get_ttps_of_group(actor)
+    average_severity, severity_counts, _ = get_veris_data(actor)
+    nist_violations = get_nist_violations(actor)
+    cvss = extract_cvss_scores(ttps)[CVSS_COLUMNS]
+
+    scores = get_scores()
+    score_row = scores.loc[actor] if actor in scores.index else pd.Series(dtype=float)
+    return {
+        'actor': actor,
+        'ttps': list(ttps),
+        'score': plain(score_row.get('score')),
+        'score_breakdown': {column: plain(score_row.get(column)) for column in COMPONENTS.values()},
+        'average_severity': plain(average_severity['severity'].mean()) if len(average_severity) else None,
+        'severity_counts': {str(level): int(count) for level, count in zip(severity_counts['severity_level'], severity_counts['count'])},
+        'nist_violations': {family: int(count) for family, count in zip(nist_violations['capability_group'], nist_violations['capability_id'])},
+        'cvss': [{column: plain(value) for column, value in zip(CVSS_COLUMNS, row)} for row in cvss.itertuples(index=False)],
+        'incidents': incident_summary(actor),
+    }
+
+
+def iter_records(actors=None):
+    """
+    Yields one profile record per actor (default: every group), each read from a single data version.
+    Only the current record is held in memory.
+    """
+    for actor in actors if actors is not None else group_data.get_all_groups():
+        yield snapshot.read_consistent(profile_record, actor)
+
+
+def iter_jsonl(records):
+    """Yields the records as JSON lines."""
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def parquet_schema():
+    """Arrow schema of a profile record, fixed so every row group matches."""
+    import pyarrow as pa
+    counts = pa.map_(pa.string(), pa.int64())
+    return pa.schema([
+        ('actor', pa.string()),
+        ('ttps', pa.list_(pa.string())),
+        ('score', pa.float64()),
+        ('score_breakdown', pa.struct([(column, pa.float64()) for column in COMPONENTS.values()])),
+        ('average_severity', pa.float64()),
+        ('severity_counts', counts),
+        ('nist_violations', counts),
+        ('cvss', pa.list_(pa.struct([
+            ('cve', pa.string()),
+            ('attack_object_id', pa.string()),
+            ('year', pa.string()),
+            ('severity', pa.string()),
+            ('cwe_id', pa.string()),
+            ('cvss', pa.float64()),
+        ]))),
+        ('incidents', pa.struct([('count', pa.int64())] + [(f'by_{dimension}', counts) for dimension in INCIDENT_DIMENSIONS])),
+    ])
+
+
+def arrow_ready(record):
+    """Maps become (key, value) lists and CVSS years strings, as the Arrow schema expects."""
+    record = dict(record)
+    for field in ('severity_counts', 'nist_violations'):
+        record[field] = list(record[field].items())
+    record['cvss'] = [{**row, 'year': None if row['year'] is None else str(row['year'])} for row in record['cvss']]
+    record['incidents'] = {key: value if key == 'count' else list(value.items()) for key, value in record['incidents'].items()}
+    return record
+
+
+def batches(records, batch_size=BATCH_SIZE):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ChunkSink:
+    """Write-only file object collecting what the Parquet writer emits, drained after every row group."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(records, batch_size=BATCH_SIZE):
+    """
+    Yields a Parquet file as byte chunks, one row group of batch_size records at a time,
+    so it can be streamed without ever holding the whole table.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = parquet_schema()
+    sink = ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in batches(records, batch_size):
+            writer.write_table(pa.Table.from_pylist([arrow_ready(record) for record in batch], schema=schema))
+            yield sink.drain()
+    yield sink.drain()  # the footer, written on close
+
+
+def iter_export(export_format, actors=None):
+    """Yields the export of the given actors (default: all) in 'jsonl' (str lines) or 'parquet' (byte chunks)."""
+    if export_format not in FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}; use {', '.join(FORMATS)}")
+    records = iter_records(actors)
+    return iter_jsonl(records) if export_format == 'jsonl' else iter_parquet(records)
+
+
+def load_data():
+    """Loads every dataset a profile record is built from, as main.py does at startup."""
+    from loader import load_all
+    load_all(report=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export every actor profile as JSON lines or Parquet.')
+    parser.add_argument('actors', nargs='*', help='actors to export (default: every group)')
+    parser.add_argument('--format', choices=list(FORMATS), default='jsonl')
+    parser.add_argument('--output', '-o', default=None, help='output file (default: stdout)')
+    args = parser.parse_args()
+
+    load_data()
+    unknown = [actor for actor in args.actors if not group_data.has_group(actor)]
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(unknown)}")
+    chunks = iter_export(args.format, args.actors or None)
+    if args.format == 'jsonl':
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    else:
+        out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
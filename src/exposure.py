@@ -0,0 +1,67 @@
+# exposure.py
+import threading
+import numpy as np
+import pandas as pd
+from scipy import sparse
+import cube
+import rescoring
+import snapshot
+import scoring_profiles
+
+# Initialize variables to cache the exposure table of every scoring profile and the data version they were computed from
+tables = {}
+version = None
+
+lock = threading.Lock()
+
+
+def country_actor_matrix():
+    """
+    Sparse countries x actors matrix of incident counts, summed from the incident cube's cells,
+    with the cube's country and actor labels. Incidents missing either are left out.
+    """
+    countries, actors = cube.labels['country'], cube.labels['actor']
+    actor_codes, country_codes = cube.cells[:, cube.DIMENSIONS.index('actor')], cube.cells[:, cube.DIMENSIONS.index('country')]
+    keep = (actor_codes < len(actors)) & (country_codes < len(countries))
+    matrix = sparse.csr_matrix(
+        (cube.counts[keep].astype(np.float64), (country_codes[keep].astype(np.int64), actor_codes[keep].astype(np.int64))),
+        shape=(len(countries), len(actors))
+    )
+    matrix.sum_duplicates()
+    return matrix, countries, actors
+
+
+def build_exposure(profile=scoring_profiles.DEFAULT_PROFILE):
+    """
+    Exposure of every targeted country: the incident-weighted sum of the total scores of the actors
+    that attacked it, as one sparse matrix product over all countries. Actors without a score
+    (not in ATT&CK) count as incidents but add no exposure.
+    """
+    matrix, countries, actors = country_actor_matrix()
+    scores = rescoring.profile_scores(profile)['score'].reindex(actors).fillna(0).to_numpy()
+    scored = (scores > 0).astype(np.float64)
+
+    exposure = matrix @ scores
+    scored_incidents = matrix @ scored
+    table = pd.DataFrame({
+        'country': countries,
+        'incident_count': np.asarray(matrix.sum(axis=1)).ravel().astype(np.int64),
+        'exposure': exposure,
+        # the average score of the actors behind each (scored) incident
+        'mean_actor_score': np.divide(exposure, scored_incidents, out=np.zeros(len(countries)), where=scored_incidents > 0),
+    })
+    top = table['exposure'].max() if len(table) else 0
+    table['exposure_normalized'] = table['exposure'] / top if top > 0 else 0.0
+    return table.set_index('country')
+
+
+def get_exposure(profile=scoring_profiles.DEFAULT_PROFILE):
+    """Returns the country exposure table under a scoring profile, computed once per data version."""
+    global tables, version
+    current = snapshot.get_version()
+    with lock:
+        if version != current:
+            tables, version = {}, current
+        if profile not in tables:
+            tables[profile] = snapshot.read_consistent(build_exposure, profile)
+        return tables[profile]
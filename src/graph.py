@@ -0,0 +1,241 @@
+# graph.py
+import re
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import matrices
+import cvwe_data
+
+base_path = Path(__file__).resolve().parent.parent
+
+# Node types of the threat knowledge graph
+NODE_TYPES = ['actor', 'technique', 'cve', 'cwe', 'mitigation', 'control', 'family', 'capability']
+
+# Edge types as (from type, to type); each is also indexed in reverse, so any path can be walked both ways
+EDGE_TYPES = [
+    ('actor', 'technique'),       # actor uses technique (MITRE ATT&CK groups)
+    ('technique', 'cve'),         # technique is mapped to an exploited CVE
+    ('cve', 'cwe'),               # CVE is an instance of a CWE weakness
+    ('cwe', 'mitigation'),        # CWE has a potential mitigation (CWE catalog)
+    ('technique', 'control'),     # technique is mitigated by a NIST 800-53 control
+    ('control', 'family'),        # control belongs to a NIST family
+    ('technique', 'capability'),  # technique maps to a VERIS capability
+]
+
+# CWE ids outside the catalog, kept as CWE nodes without mitigations
+CWE_PATTERN = re.compile(r'CWE-\d+|NVD-CWE-[A-Za-z]+')
+
+# NVD placeholders for a CVE without a classified weakness (NVD-CWE-noinfo, NVD-CWE-Other):
+# they have no mitigations because they are not weaknesses, so they don't count as unmitigated CWEs
+PLACEHOLDER_CWE_PREFIX = 'NVD-CWE-'
+
+# Initialize variables to cache the node ids (a sorted pd.Index per node type) and the
+# CSR adjacency matrix of every edge type and its reverse, keyed by (from type, to type)
+nodes = None
+edges = None
+
+
+def load_data():
+    """Builds the graph from the incidence matrices and the CVE and CWE data."""
+    globals().update(build_graph(
+        {name: getattr(matrices, name) for name in MATRIX_NAMES},
+        cvwe_data.cve_with_scores,
+        load_cwe_mitigations(),
+    ))
+
+
+def get_graph():
+    """Returns (nodes, edges), building them on first use."""
+    if edges is None:
+        load_data()
+    return nodes, edges
+
+
+# matrices globals the graph reuses as they are
+MATRIX_NAMES = [
+    'actor_ids', 'technique_ids', 'control_ids', 'family_ids', 'capability_ids', 'cve_ids',
+    'actor_technique', 'technique_cve', 'technique_control', 'control_family', 'technique_capability',
+]
+
+
+def load_cwe_mitigations():
+    """Returns the CWE id and potential mitigations text of every CWE in the catalog."""
+    return pd.read_csv(base_path / 'data/cwe_mitigations.csv', usecols=['CWE-ID', 'Potential_Mitigations'])
+
+
+def parse_mitigations(text):
+    """
+    Splits a CWE catalog Potential_Mitigations field
+    ('::PHASE:...:STRATEGY:...:DESCRIPTION:...:EFFECTIVENESS:...::...') into its mitigation descriptions.
+    """
+    if not isinstance(text, str):
+        return []
+    descriptions = []
+    for entry in text.split('::'):
+        match = re.search(r'DESCRIPTION:(.*?)(?::EFFECTIVENESS:.*)?$', entry, re.DOTALL)
+        if match and match.group(1).strip():
+            descriptions.append(match.group(1).strip())
+    return descriptions
+
+
+def build_graph(matrix_values, cve_df, cwe_catalog):
+    """
+    Returns the node ids and CSR adjacency (by module global name): the actor, technique, CVE,
+    NIST and VERIS edges come from the matrices module, the CVE -> CWE edges from the CVE
+    data and the CWE -> mitigation edges from the CWE catalog.
+    """
+    # CVE -> CWE pairs; a CVE can list several CWEs
+    cve_cwes = pd.DataFrame({'cve': cve_df['cve'].astype(object), 'cwe': cve_df['cwe_id'].astype(object)}).dropna()
+    cve_cwes = cve_cwes.assign(cwe=cve_cwes['cwe'].map(CWE_PATTERN.findall)).explode('cwe').dropna()
+
+    # CWE -> mitigation pairs, one mitigation node per distinct description
+    catalog = cwe_catalog.drop_duplicates('CWE-ID')
+    cwe_mitigations = pd.DataFrame({
+        'cwe': catalog['CWE-ID'].astype(str),
+        'mitigation': catalog['Potential_Mitigations'].map(parse_mitigations),
+    }).explode('mitigation').dropna()
+
+    node_ids = {
+        'actor': matrix_values['actor_ids'],
+        'technique': matrix_values['technique_ids'],
+        'cve': matrix_values['cve_ids'],
+        'cwe': pd.Index(sorted(set(cve_cwes['cwe']) | set(cwe_mitigations['cwe']))),
+        'mitigation': pd.Index(sorted(cwe_mitigations['mitigation'].unique())),
+        'control': matrix_values['control_ids'],
+        'family': matrix_values['family_ids'],
+        'capability': matrix_values['capability_ids'],
+    }
+
+    adjacency = {
+        ('actor', 'technique'): matrix_values['actor_technique'],
+        ('technique', 'cve'): matrix_values['technique_cve'],
+        ('cve', 'cwe'): matrices.incidence_matrix(cve_cwes['cve'], cve_cwes['cwe'], node_ids['cve'], node_ids['cwe']),
+        ('cwe', 'mitigation'): matrices.incidence_matrix(
+            cwe_mitigations['cwe'], cwe_mitigations['mitigation'], node_ids['cwe'], node_ids['mitigation']
+        ),
+        ('technique', 'control'): matrix_values['technique_control'],
+        ('control', 'family'): matrix_values['control_family'],
+        ('technique', 'capability'): matrix_values['technique_capability'],
+    }
+    for (source, target), matrix in list(adjacency.items()):
+        adjacency[target, source] = matrix.T.tocsr()
+
+    return {'nodes': node_ids, 'edges': adjacency}
+
+
+def node_mask(node_type, labels=None):
+    """Boolean frontier over a node type: the given labels (unknown ones ignored), or every node."""
+    ids = get_graph()[0][node_type]
+    if labels is None:
+        return np.ones(len(ids), dtype=bool)
+    mask = np.zeros(len(ids), dtype=bool)
+    codes = ids.get_indexer(list(labels))
+    mask[codes[codes >= 0]] = True
+    return mask
+
+
+def hop(frontier, source, target):
+    """Nodes of the target type adjacent to any node of the frontier (a boolean mask over source)."""
+    # a CSR row slice per frontier node, then the union of their columns
+    matrix = edges[source, target]
+    reached = np.zeros(matrix.shape[1], dtype=bool)
+    rows = np.flatnonzero(frontier)
+    if len(rows):
+        reached[matrix[rows].indices] = True
+    return reached
+
+
+def check_path(path):
+    """Raises ValueError unless every consecutive pair of node types in path is an edge type."""
+    unknown = [node_type for node_type in path if node_type not in NODE_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown node types: {', '.join(unknown)}; use {', '.join(NODE_TYPES)}")
+    missing = [f'{source}->{target}' for source, target in zip(path, path[1:]) if (source, target) not in get_graph()[1]]
+    if missing:
+        raise ValueError(f"No edges for {', '.join(missing)}")
+
+
+def traverse(path, start=None):
+    """
+    Walks a path of node types (e.g. ['actor', 'technique', 'cve']) from the start labels of
+    its first type (every node when None) and returns the labels reached at its last type.
+    """
+    check_path(path)
+    frontier = node_mask(path[0], start)
+    for source, target in zip(path, path[1:]):
+        frontier = hop(frontier, source, target)
+    return nodes[path[-1]][frontier].tolist()
+
+
+def reach(path):
+    """Sparse first type x last type matrix of path counts along a path of node types."""
+    check_path(path)
+    matrix = edges[path[0], path[1]]
+    for source, target in zip(path[1:], path[2:]):
+        matrix = matrix @ edges[source, target]
+    return matrix.tocsr()
+
+
+def actors_exploiting_unmitigated_cwes():
+    """
+    Returns the actors whose techniques exploit CVEs whose CWE has no potential mitigation,
+    with those CVEs and CWEs, most CVEs first. CVEs NVD only classifies with a placeholder
+    (NVD-CWE-noinfo, NVD-CWE-Other) are listed apart, as unclassified_cves.
+    """
+    get_graph()
+    placeholder = np.asarray(nodes['cwe'].str.startswith(PLACEHOLDER_CWE_PREFIX), dtype=bool)
+    unmitigated = (np.diff(edges['cwe', 'mitigation'].indptr) == 0) & ~placeholder
+    exposed_cves = hop(unmitigated, 'cwe', 'cve')
+    unclassified_cves = hop(placeholder, 'cwe', 'cve')
+
+    actor_cve = (reach(['actor', 'technique', 'cve']) > 0).tocsr()
+    actor_cve = actor_cve.multiply(exposed_cves | unclassified_cves).tocsr()
+    actor_cve.eliminate_zeros()
+
+    records = []
+    for position in np.flatnonzero(np.diff(actor_cve.indptr)):
+        reached = actor_cve[position].indices
+        cves = reached[exposed_cves[reached]]
+        cve_frontier = np.zeros(len(nodes['cve']), dtype=bool)
+        cve_frontier[cves] = True
+        cwes = hop(cve_frontier, 'cve', 'cwe') & unmitigated
+        records.append({
+            'actor': nodes['actor'][position],
+            'cves': nodes['cve'][cves].tolist(),
+            'unmitigated_cwes': nodes['cwe'][cwes].tolist(),
+            'unclassified_cves': nodes['cve'][reached[unclassified_cves[reached]]].tolist(),
+        })
+    return sorted(records, key=lambda record: (-len(record['cves']), -len(record['unclassified_cves']), record['actor']))
+
+
+def top_controls(k=10):
+    """
+    Greedily picks the k NIST controls that cut the most actor-technique edges: a technique's
+    edges are cut once any picked control mitigates it, so each pick counts only the edges
+    the earlier picks left. Returns the controls in pick order with the edges each one adds.
+    """
+    get_graph()
+    # actor-technique edges still standing per technique
+    remaining = np.diff(edges['technique', 'actor'].indptr).astype(np.int64)
+    total = int(remaining.sum())
+    technique_control = edges['technique', 'control']
+    control_technique = edges['control', 'technique']
+
+    picks = []
+    cut = 0
+    for _ in range(min(k, len(nodes['control']))):
+        gains = technique_control.T @ remaining
+        best = int(np.argmax(gains))
+        if gains[best] == 0:
+            break
+        covered = control_technique[best].indices
+        cut += int(gains[best])
+        picks.append({
+            'control': nodes['control'][best],
+            'edges_cut': int(gains[best]),
+            'techniques_cut': int(np.count_nonzero(remaining[covered])),
+            'cumulative_edges_cut': cut,
+            'cumulative_ratio': cut / total if total else 0.0,
+        })
+        remaining[covered] = 0
+    return picks
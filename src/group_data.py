@@ -1,6 +1,9 @@
 import pandas as pd
 from mitreattack.stix20 import MitreAttackData
 from pathlib import Path
+import sql_backend
+import memory
+import aliases
 
 base_path = Path(__file__).resolve().parent.parent
 
@@ -12,97 +15,163 @@ complexity_df = None
 tech_wo_mit = None
 
 
-def load_data():
+def load_complexity_data():
     """
-    Loads both group techniques data and incidents data if they haven't been loaded already.
+    Loads the technique complexity scores.
     """
-    global cached_data, incidents_data, incident_counts, complexity_df, tech_wo_mit
+    if memory.compact:
+        # leave the long free-text columns, which no chart shows, on disk
+        complexity_df = pd.read_csv(base_path / 'data/techniques_with_complexity_scores.csv',
+                                    usecols=lambda column: column not in memory.TEXT_COLUMNS)
+    else:
+        complexity_df = pd.read_csv(base_path / 'data/techniques_with_complexity_scores.csv')
+    return memory.compact_frame(complexity_df, 'complexity')
 
 
+def load_techniques_wo_mitigations():
+    """
+    Loads the list of techniques that have no MITRE mitigation.
+    """
+    return pd.read_csv(base_path / 'data/techniques_without_mitigations.csv', header=None, names=['Technique'])
+
+
+def find_techniques_without_mitigations(attack_data):
+    """
+    Returns the ATT&CK IDs of the techniques no 'mitigates' relationship targets, given the parsed enterprise-attack.json.
+    """
+    objects = attack_data['objects']
+
+    # Techniques (attack-patterns) targeted by at least one mitigation
+    mitigated = {
+        obj['target_ref'] for obj in objects
+        if obj['type'] == 'relationship' and obj.get('relationship_type') == 'mitigates'
+    }
+
+    techniques = []
+    for obj in objects:
+        if obj['type'] == 'attack-pattern' and obj['id'] not in mitigated:
+            # Get the MITRE technique ID from external_references where the source_name is 'mitre-attack'
+            technique_id = next((ref['external_id'] for ref in obj.get('external_references', []) if ref['source_name'] == 'mitre-attack'), None)
+            if technique_id:
+                techniques.append(technique_id)
+    return pd.DataFrame({'techniques': techniques})
+
+
+def count_incidents(incidents_data):
+    """
+    Counts the incidents of every actor and min-max normalizes the counts into a frequency score.
+    """
+    if sql_backend.enabled:
+        # incidents stay in the database, only the per-actor counts are kept in memory
+        incident_counts = sql_backend.query(f"SELECT actor, COUNT(*) AS incident_count FROM {sql_backend.resolve_table('incidents')} GROUP BY actor ORDER BY actor")
+    else:
+        incident_counts = incidents_data.groupby('actor', observed=True).size().reset_index(name='incident_count')
+    return score_incident_counts(incident_counts)
 
-    complexity_df = pd.read_csv(base_path / 'data/techniques_with_complexity_scores.csv')
-    tech_wo_mit = pd.read_csv(base_path / 'data/techniques_without_mitigations.csv', header=None, names=['Technique'])
-    
 
-    incidents_data = load_group_incidents()  # Cache the processed incidents data for future calls
-    incident_counts = incidents_data.groupby('actor').size().reset_index(name='incident_count')
+def score_incident_counts(incident_counts):
+    """
+    Adds the frequency score column: the incident counts min-max normalized into 0.01-1.
+    """
     # Step 2: Calculate min and max incident counts across all actors
     min_incidents = incident_counts['incident_count'].min()
     max_incidents = incident_counts['incident_count'].max()
 
     # Step 3: Apply the linear transformation to get the score for each actor
     incident_counts['score'] = 0.01+((incident_counts['incident_count'] - min_incidents) / (max_incidents - min_incidents))*(1-0.01)
+    return incident_counts
 
-        
-    cached_data = load_group_data()  # Cache the processed group data for future calls
-    
 
-def get_group_name(group_id, df):
+def ingest_group_data(groups):
     """
-    Retrieves the group name given the group ID from the group mapping DataFrame.
+    Writes the group -> TTP lists into the SQL backend, when it is enabled.
     """
-    result = df.loc[df['id'] == group_id, 'name']
-    return result.iloc[0] if not result.empty else None
+    if sql_backend.enabled:
+        sql_backend.ingest('group_ttps', pd.DataFrame(
+            [(group, position, ttp) for group, ttps in groups.items() for position, ttp in enumerate(ttps)],
+            columns=['actor', 'position', 'ttp']
+        ), indexes=['actor'])
+    
 
-def load_group_data():
+def load_group_data(alias_index=None):
     """
     Loads the techniques used by threat actor groups from MITRE ATT&CK and returns a mapping of group ID to TTP list.
+    Raises if the ATT&CK bundle can't be read.
     """
-    try:
-        mitre_attack_data = MitreAttackData(str(base_path / 'data/enterprise-attack.json'))
-        group_mapping = pd.read_csv(base_path / 'data/threat_actor_groups_aliases.csv')
-
-        # Get the data of techniques used by all the groups
-        technique_using_groups = mitre_attack_data.get_all_techniques_used_by_all_groups()
+    mitre_attack_data = MitreAttackData(str(base_path / 'data/enterprise-attack.json'))
 
-        # Extracting techniques used by a group
-        groups_list = {}
-        for id, technique in technique_using_groups.items():
-            group_id = get_group_name(mitre_attack_data.get_attack_id(id), group_mapping)
-            if group_id is None:
-                continue
-            ttp_list = [t['object'].external_references[0].external_id for t in technique]
-            groups_list[group_id] = ttp_list
+    # Get the data of techniques used by all the groups
+    technique_using_groups = mitre_attack_data.get_all_techniques_used_by_all_groups()
 
-        return groups_list  # Return the populated groups_list
+    # Extracting techniques used by a group
+    groups_list = {}
+    for id, technique in technique_using_groups.items():
+        group_id = aliases.get_group_name(mitre_attack_data.get_attack_id(id), alias_index)
+        if group_id is None:
+            continue
+        ttp_list = [t['object'].external_references[0].external_id for t in technique]
+        groups_list[group_id] = ttp_list
 
-    except Exception as e:
-        print(f"Error loading group data: {e}")
-        return {}
+    return groups_list  # Return the populated groups_list
 
-def load_group_incidents():
+def load_group_incidents(alias_index=None):
     """
     Loads and returns the incident data from a CSV file, sorted by event date.
+    Actor aliases are mapped to their canonical group name.
+    With the SQL backend the file is streamed into the incidents table instead and None is returned.
+    Raises if the file can't be read.
     """
-    try:
-        df = pd.read_csv(base_path / 'data/ta_incidents.csv')
-        df['event_date'] = pd.to_datetime(df['event_date'])
-        df = df.sort_values('event_date')
-        return df
-    except Exception as e:
-        print(f"Error loading incidents data: {e}")
-        return pd.DataFrame()  # Return empty DataFrame on failure
+    if sql_backend.enabled:
+        if_exists = 'replace'
+        for chunk in pd.read_csv(base_path / 'data/ta_incidents.csv', chunksize=50000):
+            chunk['event_date'] = pd.to_datetime(chunk['event_date'])
+            chunk['actor'] = aliases.canonicalize(chunk['actor'], alias_index)
+            sql_backend.ingest('incidents', chunk, indexes=['actor', 'event_date'], if_exists=if_exists, index_label='file_row')
+            if_exists = 'append'
+        return None
+
+    df = pd.read_csv(base_path / 'data/ta_incidents.csv')
+    df['event_date'] = pd.to_datetime(df['event_date'])
+    df['actor'] = aliases.canonicalize(df['actor'], alias_index)
+    df = df.sort_values('event_date', kind='stable')
+    return df
     
 
-def get_ttps_of_group(group_id):
+def get_ttps_of_group(group_id, groups=None):
     """
-    Retrieves the list of TTPs for a given group ID.
+    Retrieves the list of TTPs for a given group ID (from groups when given, e.g. a reload's rebuilt data).
     """
     global cached_data
 
+    if sql_backend.enabled:
+        return sql_backend.query(f"SELECT ttp FROM {sql_backend.resolve_table('group_ttps')} WHERE actor = ? ORDER BY position", (group_id,))['ttp'].tolist()
+
+    groups = cached_data if groups is None else groups
     # Check if the group ID is in the cached data
-    if group_id in cached_data:
-        return cached_data[group_id]
+    if group_id in groups:
+        return groups[group_id]
     else:
         # Return an empty list instead of a string when the group is not found
         return []
 
-def get_all_groups():
+def get_all_groups(groups=None):
     """
     Returns a list of all group IDs.
     """
     global cached_data
-    return list(cached_data.keys())
+    if sql_backend.enabled:
+        return sql_backend.query(f"SELECT actor FROM {sql_backend.resolve_table('group_ttps')} GROUP BY actor ORDER BY MIN(rowid)")['actor'].tolist()
+    return list((cached_data if groups is None else groups).keys())
+
+
+def has_group(group_id):
+    """
+    Checks whether a group ID has techniques loaded.
+    """
+    global cached_data
+    if sql_backend.enabled:
+        return not sql_backend.query(f"SELECT 1 FROM {sql_backend.resolve_table('group_ttps')} WHERE actor = ? LIMIT 1", (group_id,)).empty
+    return group_id in cached_data
 
 
 def get_group_incidents(group_id):
@@ -110,18 +179,25 @@ def get_group_incidents(group_id):
     Retrieves incidents associated with a given group ID.
     """
     global incidents_data
+    if sql_backend.enabled:
+        df = sql_backend.query(
+            f"SELECT * FROM {sql_backend.resolve_table('incidents')} WHERE actor = ? ORDER BY event_date, file_row", (group_id,),
+            parse_dates=['event_date'], dtypes=sql_backend.get_dtypes('incidents')
+        )
+        return df.set_index('file_row').rename_axis(None)
     return incidents_data.loc[incidents_data['actor'] == group_id]
 
-def get_frequency_score(actor_name):
+def get_frequency_score(actor_name, counts=None):
     global incident_counts
+    counts = incident_counts if counts is None else counts
     # return incident_counts.at[incident_counts.index[incident_counts['actor'] == actor_name][0], 'score']
 
     # Filter for matching actors
-    matching_indices = incident_counts.index[incident_counts['actor'] == actor_name]
+    matching_indices = counts.index[counts['actor'] == actor_name]
 
     # Check if there are any matching indices
     if len(matching_indices) > 0:
-        return incident_counts.at[matching_indices[0], 'score']
+        return counts.at[matching_indices[0], 'score']
     else:
         #print(f"No matching rows for actor: {actor_name}")
         return 0  # Handle the case where no matches are found
@@ -131,12 +207,14 @@ def get_ttp_complexity_data():
     global complexity_df
     return complexity_df  
 
-def get_complexity_score(ttps):
+def get_complexity_score(ttps, complexity=None):
     global complexity_df
-    return complexity_df.loc[complexity_df["ID"].isin(ttps)]['complexity score'].mean()
+    complexity = complexity_df if complexity is None else complexity
+    return complexity.loc[complexity["ID"].isin(ttps)]['complexity score'].mean()
 
-def get_techniques_wo_mitigations(ttps):
+def get_techniques_wo_mitigations(ttps, techniques=None):
     global tech_wo_mit
-    matches = tech_wo_mit[tech_wo_mit["Technique"].isin(ttps)]
-    return len(matches) / len(tech_wo_mit)
+    techniques = tech_wo_mit if techniques is None else techniques
+    matches = techniques[techniques["Technique"].isin(ttps)]
+    return len(matches) / len(techniques)
     
\ No newline at end of file
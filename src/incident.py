@@ -1,6 +1,6 @@
 import pandas as pd
-# import re
-# import pycountry
+import re
+import pycountry
 import pycountry_convert as pc
 from pathlib import Path 
 
@@ -18,19 +18,14 @@ def load_actor_per_country_data():
     # Ensure that the file path is correct and relative to your setup
     return pd.read_csv(base_path /  'data/actors_per_country_filled_lat_lon.csv')
 
-'''
-def load_data():
-    """Load the Incident Data and cache it for reuse."""
-    
-    global cached_data
-    if cached_data is None:
-        cached_data = load_incident_data()  # Cache the processed data for future calls
-
-# Function to process incident data, accepting the path as an argument
 def load_incident_data():
-    """Load the Incident data from CSV files."""
+    """Load the raw Incident data from the CSV file and tag each incident with its target."""
     incident_df = pd.read_csv(base_path / 'data/cyber_operations_incidents.csv')  # Now using the dynamic file path from main.py
+    return tag_incident_data(incident_df)
 
+# Function to tag each incident with the country, region or 'global' it targeted
+def tag_incident_data(incident_df):
+    """Add the 'Output' column: the targeted country, region, 'global' or 'Unknown'."""
     # Define the columns to check
     columns_to_check = ['Title', 'Victims']  # Replace with your actual column names
 
@@ -214,9 +209,6 @@ def load_incident_data():
             return 'Unknown'
 
     # Apply the function to each row
+    incident_df = incident_df.copy()
     incident_df['Output'] = incident_df.apply(process_row, axis=1)
-
-    # Save the updated DataFrame
-    # incident_df.to_csv('incident_list_processed.csv', index=False)
-
-'''
\ No newline at end of file
+    return incident_df
@@ -0,0 +1,195 @@
+# ingest.py
+import csv
+import io
+import json
+import os
+import threading
+import time
+import traceback
+from collections import Counter
+from pathlib import Path
+import pandas as pd
+import aliases
+import group_data
+import rescoring
+import snapshot
+import profile_cache
+import score_history
+
+base_path = Path(__file__).resolve().parent.parent
+
+# Drop folder tailed for new incidents (TAS_INGEST_DIR): JSON lines (*.jsonl) or CSV files (*.csv) with the
+# ta_incidents.csv columns, of which only 'actor' is required. Files may be added or appended to.
+drop_path = Path(os.environ.get('TAS_INGEST_DIR', base_path / 'data/incoming'))
+PATTERNS = ['*.jsonl', '*.csv']
+
+# Initialize variables for the tail position of every drop file (bytes read, CSV header, inode), the incidents
+# ingested from the drop folder per actor (re-applied on top of every reloaded incident count), the
+# running counts and the incident count table they were last synced with, and the report of the last batch
+offsets = {}
+ingested = Counter()
+counter = None
+counted = None
+last_ingest = None
+
+# Held while applying a batch; a reload of the incidents takes it too, so the two never interleave
+lock = threading.Lock()
+
+
+class IncidentCounter:
+    """
+    Per-actor incident counts with their running min and max, kept in O(1) per added incident
+    through a histogram of the counts (how many actors have each count).
+    """
+
+    def __init__(self, counts):
+        self.counts = dict(counts)
+        self.histogram = Counter(self.counts.values())
+        self.min = min(self.histogram, default=0)
+        self.max = max(self.histogram, default=0)
+
+    def add(self, actor):
+        old = self.counts.get(actor, 0)
+        new = old + 1
+        self.counts[actor] = new
+        self.histogram[new] += 1
+        if old:
+            self.histogram[old] -= 1
+            if not self.histogram[old]:
+                del self.histogram[old]
+                if old == self.min:
+                    self.min = new  # this actor was the last one at the minimum
+        else:
+            self.min = 1
+        self.max = max(self.max, new)
+
+    def table(self):
+        """The counts as a group_data.incident_counts table, frequency scores included."""
+        actors = sorted(self.counts)
+        incident_counts = pd.DataFrame({'actor': actors, 'incident_count': [self.counts[actor] for actor in actors]})
+        return group_data.score_incident_counts(incident_counts)
+
+
+def merge_ingested(incident_counts):
+    """
+    Adds the incidents ingested so far to freshly loaded incident counts, so a reload of
+    ta_incidents.csv keeps them. Returns the counts unchanged when nothing was ingested.
+    """
+    if not ingested:
+        return incident_counts
+    counts = Counter(dict(zip(incident_counts['actor'].astype(object), incident_counts['incident_count'])))
+    counts.update(ingested)
+    return IncidentCounter(counts).table()
+
+
+def read_new_lines(path):
+    """Returns the complete lines appended to a drop file since the last read, and advances its offset."""
+    position, header, _ = offsets.get(path, (0, None, None))
+    with open(path, 'rb') as f:
+        inode = os.fstat(f.fileno()).st_ino
+        f.seek(position)
+        data = f.read()
+    end = data.rfind(b'\n') + 1  # a line still being written is read on the next poll
+    if end == 0:
+        return header, []
+    lines = data[:end].decode('utf-8').splitlines()
+    if path.suffix == '.csv' and header is None:
+        header, lines = next(csv.reader([lines[0]])), lines[1:]
+    offsets[path] = (position + end, header, inode)
+    return header, lines
+
+
+def parse_lines(path, header, lines):
+    """Returns the actor of every incident in the lines of a drop file; malformed lines are skipped."""
+    if path.suffix == '.csv':
+        records = csv.DictReader(io.StringIO('\n'.join(lines)), fieldnames=header)
+    else:
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                print(f'Skipping malformed incident in {path.name}: {line[:80]}')
+    return [record['actor'].strip() for record in records if isinstance(record, dict) and (record.get('actor') or '').strip()]
+
+
+def collect(folder=None):
+    """Returns the actors (canonical group names where known) of the incidents added to the drop folder since the last poll."""
+    folder = Path(folder or drop_path)
+    if not folder.is_dir():
+        return []
+    actors = []
+    for path in sorted(path for pattern in PATTERNS for path in folder.glob(pattern)):
+        stat = path.stat()
+        position, _, inode = offsets.get(path, (0, None, None))
+        if stat.st_size < position or (inode is not None and stat.st_ino != inode):
+            # truncated, or replaced by a new file (e.g. rotated): read it again from the start
+            offsets.pop(path)
+            position = 0
+        if stat.st_size > position:
+            actors.extend(parse_lines(path, *read_new_lines(path)))
+    return [aliases.resolve(actor, fuzzy=False) or actor for actor in actors]
+
+
+def apply_incidents(actors):
+    """
+    Counts new incidents in O(1) each, then publishes the new incident counts together with
+    the rescored frequency components and drops the cached profiles of the actors whose score
+    moved: the new incidents' actors, or everyone when the count range (the min-max
+    normalization) moved. Returns the rescoring report.
+    """
+    global counter, counted, last_ingest
+    with lock:
+        if counted is not group_data.incident_counts:
+            # first batch, or the incidents were reloaded since the last one
+            counter = IncidentCounter(zip(group_data.incident_counts['actor'].astype(object), group_data.incident_counts['incident_count']))
+        old_range = (counter.min, counter.max)
+        for actor in actors:
+            counter.add(actor)
+            ingested[actor] += 1
+        new_range = (counter.min, counter.max)
+
+        incident_counts = counter.table()
+        shifted = old_range != new_range
+        scores, report = rescoring.update_frequency(incident_counts, None if shifted else set(actors))
+        report['full'] = f'incident count range moved from {old_range} to {new_range}' if shifted else None
+        report['ingested'] = len(actors)
+        snapshot.publish({
+            group_data: {'incident_counts': incident_counts},
+            rescoring: {'scores': scores, 'last_changes': report},
+        })
+        counted = incident_counts
+        last_ingest = report
+    score_history.record(scores.loc[[row['actor'] for row in report['moved']]])
+
+    if shifted:
+        profile_cache.clear()
+    else:
+        profile_cache.invalidate(set(actors))
+    return report
+
+
+def poll(folder=None):
+    actors = collect(folder)
+    if actors:
+        return apply_incidents(actors)
+    return None
+
+
+def watch(interval):
+    while True:
+        try:
+            report = poll()
+            if report is not None:
+                print(f"Ingested {report['ingested']} incidents, {len(report['moved'])} scores moved (data version {snapshot.get_version()})")
+        except Exception:
+            print('Incident ingestion failed:')
+            traceback.print_exc()
+        time.sleep(interval)
+
+
+def start_ingest(interval=2.0):
+    """Starts tailing the drop folder for new incidents in a daemon thread."""
+    thread = threading.Thread(target=watch, args=(interval,), name='incident-ingest', daemon=True)
+    thread.start()
+    return thread
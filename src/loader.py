@@ -0,0 +1,104 @@
+# loader.py
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Worker threads for loading (TAS_LOAD_JOBS); the loaders are mostly file parsing and
+# pandas work, which releases the GIL for long stretches
+jobs = int(os.environ.get('TAS_LOAD_JOBS', '0')) or None
+
+# Per-step results of the last startup load
+last_load = None
+
+
+def run_step(name, step, state):
+    start = time.perf_counter()
+    try:
+        updates = step(state)
+    except Exception as e:
+        return {'step': name, 'status': 'failed', 'error': repr(e), 'traceback': traceback.format_exc(),
+                'seconds': time.perf_counter() - start}
+    return {'step': name, 'status': 'loaded', 'updates': updates, 'seconds': time.perf_counter() - start}
+
+
+def run_steps(steps, dependencies, names, state=None, max_workers=None):
+    """
+    Runs the named steps (step(state) -> {module: {global: value}}) on a thread pool, each as soon as
+    the steps it depends on (among names) are done, and merges their updates into state.
+    A failed step skips everything downstream of it. Returns (state, per-step results in completion order).
+    """
+    state = {} if state is None else state
+    waiting = {name: set(dependencies.get(name, [])) & set(names) for name in names}
+    finished = {}
+    results = []
+
+    with ThreadPoolExecutor(max_workers=max_workers or jobs, thread_name_prefix='loader') as pool:
+        running = {}
+        while waiting or running:
+            for name, upstream in list(waiting.items()):
+                if not upstream <= finished.keys():
+                    continue
+                del waiting[name]
+                blocked = [dep for dep in upstream if finished[dep] != 'loaded']
+                if blocked:
+                    finished[name] = 'skipped'
+                    results.append({'step': name, 'status': 'skipped', 'error': f"{', '.join(blocked)} did not load", 'seconds': 0.0})
+                else:
+                    running[pool.submit(run_step, name, steps[name], state)] = name
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                finished[running.pop(future)] = result['status']
+                # merged here, on the scheduling thread, before any dependent step is submitted
+                for module, values in result.pop('updates', {}).items():
+                    state.setdefault(module, {}).update(values)
+                results.append(result)
+    return state, results
+
+
+def raise_failures(results):
+    failures = [result for result in results if result['status'] == 'failed']
+    if failures:
+        details = '\n'.join(f"{result['step']}: {result['error']}\n{result['traceback']}" for result in failures)
+        raise RuntimeError(f"Failed to load {', '.join(result['step'] for result in failures)}\n{details}")
+
+
+def print_report(results, elapsed):
+    """Prints one line per step, slowest first, and the wall time against the summed step time."""
+    for result in sorted(results, key=lambda r: r['seconds'], reverse=True):
+        line = f"{result['step']:<20} {result['status']:<8} {result['seconds']:8.2f}s"
+        if 'error' in result:
+            line += f"  {result['error']}"
+        print(line)
+    print(f"{'total':<20} {'':<8} {elapsed:8.2f}s (steps: {sum(r['seconds'] for r in results):.2f}s)")
+
+
+def load_all(max_workers=None, report=True):
+    """
+    Loads every dataset concurrently (the hot reloader's build steps, in dependency order),
+    publishes them as the first snapshot and scores every actor.
+    Raises RuntimeError naming each loader that failed; nothing is published then.
+    """
+    global last_load
+    import reloader
+    import rescoring
+    import snapshot
+
+    start = time.perf_counter()
+    state, results = run_steps(reloader.STEPS, reloader.DEPENDENCIES, list(reloader.STEPS), max_workers=max_workers)
+    if not any(result['status'] == 'failed' for result in results):
+        snapshot.publish(state)
+        score_start = time.perf_counter()
+        rescoring.load_data()
+        results.append({'step': 'scores', 'status': 'loaded', 'seconds': time.perf_counter() - score_start})
+
+    elapsed = time.perf_counter() - start
+    last_load = {'seconds': elapsed, 'steps': {result['step']: result['seconds'] for result in results}}
+    if report:
+        print_report(results, elapsed)
+    raise_failures(results)
+    return results
@@ -1,29 +1,60 @@
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory, stream_with_context
 from flask_cors import CORS
+import base64
+import os
+import analysis
 from dash import Dash, dcc, html, Input, Output, State
-from group_data import load_data as load_group_data, get_all_groups, get_ttps_of_group, get_group_incidents, get_frequency_score, get_techniques_wo_mitigations, get_complexity_score
-from analysis import create_severity_pie_chart, create_capability_pie_chart, create_nist_bar_chart, create_incidents_scatter_plot, create_attack_geo_plot, create_cvss_scatter_plot, create_ttp_complexity_bar_chart
-from veris_data import extract_veris_data, load_veris_data 
-from nist_data import extract_nist_data, load_nist_data
-from cvwe_data import extract_cvss_scores, load_cvss_data, extract_cwe_mitigations, load_cwe_mitigations
+from dash.exceptions import PreventUpdate
+from group_data import has_group, get_ttps_of_group
+from analysis import create_severity_pie_chart, create_capability_pie_chart, create_nist_bar_chart, create_incidents_scatter_plot, create_attack_geo_plot, create_cvss_scatter_plot, create_ttp_complexity_bar_chart, create_residual_risk_bar_chart, create_score_history_chart, finish_figure, figure_bytes
+from cvwe_data import extract_cvss_scores
 from incident import load_actor_per_country_data
-from scorer import get_score_for_threat_actor
+from exposure import get_exposure
+from similarity import get_similar_groups, get_similar_to_ttps
+from matrices import get_actors_using_technique, get_nist_family_counts
+from graph import traverse as traverse_graph, actors_exploiting_unmitigated_cwes, top_controls
+from aggregates import get_veris_data, get_nist_violations, get_ttp_complexity
+from memory import memory_report
+from aliases import resolve as resolve_group, slugify
+from search import search, get_options
+from rescoring import score_actor, get_last_changes, profile_scores
+from scoring_profiles import get_profiles as get_scoring_profiles, SECTORS, ACTOR_TYPES
+from cube import slice_counts, DIMENSIONS as CUBE_DIMENSIONS
+from czml import get_document as get_czml_document, iter_document as iter_czml_document
+from export import iter_export, FORMATS as EXPORT_FORMATS
+from navigator import get_layer as get_navigator_layer, layer_filename, METRICS as NAVIGATOR_METRICS
+from snapshot import read_consistent, consistent
+from loader import load_all
+from reloader import start_watcher
+from ingest import start_ingest
+from profile_cache import get_profile, get_stats as get_profile_cache_stats
+from score_history import get_trend as get_score_trend, summarize as summarize_score_trend
+from profiler import init_profiler
+from residual_risk import parse_control_ids, get_all_controls, rank_actors_by_residual_risk
 
 # Load the data before setting up the app
 #!!!!!!!! do not remove this section
-load_group_data()
-load_veris_data()
-load_nist_data()
-load_cvss_data()
-load_cwe_mitigations()
+# Independent datasets load concurrently; a loader that fails stops the startup with its error
+load_all()
+
+# Watch data/ and swap in rebuilt caches without a restart (TAS_HOT_RELOAD=0 to disable)
+if os.environ.get('TAS_HOT_RELOAD', '1') != '0':
+    start_watcher()
+
+# Tail the incident drop folder and fold new incidents into the scores as they arrive (TAS_INGEST=0 to disable)
+if os.environ.get('TAS_INGEST', '1') != '0':
+    start_ingest()
 
 # Create Flask app and integrate it with Dash
 server = Flask(__name__, static_folder='../public')
 CORS(server)
 
+# Per-request cProfile captures for requests carrying TAS_PROFILE_TOKEN (no hooks without it)
+init_profiler(server)
+
 app = Dash(__name__, server=server, 
            external_stylesheets=['https://codepen.io/chriddyp/pen/bWLwgP.css'], 
            suppress_callback_exceptions=True)
@@ -33,22 +64,283 @@ app = Dash(__name__, server=server,
 def serve_static_files(path):
     return send_from_directory('../public', path)
 
-# Flask API endpoint to serve threat actor data by country
+# Routes and callbacks reading the cached data are wrapped in @consistent (read_consistent),
+# so a hot reload publishing meanwhile never mixes old and new data in one response
+
+# Flask API endpoint to serve threat actor data by country, with each country's exposure score (?scoring_profile= for a business unit's profile;
+# ?profile= is the profiler's token, see profiler.py)
 @server.route('/actors_by_country', methods=['GET'])
+@consistent
 def get_actors_by_country():
+    profile = request.args.get('scoring_profile', 'default')
+    if profile not in get_scoring_profiles():
+        return jsonify({'error': f"Unknown scoring profile: {profile}; use {', '.join(get_scoring_profiles())}"}), 404
     actor_data = load_actor_per_country_data()  # Ensure the data is loaded from the incident.py module
+    # Exposure is computed for every country at once and cached per data version, see exposure.py
+    exposure = get_exposure(profile)
     data = [
         {
             'country': row['country'],
             'latitude': float(row['latitude']),
             'longitude': float(row['longitude']),
-            'actors': row['actor_list'].split(',') if pd.notna(row['actor_list']) else []
+            'actors': row['actor_list'].split(',') if pd.notna(row['actor_list']) else [],
+            **country_exposure(exposure, row['country']),
         }
         for _, row in actor_data.iterrows()
         if pd.notna(row['latitude']) and pd.notna(row['longitude'])
     ]
     return jsonify(data)
 
+def country_exposure(exposure, country):
+    # countries without incidents have no exposure
+    if country not in exposure.index:
+        return {'incident_count': 0, 'exposure': 0.0, 'mean_actor_score': 0.0, 'exposure_normalized': 0.0}
+    row = exposure.loc[country]
+    return {
+        'incident_count': int(row['incident_count']),
+        'exposure': float(row['exposure']),
+        'mean_actor_score': float(row['mean_actor_score']),
+        'exposure_normalized': float(row['exposure_normalized']),
+    }
+
+# Flask API endpoint to find the groups behaving most like a given group (or an ad-hoc TTP set)
+@server.route('/similar_groups', methods=['GET'])
+@server.route('/similar_groups/<group_name>', methods=['GET'])
+@consistent
+def get_similar_groups_api(group_name=None):
+    k = request.args.get('k', default=10, type=int)
+    if group_name is not None:
+        matching_group = match_group(group_name)
+        if matching_group is None:
+            return unknown_group_error(group_name)
+        similar = get_similar_groups(matching_group, k=k)
+    else:
+        ttps = [ttp.strip() for ttp in request.args.get('ttps', '').split(',') if ttp.strip()]
+        if not ttps:
+            return jsonify({'error': 'Provide a group name or a comma separated ttps parameter'}), 400
+        similar = get_similar_to_ttps(ttps, k=k)
+    return jsonify(similar.to_dict(orient='records'))
+
+# Flask API endpoint to list every group using a technique
+@server.route('/actors_using/<ttp>', methods=['GET'])
+@consistent
+def get_actors_using_technique_api(ttp):
+    return jsonify(get_actors_using_technique(ttp.upper()))
+
+# Flask API endpoint with the NIST family violation counts of every group
+@server.route('/nist_family_counts', methods=['GET'])
+@consistent
+def get_nist_family_counts_api():
+    counts = get_nist_family_counts()
+    return jsonify({actor: row[row > 0].to_dict() for actor, row in counts.iterrows()})
+
+# Flask API endpoint walking the threat graph along a path of node types,
+# e.g. /graph/query?path=actor,technique,cve,cwe&start=APT28
+@server.route('/graph/query', methods=['GET'])
+@consistent
+def graph_query_api():
+    path = [node_type.strip() for node_type in request.args.get('path', '').split(',') if node_type.strip()]
+    if len(path) < 2:
+        return jsonify({'error': 'Provide a comma separated path of at least two node types'}), 400
+    start = request.args.getlist('start') or None
+    try:
+        reached = traverse_graph(path, start)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(reached)
+
+# Flask API endpoint with the actors exploiting CVEs whose CWEs have no potential mitigation (and their CVEs without a classified CWE)
+@server.route('/graph/unmitigated_actors', methods=['GET'])
+@consistent
+def get_unmitigated_actors_api():
+    return jsonify(actors_exploiting_unmitigated_cwes())
+
+# Flask API endpoint with the NIST controls that would cut the most actor-technique edges
+@server.route('/graph/top_controls', methods=['GET'])
+@consistent
+def get_top_controls_api():
+    k = request.args.get('k', default=10, type=int)
+    return jsonify(top_controls(k))
+
+# Flask API endpoint to re-rank all groups by the techniques left uncovered by implemented NIST controls
+@server.route('/residual_risk', methods=['GET', 'POST'])
+@consistent
+def get_residual_risk_api():
+    if request.method == 'POST':
+        # A JSON list of controls, an object with a "controls" list or string, or a plain text body
+        payload = request.get_json(silent=True)
+        if payload is None:
+            text = request.get_data(as_text=True)
+        else:
+            controls = payload.get('controls', []) if isinstance(payload, dict) else payload
+            if isinstance(controls, str):
+                text = controls
+            elif isinstance(controls, list) and all(isinstance(control, str) for control in controls):
+                text = ' '.join(controls)
+            else:
+                return jsonify({'error': 'controls must be a list of control ids or a string'}), 400
+        controls = parse_control_ids(text)
+    else:
+        controls = parse_control_ids(request.args.get('controls', ''))
+    return jsonify(rank_actors_by_residual_risk(controls).to_dict(orient='records'))
+
+# Flask API endpoint with the profile chart cache counters, coalesced concurrent requests included
+@server.route('/profile_cache_stats', methods=['GET'])
+def get_profile_cache_stats_api():
+    return jsonify(get_profile_cache_stats())
+
+# Flask API endpoint with the memory used by every cached dataset
+@server.route('/memory_report', methods=['GET'])
+@consistent
+def get_memory_report():
+    return jsonify(memory_report().to_dict(orient='records'))
+
+# Flask API endpoint for typeahead search over group names, aliases and actors
+@server.route('/search', methods=['GET'])
+@consistent
+def search_api():
+    limit = request.args.get('limit', default=10, type=int)
+    return jsonify(search(request.args.get('q', ''), limit=limit))
+
+# Flask API endpoint slicing the incident cube, e.g. /incident_counts?by=actor&industry=Finance&year=2023
+@server.route('/incident_counts', methods=['GET'])
+@consistent
+def get_incident_counts_api():
+    by = [dimension for dimension in request.args.get('by', 'actor').split(',') if dimension]
+    filters = {dimension: request.args.getlist(dimension) for dimension in CUBE_DIMENSIONS if dimension in request.args}
+    unknown = [dimension for dimension in by if dimension not in CUBE_DIMENSIONS]
+    if unknown:
+        return jsonify({'error': f"Unknown dimensions: {', '.join(unknown)}; use {', '.join(CUBE_DIMENSIONS)}"}), 400
+    counts = slice_counts(by, **filters)
+    return jsonify(counts.astype(object).to_dict(orient='records'))
+
+# Flask API endpoint with every actor's score and components, highest score first (?scoring_profile= for a business unit's profile;
+# ?profile= is the profiler's token, see profiler.py)
+@server.route('/scores', methods=['GET'])
+@consistent
+def get_scores_api():
+    profile = request.args.get('scoring_profile', 'default')
+    if profile not in get_scoring_profiles():
+        return jsonify({'error': f"Unknown scoring profile: {profile}; use {', '.join(get_scoring_profiles())}"}), 404
+    ranked = profile_scores(profile).sort_values('score', ascending=False).rename_axis('actor').reset_index()
+    return jsonify(ranked.astype(object).where(ranked.notna(), None).to_dict(orient='records'))
+
+# Flask API endpoint with a group's recorded scores over time, e.g. /score_history/APT29?since=2025-07-01
+@server.route('/score_history/<group_name>', methods=['GET'])
+@consistent
+def get_score_history_api(group_name):
+    matching_group = match_group(group_name)
+    if matching_group is None:
+        return unknown_group_error(group_name)
+    try:
+        history = get_score_trend(matching_group, request.args.get('since'), request.args.get('until'))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid date: {e}'}), 400
+    points = history.assign(recorded_at=history['recorded_at'].map(lambda timestamp: timestamp.isoformat()))
+    return jsonify({
+        'group': matching_group,
+        'summary': summarize_score_trend(history),
+        'points': points.astype(object).where(points.notna(), None).to_dict(orient='records'),
+    })
+
+# Flask API endpoint listing the scoring profiles with their sector and actor type scores
+@server.route('/scoring_profiles', methods=['GET'])
+@consistent
+def get_scoring_profiles_api():
+    return jsonify([
+        {
+            'name': profile.name,
+            'description': profile.description,
+            'sectors': dict(zip(SECTORS, profile.sector_scores.tolist())),
+            'actor_types': dict(zip(ACTOR_TYPES, profile.actor_type_scores.tolist())),
+        }
+        for profile in get_scoring_profiles().values()
+    ])
+
+# Flask API endpoint reporting which scores the last data reload moved, and by how much
+@server.route('/score_changes', methods=['GET'])
+def get_score_changes_api():
+    return jsonify(get_last_changes() or {})
+
+# Flask API endpoint streaming full actor profiles, e.g. /export?format=parquet&actor=APT28
+@server.route('/export', methods=['GET'])
+@consistent
+def export_api():
+    export_format = request.args.get('format', 'jsonl')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unknown format: {export_format}; use {', '.join(EXPORT_FORMATS)}"}), 400
+    actors = None
+    if 'actor' in request.args:
+        actors = [match_group(name) for name in request.args.getlist('actor')]
+        unknown = [name for name, actor in zip(request.args.getlist('actor'), actors) if actor is None]
+        if unknown:
+            suggestions = {name: suggest_group(name) for name in unknown if suggest_group(name) is not None}
+            return jsonify({'error': f"Unknown groups: {', '.join(unknown)}", 'suggestions': suggestions}), 404
+    # Records are generated while the response is sent, one actor (or Parquet row group) at a time
+    response = Response(stream_with_context(iter_export(export_format, actors)), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename=actor_profiles.{export_format}'
+    return response
+
+# Flask API endpoint streaming the time-dynamic CZML incident document for the Cesium globe
+@server.route('/czml', methods=['GET'])
+def czml_api():
+    version, parts = read_consistent(get_czml_document)
+    if request.if_none_match.contains(f'czml-{version}'):
+        return Response(status=304)
+    response = Response(stream_with_context(iter_czml_document(parts)), mimetype='application/json')
+    response.set_etag(f'czml-{version}')
+    return response
+
+# Flask API endpoint with the CZML version and number of parts, for clients loading the document part by part
+@server.route('/czml/parts', methods=['GET'])
+def czml_parts_api():
+    version, parts = read_consistent(get_czml_document)
+    return jsonify({'version': version, 'parts': len(parts)})
+
+# Flask API endpoint serving one CZML part (the first one carries the document packet and clock);
+# ?version= (from /czml/parts) gets a 409 once the document was rebuilt, so parts of two builds are never mixed
+@server.route('/czml/<int:part>', methods=['GET'])
+def czml_part_api(part):
+    version, parts = read_consistent(get_czml_document)
+    requested = request.args.get('version')
+    if requested is not None and requested != version:
+        return jsonify({'error': f'CZML version {requested} was replaced, reload the parts', 'version': version}), 409
+    if part >= len(parts):
+        return jsonify({'error': f'Unknown part: {part}'}), 404
+    response = Response(parts[part], mimetype='application/json')
+    response.headers['X-CZML-Version'] = version
+    response.set_etag(f'czml-{version}-{part}')
+    return response.make_conditional(request)
+
+# Flask API endpoint serving a group's cached ATT&CK Navigator layer, e.g. /navigator/APT28?metric=severity
+@server.route('/navigator/<group_name>', methods=['GET'])
+@consistent
+def navigator_layer_api(group_name):
+    metric = request.args.get('metric', 'complexity')
+    if metric not in NAVIGATOR_METRICS:
+        return jsonify({'error': f"Unknown metric: {metric}; use {', '.join(NAVIGATOR_METRICS)}"}), 400
+    matching_group = match_group(group_name)
+    if matching_group is None:
+        return unknown_group_error(group_name)
+    digest, layer = get_navigator_layer(matching_group, metric)
+    if layer is None:
+        return unknown_group_error(group_name)
+    response = Response(layer, mimetype='application/json')
+    response.headers['Content-Disposition'] = f'attachment; filename={layer_filename(matching_group, metric)}'
+    response.set_etag(f'navigator-{digest}')
+    return response.make_conditional(request)
+
+# Flask API endpoint with the JSON payload size of every profile chart of a group (TAS_LEAN_FIGURES=1 for lean mode)
+@server.route('/figure_payload/<group_name>', methods=['GET'])
+@consistent
+def get_figure_payload_api(group_name):
+    matching_group = match_group(group_name)
+    if matching_group is None:
+        return unknown_group_error(group_name)
+    figures = build_profile_charts(f'/profile/{slugify(matching_group)}')
+    sizes = {chart_id: figure_bytes(figure) for chart_id, figure in zip(PROFILE_CHARTS, figures)}
+    return jsonify({'group': matching_group, 'lean': analysis.lean, 'figures': sizes, 'total': sum(sizes.values())})
+
 # Main page layout for the Dash app
 app.layout = html.Div([
     dcc.Location(id='url', refresh=False),  # This tracks the current URL
@@ -70,14 +362,15 @@ home_layout = html.Div(style={'fontFamily': 'Arial, sans-serif', 'margin': '5px'
     html.Div(style={'display': 'flex', 'justifyContent': 'space-between', 'alignItems': 'center', 'marginBottom': '5px'}, children=[
         dcc.Dropdown(
             id='group-id-dropdown',
-            # Sort the groups alphabetically
-            options=[{'label': group, 'value': group} for group in sorted(get_all_groups())],
-            placeholder='Select a Group ID',
+            # Options are filled from the search index as the user types
+            options=[],
+            placeholder='Search a group, alias or actor',
             style={'minWidth': '50%', 'marginRight': '10px'}
         ),
         html.Button('Submit', id='submit-button', n_clicks=0, style={
             'marginLeft': '10px', 'backgroundColor': '#4CAF50', 'color': 'white', 'cursor': 'pointer'
         }),
+        dcc.Link('Residual Risk', href='/residual-risk', style={'marginLeft': '10px'}),
     ]),
     html.Iframe(
         src='/public/index.html', 
@@ -93,6 +386,7 @@ def profile_layout(actor_name):
         html.H1(f'Threat Actor Profile: {actor_name}', style={'textAlign': 'center', 'color': '#4B0082'}),
 
         dcc.Graph(id='score-breakdown'),    # Attack Geo Plot
+        dcc.Graph(id='score-history'),      # Recorded scores over time
         
         
          dcc.Graph(id='attack-geo'),    # Attack Geo Plot
@@ -106,9 +400,40 @@ def profile_layout(actor_name):
         dcc.Graph(id='cvss-scatter'),      # CVE Scatter Plot
 
         dcc.Graph(id='nist-bar-chart'),
+
+        html.H3('Similar Threat Actors', style={'color': '#4B0082'}),
+        html.Div(id='similar-groups'),  # Groups with the most overlapping TTPs
         
     ])
 
+# Layout for a profile URL that matches no group, linking the closest group if there is one
+def unknown_group_layout(slug):
+    suggestion = suggest_group(slug)
+    return html.Div(style={'fontFamily': 'Arial, sans-serif', 'margin': '20px'}, children=[
+        html.H1(f"Unknown threat actor: {slug.replace('-', ' ')}", style={'textAlign': 'center', 'color': '#4B0082'}),
+        html.P(['Did you mean ', dcc.Link(suggestion, href=f'/profile/{slugify(suggestion)}'), '?'] if suggestion else 'No matching group.'),
+        dcc.Link('Back to search', href='/'),
+    ])
+
+# Residual risk layout: upload / toggle implemented NIST controls and re-rank every actor
+residual_risk_layout = html.Div(style={'fontFamily': 'Arial, sans-serif', 'margin': '20px'}, children=[
+    html.H1('Residual Risk by Implemented NIST Controls', style={'textAlign': 'center', 'color': '#4B0082'}),
+    dcc.Upload(
+        id='controls-upload',
+        children=html.Div(['Drop or ', html.A('select'), ' a file listing implemented controls (e.g. AC-2, SI-4)']),
+        style={'borderWidth': '1px', 'borderStyle': 'dashed', 'borderRadius': '5px', 'textAlign': 'center', 'padding': '10px', 'marginBottom': '10px'}
+    ),
+    dcc.Dropdown(
+        id='controls-dropdown',
+        # Options are filled from the loaded NIST mapping when the page opens, so reloads show up
+        options=[],
+        value=[],
+        multi=True,
+        placeholder='Implemented NIST 800-53 controls'
+    ),
+    dcc.Graph(id='residual-risk-bar-chart'),
+])
+
 '''GAUGE INDICATOR
     def create_gauge(value):
     fig = go.Figure(go.Indicator(
@@ -125,6 +450,45 @@ def profile_layout(actor_name):
     ))
     return fig'''
 
+def match_group(selected_group):
+    """
+    Resolves a group name, alias or URL slug to a loaded group through the alias index.
+    Only exact (normalized) matches count, so a typo never serves another group's data.
+    """
+    group = resolve_group(selected_group)
+    return group if group is not None and has_group(group) else None
+
+def suggest_group(name):
+    """
+    The loaded group closest to an unknown name (fuzzy alias match), or None.
+    """
+    group = resolve_group(name, fuzzy=True)
+    return group if group is not None and has_group(group) else None
+
+def unknown_group_error(name):
+    # 404 response for an unknown group, with the closest group as a suggestion when there is one
+    error = {'error': f'Unknown group: {name}'}
+    suggestion = suggest_group(name)
+    if suggestion is not None:
+        error['suggestion'] = suggestion
+    return jsonify(error), 404
+
+# Callback to fill the dropdown with the best matches for what the user typed
+@app.callback(
+    Output('group-id-dropdown', 'options'),
+    [Input('group-id-dropdown', 'search_value')],
+    [State('group-id-dropdown', 'value')]
+)
+@consistent
+def update_group_options(search_value, value):
+    if not search_value:
+        raise PreventUpdate
+    options = get_options(search_value)
+    # Keep the current selection among the options so it stays displayed
+    if value and all(option['value'] != value for option in options):
+        options.append({'label': value, 'value': value})
+    return options
+
 # Callback to update the URL when the "Submit" button is clicked
 @app.callback(
     Output('url', 'pathname'),
@@ -132,11 +496,10 @@ def profile_layout(actor_name):
     [State('group-id-dropdown', 'value')]
 )
 def redirect_to_profile(n_clicks, selected_group):
-    if n_clicks > 0 and selected_group:
-        # Normalize the group name by converting to lowercase and replacing spaces with hyphens
-        normalized_group = selected_group.lower().replace(' ', '-')
-        # Redirect to the profile page with normalized group name
-        return f'/profile/{normalized_group}'
+    # only groups have a profile page (actors only seen in incident data can't be selected)
+    if n_clicks > 0 and selected_group and match_group(selected_group) is not None:
+        # Redirect to the profile page with the group's URL slug
+        return f'/profile/{slugify(selected_group)}'
     return '/'  # Return home if no selection is made
 
 # Callback to handle page navigation and layout rendering
@@ -144,67 +507,54 @@ def redirect_to_profile(n_clicks, selected_group):
     Output('page-content', 'children'),
     [Input('url', 'pathname')]
 )
+@consistent
 def render_page_content(pathname):
     if pathname == '/':
         return home_layout
+    elif pathname == '/residual-risk':
+        return residual_risk_layout
     elif pathname.startswith('/profile/'):
-        # Normalize the URL path for comparison
-        selected_group = pathname.split('/')[-1].replace('-', ' ')
+        # Show the canonical group name when the slug resolves to one
+        slug = pathname.split('/')[-1]
+        selected_group = match_group(slug)
+        if selected_group is None:
+            return unknown_group_layout(slug)
         return profile_layout(selected_group)  # Render the profile layout
     else:
         return html.H1('404 Page Not Found')
 
+# Charts of a profile page, in the order update_charts returns them
+PROFILE_CHARTS = ['severity-pie-chart', 'capability-pie-chart', 'nist-bar-chart', 'incidents',
+                  'attack-geo', 'cvss-scatter', 'ttp-complexity-bar-chart', 'score-breakdown']
+
 # Separate callback to handle chart updates on profile pages
 @app.callback(
-    [Output('severity-pie-chart', 'figure'),
-     Output('capability-pie-chart', 'figure'),
-     Output('nist-bar-chart', 'figure'),
-     Output('incidents', 'figure'),
-     Output('attack-geo', 'figure'),
-     Output('cvss-scatter', 'figure'),
-     Output('ttp-complexity-bar-chart', 'figure'),
-     Output('score-breakdown', 'figure')],
+    [Output(chart_id, 'figure') for chart_id in PROFILE_CHARTS],
     [Input('url', 'pathname')]
 )
 
 def update_charts(pathname):
+    # Charts are cached per actor until data affecting it is published, see profile_cache.py
+    # (built with read_consistent, so a hot reload swapping the data meanwhile is retried)
+    matching_group = match_group(pathname.split('/')[-1]) if pathname.startswith('/profile/') else None
+    if matching_group is None:
+        return [go.Figure()] * len(PROFILE_CHARTS)
+    return get_profile(matching_group, build_profile_charts, pathname)
+
+def build_profile_charts(pathname):
     if pathname.startswith('/profile/'):
-        # Normalize the URL path to match against the data
-        selected_group = pathname.split('/')[-1].replace('-', ' ')
-
-        # Case-insensitive matching for group name
-        all_groups = get_all_groups()
-        matching_group = next((group for group in all_groups if group.lower() == selected_group.lower()), None)
+        # Resolve the URL slug (or any alias) to the canonical group name
+        matching_group = match_group(pathname.split('/')[-1])
 
         if matching_group:
             # Fetch data and create charts
             ttps = get_ttps_of_group(matching_group)
-            average_severity, severity_counts, capability_counts = extract_veris_data(ttps)
-
-
-
-            nist_violations = extract_nist_data(ttps)
+            # Per-actor aggregates are precomputed at load, see aggregates.py
+            average_severity, severity_counts, capability_counts = get_veris_data(matching_group)
+            nist_violations = get_nist_violations(matching_group)
             cvss_scores = extract_cvss_scores(ttps)
-            incident_data = get_group_incidents(matching_group)
-            cwe_mitigation_score = extract_cwe_mitigations(ttps)
-
-
-            complexity_score = get_complexity_score(ttps)
-            frequency_score = get_frequency_score(matching_group)
-            industry_mode = incident_data.groupby('industry')['industry']
-            actor_type_mode = incident_data.groupby('actor_type')['actor_type']
-            techniques = get_techniques_wo_mitigations(ttps)
-
-            score, score_df = get_score_for_threat_actor(
-                complexity_score,
-                average_severity,
-                cvss_scores,
-                frequency_score if frequency_score is not None else 0,  # Default to 0 if None
-                industry_mode,
-                actor_type_mode,
-                techniques,
-                cwe_mitigation_score,
-            )
+
+            score, score_df = score_actor(matching_group)
             score_fig = go.Figure(
                 go.Pie(
                     values=score_df['Weight'],
@@ -227,21 +577,93 @@ def update_charts(pathname):
                     showarrow=False
                 )]
             )
+            finish_figure(score_fig)
 
 
             severity_fig = create_severity_pie_chart(severity_counts)
             capability_fig = create_capability_pie_chart(capability_counts)
             nist_fig = create_nist_bar_chart(nist_violations)
-            incidents_fig = create_incidents_scatter_plot(matching_group, incident_data)
-            attack_geo_fig = create_attack_geo_plot(matching_group)
+            # Incident counts are sliced from the precomputed cube, see cube.py
+            incidents_fig = create_incidents_scatter_plot(slice_counts(['year', 'industry', 'motive'], actor=matching_group))
+            attack_geo_fig = create_attack_geo_plot(slice_counts(['country'], actor=matching_group))
             cvss_scores_fig = create_cvss_scatter_plot(cvss_scores)
-            ttp_complexity = create_ttp_complexity_bar_chart(matching_group,get_ttps_of_group(matching_group))
+            ttp_complexity = create_ttp_complexity_bar_chart(matching_group, get_ttp_complexity(matching_group))
 
             return [severity_fig, capability_fig, nist_fig, incidents_fig, attack_geo_fig, cvss_scores_fig, ttp_complexity, score_fig]
 
     # Return empty figures if no group is selected
     return [go.Figure()] * 8
 
+# Score history chart, read from the history store on every visit (kept out of the profile cache,
+# as the store is written in the background)
+@app.callback(
+    Output('score-history', 'figure'),
+    [Input('url', 'pathname')]
+)
+@consistent
+def update_score_history(pathname):
+    matching_group = match_group(pathname.split('/')[-1]) if pathname.startswith('/profile/') else None
+    if matching_group is None:
+        return go.Figure()
+    return create_score_history_chart(get_score_trend(matching_group))
+
+# Callback to list the current NIST controls when the residual risk page opens
+@app.callback(
+    Output('controls-dropdown', 'options'),
+    [Input('url', 'pathname')]
+)
+@consistent
+def update_control_options(pathname):
+    if pathname != '/residual-risk':
+        raise PreventUpdate
+    return [{'label': control, 'value': control} for control in get_all_controls()]
+
+# Callback to load the implemented controls from an uploaded file
+@app.callback(
+    Output('controls-dropdown', 'value'),
+    [Input('controls-upload', 'contents')],
+    [State('controls-dropdown', 'value')]
+)
+@consistent
+def load_uploaded_controls(contents, selected_controls):
+    if contents is None:
+        return selected_controls
+    # contents is a data URL: "data:<mime>;base64,<payload>"
+    text = base64.b64decode(contents.split(',', 1)[1]).decode('utf-8', errors='ignore')
+    known_controls = set(get_all_controls())
+    return [control for control in parse_control_ids(text) if control in known_controls]
+
+# Callback to re-rank the actors whenever the implemented controls change
+@app.callback(
+    Output('residual-risk-bar-chart', 'figure'),
+    [Input('controls-dropdown', 'value')]
+)
+@consistent
+def update_residual_risk(selected_controls):
+    return create_residual_risk_bar_chart(rank_actors_by_residual_risk(selected_controls or []))
+
+# Callback to list the most similar groups on profile pages
+@app.callback(
+    Output('similar-groups', 'children'),
+    [Input('url', 'pathname')]
+)
+def update_similar_groups(pathname):
+    return read_consistent(build_similar_groups, pathname)
+
+def build_similar_groups(pathname):
+    if pathname.startswith('/profile/'):
+        matching_group = match_group(pathname.split('/')[-1])
+        if matching_group:
+            similar = get_similar_groups(matching_group)
+            return html.Ul([
+                html.Li(dcc.Link(
+                    f"{row.group} ({row.similarity:.0%} Jaccard, {row.shared_ttps} shared TTPs)",
+                    href=f"/profile/{slugify(row.group)}"
+                ))
+                for row in similar.itertuples()
+            ])
+    return []
+
 
 if __name__ == '__main__':
     app.run_server(debug=True, port=8050)
@@ -0,0 +1,111 @@
+# matrices.py
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Stable integer IDs (position in a sorted pd.Index) for every entity type
+actor_ids = None
+technique_ids = None
+control_ids = None
+family_ids = None
+capability_ids = None
+cve_ids = None
+
+# Sparse 0/1 incidence matrices between the entity types
+actor_technique = None        # actors x techniques
+technique_actor = None        # techniques x actors (transposed copy for row slicing)
+technique_control = None      # techniques x NIST controls
+control_family = None         # NIST controls x NIST families
+technique_capability = None   # techniques x VERIS capabilities
+technique_cve = None          # techniques x CVEs
+
+
+def incidence_matrix(rows, cols, row_ids, col_ids):
+    """
+    Builds a CSR 0/1 matrix from two aligned label sequences, collapsing duplicate pairs.
+    """
+    row_codes = row_ids.get_indexer(rows)
+    col_codes = col_ids.get_indexer(cols)
+    keep = (row_codes >= 0) & (col_codes >= 0)
+    matrix = sparse.csr_matrix(
+        (np.ones(keep.sum(), dtype=np.int32), (row_codes[keep], col_codes[keep])),
+        shape=(len(row_ids), len(col_ids))
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+
+def build_matrices(groups, nist_df, veris_cache, cve_df):
+    """
+    Returns the entity ids and incidence matrices (by module global name) for the given data.
+    """
+    # Exploded actor x TTP pairs
+    actor_ttps = pd.DataFrame(
+        [(actor, ttp) for actor, ttps in groups.items() for ttp in ttps],
+        columns=['actor', 'ttp']
+    )
+
+    veris_df_action, veris_df_attribute = veris_cache
+
+    # VERIS actions lost their capability_id when merged with the impact table, rebuild one
+    veris_df_action = veris_df_action.dropna(subset=['attack_type'])
+    capabilities = pd.concat([
+        pd.DataFrame({
+            'attack_object_id': veris_df_action['attack_object_id'],
+            'capability': 'action.' + veris_df_action['capability_group'].astype(str) + '.' + veris_df_action['attack_type'].astype(str),
+        }),
+        pd.DataFrame({
+            'attack_object_id': veris_df_attribute['attack_object_id'],
+            'capability': veris_df_attribute['capability_id'],
+        }),
+    ], ignore_index=True)
+
+    actor_ids = pd.Index(sorted(groups.keys()))
+    technique_ids = pd.Index(sorted(
+        set(actor_ttps['ttp']) | set(nist_df['attack_object_id']) |
+        set(capabilities['attack_object_id']) | set(cve_df['attack_object_id'])
+    ))
+    control_ids = pd.Index(sorted(nist_df['capability_id'].unique()))
+    family_ids = pd.Index(sorted(nist_df['capability_group'].unique()))
+    capability_ids = pd.Index(sorted(capabilities['capability'].unique()))
+    cve_ids = pd.Index(sorted(cve_df['cve'].unique()))
+
+    actor_technique = incidence_matrix(actor_ttps['actor'], actor_ttps['ttp'], actor_ids, technique_ids)
+    technique_actor = actor_technique.T.tocsr()
+    technique_control = incidence_matrix(nist_df['attack_object_id'], nist_df['capability_id'], technique_ids, control_ids)
+    # every distinct (control, family) pair: a control can sit in two families (CM-05)
+    controls = nist_df[['capability_id', 'capability_group']].drop_duplicates()
+    control_family = incidence_matrix(controls['capability_id'], controls['capability_group'], control_ids, family_ids)
+    technique_capability = incidence_matrix(capabilities['attack_object_id'], capabilities['capability'], technique_ids, capability_ids)
+    technique_cve = incidence_matrix(cve_df['attack_object_id'], cve_df['cve'], technique_ids, cve_ids)
+
+    return {
+        'actor_ids': actor_ids, 'technique_ids': technique_ids, 'control_ids': control_ids,
+        'family_ids': family_ids, 'capability_ids': capability_ids, 'cve_ids': cve_ids,
+        'actor_technique': actor_technique, 'technique_actor': technique_actor,
+        'technique_control': technique_control, 'control_family': control_family,
+        'technique_capability': technique_capability, 'technique_cve': technique_cve,
+    }
+
+
+def get_actors_using_technique(ttp):
+    """
+    Returns the names of all actors using the given technique.
+    """
+    if ttp not in technique_ids:
+        return []
+    row = technique_actor[technique_ids.get_loc(ttp)]
+    return actor_ids[row.indices].tolist()
+
+
+def get_nist_family_counts(actors=None):
+    """
+    Returns a DataFrame (actors x NIST families) with the number of distinct controls
+    violated by each actor's techniques in every family. A control mapped to two families
+    counts in both, where aggregates.get_nist_violations counts it once, under its first mapping row's family.
+    """
+    actor_control = (actor_technique @ technique_control) > 0
+    counts = (actor_control.astype(np.int32) @ control_family).toarray()
+    df = pd.DataFrame(counts, index=actor_ids, columns=family_ids)
+    return df if actors is None else df.loc[actors]
@@ -0,0 +1,79 @@
+# memory.py
+import os
+import pandas as pd
+
+# Compact memory mode, enabled with TAS_COMPACT=1: repeated strings are stored as
+# categoricals and the long free-text technique columns are not loaded.
+compact = os.environ.get('TAS_COMPACT', '0') == '1'
+
+# Repeated string columns worth storing as categoricals, per dataset
+CATEGORICAL_COLUMNS = {
+    'incidents': ['actor', 'actor_type', 'industry', 'motive', 'event_type', 'event_subtype', 'country', 'actor_country'],
+    'complexity': ['tactics', 'platforms', 'is sub-technique', 'permissions required',
+                   'effective permissions', 'impact type', 'supports remote', 'defenses bypassed', 'data sources'],
+    'veris': ['capability_group', 'capability_id', 'capability_description', 'attack_object_id', 'attack_object_name', 'attack_type'],
+    'nist': ['capability_group', 'capability_id', 'capability_description', 'attack_object_id', 'attack_object_name', 'technology_domain'],
+    'ttp_complexity': ['actor', 'ID'],
+    'cve': ['year', 'capability_description', 'mapping_type', 'attack_object_id', 'attack_object_name', 'severity', 'cwe_id'],
+}
+
+# Free-text technique columns left out of the complexity data in compact mode
+TEXT_COLUMNS = ['description', 'detection', 'calculation logic']
+
+
+def compact_frame(df, dataset):
+    """
+    Converts the dataset's repeated string columns to categoricals when compact mode is on.
+    """
+    if not compact or df is None:
+        return df
+    columns = [column for column in CATEGORICAL_COLUMNS[dataset] if column in df.columns]
+    return df.astype({column: 'category' for column in columns})
+
+
+def get_datasets():
+    """
+    Returns the DataFrames currently cached by the data modules, by name.
+    """
+    import group_data
+    import veris_data
+    import nist_data
+    import cvwe_data
+    import aggregates
+
+    datasets = {
+        'group_data.incidents_data': group_data.incidents_data,
+        'group_data.incident_counts': group_data.incident_counts,
+        'group_data.complexity_df': group_data.complexity_df,
+        'group_data.tech_wo_mit': group_data.tech_wo_mit,
+        'nist_data.cached_data': nist_data.cached_data,
+        'cvwe_data.cached_data': cvwe_data.cached_data,
+        'cvwe_data.cve_with_scores': cvwe_data.cve_with_scores,
+        'cvwe_data.cwe_mitigations': cvwe_data.cwe_mitigations,
+        'aggregates.average_severity': aggregates.average_severity,
+        'aggregates.severity_counts': aggregates.severity_counts,
+        'aggregates.capability_counts': aggregates.capability_counts,
+        'aggregates.nist_violations': aggregates.nist_violations,
+        'aggregates.ttp_complexity': aggregates.ttp_complexity,
+        'aggregates.ttp_hover': aggregates.ttp_hover,
+    }
+    if veris_data.cached_data is not None:
+        datasets['veris_data.action'], datasets['veris_data.attribute'] = veris_data.cached_data
+    return {name: df for name, df in datasets.items() if isinstance(df, pd.DataFrame)}
+
+
+def memory_report():
+    """
+    Returns the rows, columns and deep memory usage of every cached dataset, largest first.
+    """
+    report = pd.DataFrame([
+        {
+            'dataset': name,
+            'rows': len(df),
+            'columns': len(df.columns),
+            'categorical_columns': int((df.dtypes == 'category').sum()),
+            'bytes': int(df.memory_usage(deep=True).sum()),
+        }
+        for name, df in get_datasets().items()
+    ], columns=['dataset', 'rows', 'columns', 'categorical_columns', 'bytes'])
+    return report.sort_values('bytes', ascending=False, ignore_index=True)
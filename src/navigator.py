@@ -0,0 +1,176 @@
+# navigator.py
+import argparse
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import group_data
+import aggregates
+from aliases import slugify
+
+base_path = Path(__file__).resolve().parent.parent
+
+# Where the batch run writes the layer library, one file per actor and metric
+library_path = base_path / 'data/navigator'
+
+# ATT&CK Navigator layer format the layers are written in
+VERSIONS = {'attack': '15', 'navigator': '5.0.0', 'layer': '4.5'}
+DOMAIN = 'enterprise-attack'
+
+# Technique scores a layer can be colored by: the complexity score (0-1) of the complexity
+# table, or the technique's average VERIS severity (0-10), with their gradients (low -> high)
+METRICS = {
+    'complexity': {
+        'label': 'complexity score',
+        'range': (0.0, 1.0),
+        'colors': ['#8ec843ff', '#ffe766ff', '#ff6666ff'],
+    },
+    'severity': {
+        'label': 'average VERIS severity',
+        'range': (0.0, 10.0),
+        'colors': ['#66b1ffff', '#ffe766ff', '#ff6666ff'],
+    },
+}
+
+# Initialize variables to cache the serialized layers ({metric: {actor: layer JSON}}) and a hash of each
+# ({metric: {actor: digest}}), which stays the same across restarts as long as the layer does
+layers = None
+digests = None
+
+
+def load_data():
+    """Builds the layer of every group for every metric and caches them serialized."""
+    globals().update(build_layers(group_data.cached_data, group_data.complexity_df, aggregates.average_severity))
+
+
+def get_layers():
+    """Returns {metric: {actor: layer JSON}}, building them on first use."""
+    if layers is None:
+        load_data()
+    return layers
+
+
+def get_layer(actor, metric='complexity'):
+    """Returns (digest, layer JSON) of one actor, (None, None) for an unknown actor."""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}; use {', '.join(METRICS)}")
+    current_layers = get_layers()
+    return digests[metric].get(actor), current_layers[metric].get(actor)
+
+
+def technique_tables(complexity_df, average_severity):
+    """Technique -> name, and technique -> score for every metric, looked up once for all actors."""
+    names = dict(zip(complexity_df['ID'].astype(object), complexity_df['name'].astype(object)))
+    complexity = complexity_df[['ID', 'complexity score']].dropna()
+    # average_severity repeats each technique's severity for every actor using it
+    severity = average_severity[['ttp', 'severity']].drop_duplicates('ttp').dropna()
+    scores = {
+        'complexity': dict(zip(complexity['ID'].astype(object), complexity['complexity score'].astype(float))),
+        'severity': dict(zip(severity['ttp'].astype(object), severity['severity'].astype(float))),
+    }
+    return names, scores
+
+
+def build_layer(actor, ttps, metric, names, scores):
+    """
+    Navigator layer of one actor: every technique it uses, scored (and so colored) by the
+    metric where the technique has a score, with parents of used sub-techniques expanded.
+    """
+    low, high = METRICS[metric]['range']
+    parents = {ttp.split('.')[0] for ttp in ttps if '.' in ttp}
+    techniques = []
+    for ttp in sorted(ttps):
+        technique = {'techniqueID': ttp, 'enabled': True, 'comment': names.get(ttp, '')}
+        if ttp in scores:
+            technique['score'] = round(scores[ttp], 2)
+        if ttp in parents:
+            technique['showSubtechniques'] = True
+        techniques.append(technique)
+
+    scored = [technique['score'] for technique in techniques if 'score' in technique]
+    return {
+        'name': f'{actor} ({metric})',
+        'versions': VERSIONS,
+        'domain': DOMAIN,
+        'description': f"Techniques used by {actor}, colored by {METRICS[metric]['label']}",
+        'sorting': 3,  # highest score first
+        'hideDisabled': False,
+        'techniques': techniques,
+        'gradient': {'colors': METRICS[metric]['colors'], 'minValue': low, 'maxValue': high},
+        'legendItems': [],
+        'metadata': [
+            {'name': 'techniques', 'value': str(len(techniques))},
+            {'name': f'mean {metric}', 'value': f'{sum(scored) / len(scored):.2f}' if scored else 'n/a'},
+        ],
+        'showTacticRowBackground': False,
+        'selectTechniquesAcrossTactics': True,
+        'selectSubtechniquesWithParent': False,
+    }
+
+
+def build_layers(groups, complexity_df, average_severity):
+    """Builds and serializes the layer of every group for every metric, with the hash of each."""
+    names, scores = technique_tables(complexity_df, average_severity)
+    built = {
+        metric: {
+            actor: json.dumps(build_layer(actor, ttps, metric, names, scores[metric]), separators=(',', ':'))
+            for actor, ttps in groups.items()
+        }
+        for metric in METRICS
+    }
+    return {
+        'layers': built,
+        'digests': {
+            metric: {actor: hashlib.sha256(layer.encode('utf-8')).hexdigest()[:16] for actor, layer in metric_layers.items()}
+            for metric, metric_layers in built.items()
+        },
+    }
+
+
+def layer_filename(actor, metric):
+    return f"{slugify(actor).replace('/', '_')}_{metric}.json"
+
+
+def write_library(directory=library_path, metrics=None, actors=None, jobs=None):
+    """
+    Writes the cached layers of the given actors (default: every group) for the given metrics
+    (default: all) into directory, one file per actor and metric, on a pool of writer threads.
+    Returns the paths written.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    current_layers = get_layers()
+
+    def write(item):
+        metric, actor = item
+        path = directory / layer_filename(actor, metric)
+        path.write_text(current_layers[metric][actor], encoding='utf-8')
+        return path
+
+    items = [
+        (metric, actor)
+        for metric in metrics or METRICS
+        for actor in (actors if actors is not None else current_layers[metric])
+    ]
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix='navigator') as pool:
+        return list(pool.map(write, items))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write an ATT&CK Navigator layer for every actor.')
+    parser.add_argument('actors', nargs='*', help='actors to write (default: every group)')
+    parser.add_argument('--metric', choices=list(METRICS), action='append', help='metric to color by (default: all)')
+    parser.add_argument('--output', '-o', default=library_path, help=f'output folder (default: {library_path})')
+    parser.add_argument('--jobs', type=int, default=None, help='number of parallel writer threads')
+    args = parser.parse_args()
+
+    from loader import load_all
+    load_all(report=False)
+    unknown = [actor for actor in args.actors if not group_data.has_group(actor)]
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(unknown)}")
+
+    start = time.perf_counter()
+    paths = write_library(args.output, args.metric, args.actors or None, args.jobs)
+    print(f'Wrote {len(paths)} layers to {args.output} in {time.perf_counter() - start:.2f}s')
@@ -1,5 +1,6 @@
 import pandas as pd
 from pathlib import Path 
+import memory
 
 base_path = Path(__file__).resolve().parent.parent
 
@@ -7,12 +8,9 @@ base_path = Path(__file__).resolve().parent.parent
 cached_data = None
 
 
-def load_data():
-    """Load the VERIS data and cache it for reuse."""
-    
-    global cached_data
-    if cached_data is None:
-        cached_data = load_nist_data()  # Cache the processed data for future calls
+def build_cache():
+    """Load the NIST mapping into its cached form without touching the module cache."""
+    return memory.compact_frame(load_nist_data(), 'nist')
 
 def load_nist_data():
     # nist data preprocessing and cleaning
@@ -30,20 +28,3 @@ def load_nist_data():
                                     'mapping_framework_version',
                                     'mapping_framework', 'Unnamed: 0'])
     return nist_df
-
-
-
-def extract_nist_data(ttps):
-
-    global cached_data
-    if cached_data is None:
-        cached_data = load_nist_data()
-
-    # get all nist violations by one technique(ttp)
-    nistviolations = cached_data.loc[cached_data['attack_object_id'].isin(ttps)].reset_index(drop=True)
-
-    # filter duplicates (ex. t1001 & 1002 both has access control violations AC02, but that is only one record)
-    nistviolations = nistviolations.drop_duplicates(subset=['capability_id'])
-    nistviolations = nistviolations.groupby('capability_group')['capability_id'].count().reset_index()
-
-    return nistviolations
\ No newline at end of file
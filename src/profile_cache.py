@@ -0,0 +1,112 @@
+# profile_cache.py
+import threading
+import snapshot
+
+# Initialize variables to cache the built profile charts, as actor -> (data version they were built from, charts),
+# and the oldest data version still valid for every actor (invalidated ones) and for all of them (last clear)
+entries = {}
+valid_from = {}
+cleared_at = 0
+
+# Profile computations in progress, by (actor, data version), that identical concurrent requests wait on
+flights = {}
+
+# Cache and coalescing counters since startup: requests served from the cache, computations
+# run, and requests that waited on another request's computation instead of running their own
+hits = 0
+misses = 0
+coalesced = 0
+
+lock = threading.Lock()
+
+
+class Flight:
+    """One in-progress profile computation and its outcome, shared by every request that joined it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+def is_valid(actor, version):
+    return version >= max(cleared_at, valid_from.get(actor, 0))
+
+
+def build_versioned(build, args):
+    # read inside read_consistent, so the version is the one the charts were built from
+    return snapshot.get_version(), build(*args)
+
+
+def get_profile(actor, build, *args):
+    """
+    Returns the actor's profile charts, build(*args), from the cache unless data affecting
+    the actor was published since they were built. Concurrent requests for the same actor
+    and data version share one computation (single flight).
+    """
+    global hits, misses, coalesced
+    key = (actor, snapshot.get_version())
+    with lock:
+        entry = entries.get(actor)
+        if entry is not None and is_valid(actor, entry[0]):
+            hits += 1
+            return entry[1]
+        flight = flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = flights[key] = Flight()
+            misses += 1
+        else:
+            flight.waiters += 1
+            coalesced += 1
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        version, charts = snapshot.read_consistent(build_versioned, build, args)
+        flight.result = charts
+        with lock:
+            # an invalidation may have landed while building; keep the charts only if they are still current
+            if is_valid(actor, version):
+                entries[actor] = (version, charts)
+        return charts
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with lock:
+            del flights[key]
+        flight.done.set()
+
+
+def invalidate(actors):
+    """Drops the cached profiles of the given actors; call after publishing the data that changed them."""
+    version = snapshot.get_version()
+    with lock:
+        for actor in actors:
+            valid_from[actor] = version
+            entries.pop(actor, None)
+
+
+def clear():
+    """Drops every cached profile; call after publishing a reload."""
+    global cleared_at
+    with lock:
+        cleared_at = snapshot.get_version()
+        valid_from.clear()
+        entries.clear()
+
+
+def get_stats():
+    """Cache hits, computations run, coalesced requests, and the cached actors and computations in progress."""
+    with lock:
+        return {
+            'hits': hits, 'misses': misses, 'coalesced': coalesced,
+            'cached': len(entries), 'in_flight': len(flights),
+            'waiting': sum(flight.waiters for flight in flights.values()),
+        }
@@ -0,0 +1,176 @@
+# profiler.py
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import re
+import threading
+import time
+from pathlib import Path
+from flask import g, request, jsonify, abort
+
+base_path = Path(__file__).resolve().parent.parent
+
+# Opt-in request profiling: only active when TAS_PROFILE_TOKEN is set, and then only for
+# requests carrying that token (X-Profile header, ?profile= parameter or tas_profile cookie)
+token = os.environ.get('TAS_PROFILE_TOKEN')
+profile_dir = Path(os.environ.get('TAS_PROFILE_DIR', base_path / 'data/profiles'))
+COOKIE_NAME = 'tas_profile'
+
+# cProfile profiles one thread; a second concurrent capture is skipped rather than queued
+capture_lock = threading.Lock()
+
+# Where the time goes, by the library the function lives in
+LIBRARIES = {
+    'pandas': f'{os.sep}pandas{os.sep}',
+    'numpy': f'{os.sep}numpy{os.sep}',
+    'plotly': f'{os.sep}plotly{os.sep}',
+    'dash': f'{os.sep}dash{os.sep}',
+    'flask': f'{os.sep}flask{os.sep}',
+    'scipy': f'{os.sep}scipy{os.sep}',
+    'app': str(Path(__file__).resolve().parent) + os.sep,
+}
+
+
+def has_token(value):
+    """Constant-time check of a supplied token."""
+    return token is not None and value is not None and hmac.compare_digest(value, token)
+
+
+def request_token():
+    return request.headers.get('X-Profile') or request.args.get('profile') or request.cookies.get(COOKIE_NAME)
+
+
+def capture_name():
+    """File name for a capture: time, then the route or the Dash callback outputs."""
+    name = request.endpoint or 'unknown'
+    if request.path.endswith('/_dash-update-component'):
+        payload = request.get_json(silent=True) or {}
+        name = str(payload.get('output', 'callback'))
+    name = re.sub(r'[^A-Za-z0-9_.-]+', '_', name)[:80].strip('_.')
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{name}"
+
+
+def start_capture():
+    if has_token(request_token()) and capture_lock.acquire(blocking=False):
+        g.profile = cProfile.Profile()
+        g.profile_start = time.perf_counter()
+        g.profile.enable()
+
+
+def stop_capture(response):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    try:
+        profile.disable()
+        elapsed = time.perf_counter() - g.pop('profile_start')
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        name = capture_name()
+        profile.dump_stats(profile_dir / f'{name}.prof')
+        with open(profile_dir / f'{name}.json', 'w') as f:
+            json.dump({'path': request.path, 'method': request.method, 'status': response.status_code, 'seconds': elapsed}, f)
+        response.headers['X-Profile-Capture'] = name
+    finally:
+        capture_lock.release()
+    return response
+
+
+def abandon_capture(exception):
+    # the request failed before after_request ran: stop profiling without writing anything
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.disable()
+        capture_lock.release()
+
+
+def library_of(filename):
+    for library, marker in LIBRARIES.items():
+        if marker in filename:
+            return library
+    return 'other'
+
+
+def summarize(name, top=20, sort='cumulative'):
+    """
+    Top-N functions of a capture (by cumulative or own time) and the own time spent in each library.
+    """
+    stats = pstats.Stats(str(profile_dir / f'{name}.prof'))
+    rows = []
+    libraries = {}
+    for (filename, line, function), (calls, total_calls, own_time, cumulative_time, _) in stats.stats.items():
+        library = library_of(filename)
+        libraries[library] = libraries.get(library, 0.0) + own_time
+        rows.append({
+            'function': function,
+            'location': f'{filename}:{line}',
+            'library': library,
+            'calls': total_calls,
+            'own_seconds': own_time,
+            'cumulative_seconds': cumulative_time,
+        })
+    rows.sort(key=lambda row: row['cumulative_seconds' if sort == 'cumulative' else 'own_seconds'], reverse=True)
+
+    metadata_path = profile_dir / f'{name}.json'
+    metadata = json.loads(metadata_path.read_text()) if metadata_path.exists() else {}
+    return {
+        **metadata,
+        'capture': name,
+        'total_seconds': stats.total_tt,
+        'libraries': dict(sorted(libraries.items(), key=lambda item: item[1], reverse=True)),
+        'top': rows[:top],
+    }
+
+
+def list_captures():
+    if not profile_dir.exists():
+        return []
+    return sorted((path.stem for path in profile_dir.glob('*.prof')), reverse=True)
+
+
+def init_profiler(server):
+    """
+    Registers the capture hooks and the /profiles endpoints on the Flask server.
+    Without TAS_PROFILE_TOKEN nothing is registered, so requests pay nothing.
+    """
+    if token is None:
+        return
+
+    server.before_request(start_capture)
+    server.after_request(stop_capture)
+    server.teardown_request(abandon_capture)
+
+    def require_token():
+        if not has_token(request_token()):
+            abort(403)
+
+    # Turn profiling on (or off with ?enabled=0) for every request of this browser, Dash callbacks included
+    @server.route('/profiling', methods=['GET'])
+    def set_profiling():
+        require_token()
+        enabled = request.args.get('enabled', '1') != '0'
+        response = jsonify({'profiling': enabled})
+        if enabled:
+            response.set_cookie(COOKIE_NAME, token, httponly=True, samesite='Strict')
+        else:
+            response.delete_cookie(COOKIE_NAME)
+        return response
+
+    # List the captures, newest first
+    @server.route('/profiles', methods=['GET'])
+    def get_profiles():
+        require_token()
+        return jsonify(list_captures())
+
+    # Top-N summary of a capture (?top=20&sort=cumulative|own); 'latest' for the newest one
+    @server.route('/profiles/<name>', methods=['GET'])
+    def get_profile_summary(name):
+        require_token()
+        captures = list_captures()
+        if name == 'latest' and captures:
+            name = captures[0]
+        if name not in captures:
+            return jsonify({'error': f'Unknown capture: {name}'}), 404
+        top = request.args.get('top', default=20, type=int)
+        return jsonify(summarize(name, top=top, sort=request.args.get('sort', 'cumulative')))
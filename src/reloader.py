@@ -0,0 +1,316 @@
+# reloader.py
+import threading
+import time
+import traceback
+from pathlib import Path
+import aliases
+import group_data
+import veris_data
+import nist_data
+import cvwe_data
+import similarity
+import matrices
+import aggregates
+import search
+import cube
+import czml
+import graph
+import navigator
+import rescoring
+import scoring_profiles
+import memory
+import sql_backend
+import ingest
+import profile_cache
+import score_history
+import snapshot
+
+base_path = Path(__file__).resolve().parent.parent
+
+# Source files (or folders) -> the cache steps they feed
+WATCHED_SOURCES = {
+    'data/enterprise-attack.json': ['groups'],
+    'data/threat_actor_groups_aliases.csv': ['aliases'],
+    'data/ta_incidents.csv': ['incidents'],
+    'data/techniques_with_complexity_scores.csv': ['complexity'],
+    'data/techniques_without_mitigations.csv': ['tech_wo_mit'],
+    'data/veris_attack_mapping.csv': ['veris'],
+    'score/veris_impact.csv': ['veris'],
+    'data/nist_800_53_mapping.csv': ['nist'],
+    'data/cve_mapping.csv': ['cvss'],
+    'data/cve_to_cwe.xlsx': ['cvss'],
+    'data/nvd': ['cvss'],
+    'data/mitigation_results.csv': ['cwe_mitigations'],
+    'data/actors_per_country.csv': ['search'],
+    'data/country_coordinates.csv': ['czml'],
+    'score/scoring_profiles.json': ['scoring_profiles'],
+    'data/cwe_mitigations.csv': ['graph'],
+}
+
+# Derived caches -> the steps they are built from
+DEPENDENCIES = {
+    'groups': ['aliases'],
+    'incidents': ['aliases'],
+    'similarity': ['groups'],
+    'matrices': ['groups', 'nist', 'veris', 'cvss'],
+    'aggregates': ['groups', 'veris', 'nist', 'complexity'],
+    'graph': ['matrices', 'cvss'],
+    'search': ['aliases', 'groups'],
+    'cube': ['incidents'],
+    'czml': ['incidents'],
+    'navigator': ['groups', 'complexity', 'aggregates'],
+    'profile_presence': ['incidents'],
+}
+
+# Last seen signature of every watched source, and changes waiting for the file to settle
+signatures = {}
+pending = {}
+last_reload = None
+
+
+def value(state, module, name):
+    """Returns a cache value, preferring the one rebuilt earlier in this reload."""
+    return state.get(module, {}).get(name, getattr(module, name))
+
+
+def rebuild_aliases(state):
+    return {aliases: {'index': aliases.build_index(aliases.load_group_mapping())}}
+
+
+def rebuild_groups(state):
+    groups = group_data.load_group_data(value(state, aliases, 'index'))
+    if not groups:
+        raise ValueError('group data is empty')
+    group_data.ingest_group_data(groups)
+    return {group_data: {'cached_data': groups}}
+
+
+def rebuild_incidents(state):
+    incidents = memory.compact_frame(group_data.load_group_incidents(value(state, aliases, 'index')), 'incidents')
+    if incidents is not None and incidents.empty:
+        raise ValueError('incident data is empty')
+    # the counts keep the incidents ingested from the drop folder, see ingest.py
+    incident_counts = ingest.merge_ingested(group_data.count_incidents(incidents))
+    return {group_data: {'incidents_data': incidents, 'incident_counts': incident_counts}}
+
+
+def rebuild_complexity(state):
+    return {group_data: {'complexity_df': group_data.load_complexity_data()}}
+
+
+def rebuild_tech_wo_mit(state):
+    return {group_data: {'tech_wo_mit': group_data.load_techniques_wo_mitigations()}}
+
+
+def rebuild_veris(state):
+    return {veris_data: {'cached_data': veris_data.build_cache()}}
+
+
+def rebuild_nist(state):
+    return {nist_data: {'cached_data': nist_data.build_cache()}}
+
+
+def rebuild_cvss(state):
+    result, scores, rows_by_ttp = cvwe_data.build_cvss_cache()
+    return {cvwe_data: {'cached_data': result, 'cve_with_scores': scores, 'cve_rows_by_ttp': rows_by_ttp}}
+
+
+def rebuild_cwe_mitigations(state):
+    return {cvwe_data: {'cwe_mitigations': cvwe_data.build_cwe_mitigations_cache()}}
+
+
+def rebuild_similarity(state):
+    names = ['group_names', 'technique_index', 'packed_ttps', 'ttp_counts']
+    return {similarity: dict(zip(names, similarity.build_index(value(state, group_data, 'cached_data'))))}
+
+
+def rebuild_matrices(state):
+    return {matrices: matrices.build_matrices(
+        value(state, group_data, 'cached_data'),
+        value(state, nist_data, 'cached_data'),
+        value(state, veris_data, 'cached_data'),
+        value(state, cvwe_data, 'cve_with_scores'),
+    )}
+
+
+def rebuild_graph(state):
+    return {graph: graph.build_graph(
+        {name: value(state, matrices, name) for name in graph.MATRIX_NAMES},
+        value(state, cvwe_data, 'cve_with_scores'),
+        graph.load_cwe_mitigations(),
+    )}
+
+
+def rebuild_aggregates(state):
+    return {aggregates: aggregates.build_aggregates(
+        value(state, group_data, 'cached_data'),
+        value(state, veris_data, 'cached_data'),
+        value(state, nist_data, 'cached_data'),
+        value(state, group_data, 'complexity_df'),
+    )}
+
+
+def rebuild_search(state):
+    groups = value(state, group_data, 'cached_data')
+    return {search: {'index': search.build_index(
+        groups, aliases.load_group_mapping(), search.load_actor_names(), value(state, aliases, 'index')
+    )}}
+
+
+def rebuild_cube(state):
+    return {cube: cube.build_cube(cube.load_incident_columns(value(state, group_data, 'incidents_data')))}
+
+
+def rebuild_czml(state):
+    # the CZML document is built on first request; until then there is nothing to refresh
+    if czml.parts is None:
+        return {}
+    return {czml: czml.build_czml(
+        czml.load_incident_columns(value(state, group_data, 'incidents_data')), czml.load_coordinates()
+    )}
+
+
+def rebuild_navigator(state):
+    # the layer library is built on first request; until then there is nothing to refresh
+    if navigator.layers is None:
+        return {}
+    return {navigator: navigator.build_layers(
+        value(state, group_data, 'cached_data'),
+        value(state, group_data, 'complexity_df'),
+        value(state, aggregates, 'average_severity'),
+    )}
+
+
+def rebuild_scoring_profiles(state):
+    return {scoring_profiles: {'profiles': scoring_profiles.compile_profiles(scoring_profiles.load_profile_definitions())}}
+
+
+def rebuild_profile_presence(state):
+    incidents = scoring_profiles.load_incident_columns(value(state, group_data, 'incidents_data'))
+    return {scoring_profiles: scoring_profiles.build_presence(incidents)}
+
+
+# Rebuild steps in dependency order
+STEPS = {
+    'aliases': rebuild_aliases,
+    'groups': rebuild_groups,
+    'incidents': rebuild_incidents,
+    'complexity': rebuild_complexity,
+    'tech_wo_mit': rebuild_tech_wo_mit,
+    'veris': rebuild_veris,
+    'nist': rebuild_nist,
+    'cvss': rebuild_cvss,
+    'cwe_mitigations': rebuild_cwe_mitigations,
+    'similarity': rebuild_similarity,
+    'matrices': rebuild_matrices,
+    'graph': rebuild_graph,
+    'aggregates': rebuild_aggregates,
+    'search': rebuild_search,
+    'cube': rebuild_cube,
+    'czml': rebuild_czml,
+    'navigator': rebuild_navigator,
+    'scoring_profiles': rebuild_scoring_profiles,
+    'profile_presence': rebuild_profile_presence,
+}
+
+
+def affected_steps(changed):
+    """Expands the changed steps with every derived cache built from them, in STEPS order."""
+    affected = set(changed)
+    for step, inputs in DEPENDENCIES.items():
+        if affected.intersection(inputs):
+            affected.add(step)
+    return [step for step in STEPS if step in affected]
+
+
+def reload(changed):
+    """
+    Rebuilds the changed caches and their dependents off to the side (independent steps
+    concurrently, see loader.py), then publishes them as one snapshot. With the SQL backend
+    the steps write shadow tables, renamed over the live ones in the same publish. Nothing is
+    published, and the live tables are left alone, if any step fails. Returns {step: seconds}.
+    """
+    global last_reload
+    from loader import run_steps, raise_failures
+    # incidents ingested meanwhile would be lost between the rebuild and the publish
+    with ingest.lock:
+        sql_backend.begin_staging()
+        try:
+            steps = {name: sql_backend.staged_step(step) for name, step in STEPS.items()}
+            state, results = run_steps(steps, DEPENDENCIES, affected_steps(changed))
+            raise_failures(results)
+            timings = {result['step']: result['seconds'] for result in results}
+
+            # Diff the score inputs against the rebuilt ones, then rescore only the actors the changed
+            # rows reach, still off to the side (reading the shadow tables), so their scores are
+            # published in the same swap as their inputs
+            staged_value = lambda module, name: value(state, module, name)
+            changes = rescoring.find_changes(getattr, staged_value)
+            start = time.perf_counter()
+            rescore = sql_backend.staged_step(lambda staged: rescoring.rescore_changes(changes, staged_value))
+            rescored = rescore(state)
+            if rescored is not None:
+                timings['rescoring'] = time.perf_counter() - start
+                updates, rows = rescored
+            else:
+                updates = {}
+
+            published = snapshot.publish({**state, **updates}, swap=sql_backend.swap_staged)
+        finally:
+            sql_backend.discard_staged()  # nothing left to drop once swapped
+    if rescored is not None:
+        score_history.record(rows)
+    profile_cache.clear()
+    last_reload = {'version': published.version, 'steps': timings}
+    return timings
+
+
+def source_signature(path):
+    """mtime/size of a file, or of every file in a folder; None if missing."""
+    if path.is_dir():
+        return tuple(sorted((f.name, f.stat().st_mtime_ns, f.stat().st_size) for f in path.iterdir() if f.is_file()))
+    if path.exists():
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+    return None
+
+
+def check_for_changes():
+    """
+    Returns the steps whose sources changed and have stopped changing since the last poll
+    (a file still being written is picked up on the next poll).
+    """
+    changed = set()
+    for source, steps in WATCHED_SOURCES.items():
+        signature = source_signature(base_path / source)
+        if source not in signatures:
+            signatures[source] = signature
+        elif signature != signatures[source]:
+            if pending.get(source) == signature:
+                signatures[source] = signature
+                del pending[source]
+                changed.update(steps)
+            else:
+                pending[source] = signature
+    return changed
+
+
+def watch(interval):
+    check_for_changes()  # remember the signatures of the data loaded at startup
+    while True:
+        time.sleep(interval)
+        changed = check_for_changes()
+        if changed:
+            try:
+                timings = reload(changed)
+                print(f"Reloaded {', '.join(timings)} (data version {snapshot.get_version()})")
+            except Exception:
+                print('Reload failed, keeping the previous data:')
+                traceback.print_exc()
+
+
+def start_watcher(interval=5.0):
+    """Starts polling the data files for changes in a daemon thread."""
+    thread = threading.Thread(target=watch, args=(interval,), name='data-reloader', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,266 @@
+# rescoring.py
+import sys
+import numpy as np
+import pandas as pd
+import group_data
+import veris_data
+import cvwe_data
+import matrices
+import aggregates
+import sql_backend
+import scoring_profiles
+import score_history
+from group_data import get_ttps_of_group, get_frequency_score, get_techniques_wo_mitigations, get_complexity_score
+from cvwe_data import extract_cvss_scores, extract_cwe_mitigations
+from scorer import get_score_for_threat_actor
+
+# Score components, as labelled by get_score_for_threat_actor, and their column in the score table
+COMPONENTS = {
+    'Complexity Score': 'complexity',
+    'Frequency Score': 'frequency',
+    'Impact Score': 'impact',
+    'Mitigation Score': 'mitigation',
+    'Sector Score': 'sector',
+    'Actor Type Score': 'actor_type',
+}
+
+# Score inputs: name -> (module, global, how to get the table from the global, key column, key kind)
+INPUT_TABLES = {
+    'complexity': (group_data, 'complexity_df', lambda value: value, 'ID', 'ttp'),
+    'techniques_wo_mitigations': (group_data, 'tech_wo_mit', lambda value: value, 'Technique', 'ttp'),
+    'veris': (veris_data, 'cached_data', lambda value: value[0], 'attack_object_id', 'ttp'),
+    'cvss': (cvwe_data, 'cve_with_scores', lambda value: value, 'attack_object_id', 'ttp'),
+    'cwe_mitigations': (cvwe_data, 'cwe_mitigations', lambda value: value, 'ttp', 'ttp'),
+    'incidents': (group_data, 'incidents_data', lambda value: value, 'actor', 'actor'),
+    'incident_counts': (group_data, 'incident_counts', lambda value: value, 'actor', 'actor'),
+}
+
+# Initialize variables to cache every actor's score components and the report of the last rescoring
+scores = None
+last_changes = None
+
+
+def load_data():
+    """Scores every actor once at load."""
+    global scores
+    scores = score_actors(group_data.get_all_groups())
+    score_history.record(scores)
+
+
+def get_scores():
+    """Returns every actor's score components and total score, indexed by actor."""
+    if scores is None:
+        load_data()
+    return scores
+
+
+def get_last_changes():
+    """Returns the report of the last incremental rescoring (None before the first reload)."""
+    return last_changes
+
+
+def score_actor(actor, verbose=True, profile=scoring_profiles.DEFAULT_PROFILE, get=getattr):
+    """
+    Gathers the score inputs of one actor and scores it under a scoring profile.
+    get is a (module, global name) -> value getter, e.g. a reload's rebuilt state (see find_changes).
+    Returns (score, score breakdown DataFrame).
+    """
+    ttps = get_ttps_of_group(actor, get(group_data, 'cached_data'))
+    # Per-actor aggregates are precomputed at load, see aggregates.py
+    average_severity = aggregates.lookup(get(aggregates, 'average_severity'), actor)
+    cvss_scores = extract_cvss_scores(ttps, get(cvwe_data, 'cve_with_scores'), get(cvwe_data, 'cve_rows_by_ttp'))
+    cwe_mitigation_score = extract_cwe_mitigations(ttps, get(cvwe_data, 'cwe_mitigations'))
+
+    complexity_score = get_complexity_score(ttps, get(group_data, 'complexity_df'))
+    frequency_score = get_frequency_score(actor, get(group_data, 'incident_counts'))
+    # the sectors and actor types of the actor's incidents are indexed at load, see scoring_profiles.py
+    sector_score, actor_type_score = scoring_profiles.actor_components(
+        actor, profile, get(scoring_profiles, 'profiles'),
+        {name: get(scoring_profiles, name) for name in ['actors', 'sector_presence', 'actor_type_presence']},
+    )
+    techniques = get_techniques_wo_mitigations(ttps, get(group_data, 'tech_wo_mit'))
+
+    return get_score_for_threat_actor(
+        complexity_score,
+        average_severity,
+        cvss_scores,
+        frequency_score if frequency_score is not None else 0,  # Default to 0 if None
+        sector_score,
+        actor_type_score,
+        techniques,
+        cwe_mitigation_score,
+        verbose=verbose,
+    )
+
+
+def score_actors(actors, get=getattr):
+    """Returns the score components and total score of the given actors, indexed by actor."""
+    rows = {}
+    for actor in actors:
+        score, score_df = score_actor(actor, verbose=False, get=get)
+        components = score_df.set_index('Label')['Score']
+        rows[actor] = {column: components[label] for label, column in COMPONENTS.items()}
+        rows[actor]['score'] = score
+    return pd.DataFrame.from_dict(rows, orient='index', columns=[*COMPONENTS.values(), 'score'], dtype=float)
+
+
+def profile_scores(profile):
+    """
+    Every actor's scores under another scoring profile: only the sector and actor type
+    components depend on the profile, so they are swapped in and the totals adjusted, without rescoring.
+    """
+    base = get_scores()
+    if profile == scoring_profiles.DEFAULT_PROFILE:
+        return base
+    components = scoring_profiles.score_components(profile).reindex(base.index)
+    weights = {'sector': 10, 'actor_type': 10}
+    result = base.copy()
+    for column, weight in weights.items():
+        # the total sums the weighted components, skipping missing ones
+        result['score'] += (components[column].fillna(0) - base[column].fillna(0)) * weight
+        result[column] = components[column]
+    return result
+
+
+def update_frequency(incident_counts, actors=None):
+    """
+    Scores after the incident counts changed, without rescoring: only the frequency component
+    moves, for the given actors (every actor when None), and the totals are adjusted.
+    Returns (score table, report of the scores that moved).
+    """
+    base = get_scores()
+    weight = 20  # the frequency component's weight in get_score_for_threat_actor
+    index = base.index if actors is None else base.index.intersection(list(actors))
+    # get_frequency_score gives 0 to an actor without incidents
+    frequency = incident_counts.set_index('actor')['score'].reindex(index, fill_value=0).astype(float)
+    old = base.loc[index, 'frequency']
+
+    result = base.copy()
+    result.loc[index, 'score'] += (frequency.fillna(0) - old.fillna(0)) * weight
+    result.loc[index, 'frequency'] = frequency
+
+    before, after = base.loc[index, 'score'], result.loc[index, 'score']
+    moved = ~np.isclose(before, after, equal_nan=True)
+    report = {
+        'full': None,
+        'tables': {'incident_counts': len(index)},
+        'rescored': len(index),
+        'moved': [
+            {'actor': actor, 'old': None if pd.isna(old_score) else old_score, 'new': None if pd.isna(new_score) else new_score,
+             'delta': None if pd.isna(old_score) or pd.isna(new_score) else new_score - old_score}
+            for actor, old_score, new_score in zip(index[moved], before[moved], after[moved])
+        ],
+    }
+    report['moved'].sort(key=lambda row: -abs(row['delta'] or 0))
+    return result, report
+
+
+def row_hashes(df, key_column):
+    """Order-insensitive hash of the rows of every key (sum of the row hashes, wrapping around)."""
+    keys = df[key_column].astype(str).str.strip().to_numpy()
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return pd.Series(hashes).groupby(keys).sum()
+
+
+def changed_keys(old, new, key_column):
+    """Keys whose rows were added, removed or modified between two versions of a table."""
+    old_hashes, new_hashes = row_hashes(old, key_column), row_hashes(new, key_column)
+    common = old_hashes.index.intersection(new_hashes.index)
+    modified = common[old_hashes[common].to_numpy() != new_hashes[common].to_numpy()]
+    return set(old_hashes.index.symmetric_difference(new_hashes.index)) | set(modified)
+
+
+def normalization_shift(old_value, new_value):
+    """
+    Returns why every score moves, or None: the frequency score is min-max normalized over
+    all actors' incident counts, and the techniques-without-mitigations ratio divides by the list length.
+    """
+    old_counts, new_counts = old_value(group_data, 'incident_counts'), new_value(group_data, 'incident_counts')
+    if old_counts is not new_counts:
+        old_range = (old_counts['incident_count'].min(), old_counts['incident_count'].max())
+        new_range = (new_counts['incident_count'].min(), new_counts['incident_count'].max())
+        if old_range != new_range:
+            return f'incident count range moved from {old_range} to {new_range}'
+    old_list, new_list = old_value(group_data, 'tech_wo_mit'), new_value(group_data, 'tech_wo_mit')
+    if len(old_list) != len(new_list):
+        return f'techniques without mitigations went from {len(old_list)} to {len(new_list)}'
+    return None
+
+
+def find_changes(old_value, new_value):
+    """
+    Diffs the old and new versions of every score input. old_value/new_value are
+    (module, global name) -> value getters, e.g. the live modules and a reload's rebuilt state.
+    Returns {'full': reason or None, 'actors': directly changed actors, 'ttps': changed techniques, 'tables': {name: key count}}.
+    """
+    changes = {'full': None, 'actors': set(), 'ttps': set(), 'tables': {}}
+    if old_value(group_data, 'cached_data') is not new_value(group_data, 'cached_data'):
+        old_groups, new_groups = old_value(group_data, 'cached_data'), new_value(group_data, 'cached_data')
+        changed = {actor for actor in old_groups.keys() | new_groups.keys() if old_groups.get(actor) != new_groups.get(actor)}
+        changes['actors'] |= changed
+        changes['tables']['groups'] = len(changed)
+
+    for name, (module, global_name, get_table, key_column, kind) in INPUT_TABLES.items():
+        old, new = old_value(module, global_name), new_value(module, global_name)
+        if old is new:
+            continue
+        keys = changed_keys(get_table(old), get_table(new), key_column)
+        changes['tables'][name] = len(keys)
+        changes['actors' if kind == 'actor' else 'ttps'].update(keys)
+
+    if old_value(scoring_profiles, 'profiles') is not new_value(scoring_profiles, 'profiles'):
+        changes['tables']['scoring_profiles'] = len(new_value(scoring_profiles, 'profiles'))
+        changes['full'] = 'scoring profiles changed'
+
+    if sql_backend.enabled and 'incident_counts' in changes['tables']:
+        # the SQL backend keeps the incidents out of memory, so a reload can't be diffed per actor
+        changes['full'] = changes['full'] or 'incidents reloaded into the SQL backend'
+    if changes['tables'] and changes['full'] is None:
+        changes['full'] = normalization_shift(old_value, new_value)
+    return changes
+
+
+def affected_actors(changes, get=getattr):
+    """Actors whose score may have moved: the directly changed ones plus every user of a changed technique."""
+    actors = set(changes['actors'])
+    rows = get(matrices, 'technique_ids').get_indexer(list(changes['ttps']))
+    users = get(matrices, 'technique_actor')[rows[rows >= 0]]
+    actors.update(get(matrices, 'actor_ids')[users.indices].tolist())
+    return actors
+
+
+def rescore_changes(changes, get=getattr):
+    """
+    Rescores only the affected actors (all of them on a normalization shift) from the data get
+    returns, e.g. a reload's rebuilt state before it is published, and returns (score table
+    updates to publish, rescored rows), or None when nothing needs rescoring. The report of the
+    scores that moved is published as last_changes. Publish the updates together with the changed
+    data (see reloader.py), so the new scores are never live without their inputs.
+    """
+    if scores is None or not changes['tables']:
+        return None
+    all_actors = group_data.get_all_groups(get(group_data, 'cached_data'))
+    if changes['full']:
+        actors = all_actors
+    else:
+        affected = affected_actors(changes, get)
+        actors = [actor for actor in all_actors if actor in affected]
+
+    rescored = score_actors(actors, get)
+    new_scores = pd.concat([scores.drop(index=rescored.index, errors='ignore'), rescored]).reindex(all_actors)
+
+    old = scores['score'].reindex(rescored.index)
+    moved = ~np.isclose(old, rescored['score'], equal_nan=True)
+    report = {
+        'full': changes['full'],
+        'tables': changes['tables'],
+        'rescored': len(rescored),
+        'moved': [
+            {'actor': actor, 'old': None if pd.isna(before) else before, 'new': None if pd.isna(after) else after,
+             'delta': None if pd.isna(before) or pd.isna(after) else after - before}
+            for actor, before, after in zip(rescored.index[moved], old[moved], rescored['score'][moved])
+        ],
+    }
+    report['moved'].sort(key=lambda row: -abs(row['delta'] or 0))
+
+    return {sys.modules[__name__]: {'scores': new_scores, 'last_changes': report}}, rescored
@@ -0,0 +1,54 @@
+# residual_risk.py
+import re
+import numpy as np
+import pandas as pd
+import matrices
+
+# NIST 800-53 control ids, e.g. AC-4, ac-04 or SI-4(2) (enhancements count as the base control)
+CONTROL_PATTERN = re.compile(r'\b([A-Za-z]{2})-0*(\d{1,2})\b')
+
+
+def parse_control_ids(text):
+    """
+    Extracts NIST 800-53 control ids from free text (an uploaded list, CSV, etc.)
+    and normalizes them to the zero padded form used in the mapping, e.g. 'ac-4' -> 'AC-04'.
+    """
+    return sorted({f"{family.upper()}-{int(number):02d}" for family, number in CONTROL_PATTERN.findall(text)})
+
+
+def get_all_controls():
+    """
+    Returns the ids of all NIST controls that mitigate at least one technique.
+    """
+    return matrices.control_ids.tolist()
+
+
+def get_covered_techniques(implemented_controls):
+    """
+    Returns a boolean mask over matrices.technique_ids, True for techniques mapped
+    to at least one of the implemented controls.
+    """
+    implemented = np.zeros(len(matrices.control_ids), dtype=np.int32)
+    codes = matrices.control_ids.get_indexer(list(implemented_controls))
+    implemented[codes[codes >= 0]] = 1
+    return (matrices.technique_control @ implemented) > 0
+
+
+def rank_actors_by_residual_risk(implemented_controls):
+    """
+    Re-ranks every actor by how many of its techniques are left uncovered
+    by the implemented NIST controls, in one pass over the sparse matrices.
+    """
+    uncovered_techniques = (~get_covered_techniques(implemented_controls)).astype(np.int32)
+
+    total = np.asarray(matrices.actor_technique.sum(axis=1)).ravel()
+    uncovered = matrices.actor_technique @ uncovered_techniques
+
+    df = pd.DataFrame({
+        'actor': matrices.actor_ids,
+        'techniques': total,
+        'covered': total - uncovered,
+        'uncovered': uncovered,
+        'uncovered_ratio': np.divide(uncovered, total, out=np.zeros(len(total)), where=total > 0),
+    })
+    return df.sort_values(['uncovered', 'uncovered_ratio', 'actor'], ascending=[False, False, True], ignore_index=True)
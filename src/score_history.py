@@ -0,0 +1,205 @@
+# score_history.py
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+import snapshot
+
+base_path = Path(__file__).resolve().parent.parent
+
+# Embedded SQLite store of every score change (TAS_SCORE_HISTORY=0 to stop recording)
+enabled = os.environ.get('TAS_SCORE_HISTORY', '1') != '0'
+store_path = Path(os.environ.get('TAS_SCORE_HISTORY_PATH', base_path / 'data/score_history.db'))
+
+# Score components recorded with every total, as in the rescoring score table
+COMPONENTS = ['complexity', 'frequency', 'impact', 'mitigation', 'sector', 'actor_type']
+
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS scores (
+    actor        TEXT NOT NULL,
+    recorded_at  TEXT NOT NULL,
+    data_version INTEGER,
+    score        REAL,
+    {', '.join(f'{component} REAL' for component in COMPONENTS)}
+);
+CREATE INDEX IF NOT EXISTS idx_scores_actor_recorded_at ON scores (actor, recorded_at);
+'''
+
+# Score batches waiting for the writer thread; when it falls this far behind, new batches are dropped (and counted)
+QUEUE_SIZE = 1000
+pending = queue.Queue(maxsize=QUEUE_SIZE)
+
+# Attempts at writing a batch (e.g. while the store is locked), waiting RETRY_DELAY seconds, doubled every time, in between
+WRITE_ATTEMPTS = 5
+RETRY_DELAY = 0.5
+
+# Initialize variables for the writer thread, the last score written per actor (only changes are
+# appended), the write counters, and the read-only reader connections (sqlite3 connections stay in their thread)
+writer = None
+last_written = None
+written = 0
+dropped = 0
+writer_lock = threading.Lock()
+local = threading.local()
+
+
+def connect():
+    """Open the store, creating the table on first use."""
+    conn = sqlite3.connect(store_path, timeout=60)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def now():
+    # fixed width UTC timestamps, so they sort (and range match) as text
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+
+
+def record(scores):
+    """
+    Queues score rows (a rescoring score table, indexed by actor) for the background writer,
+    stamped with the current time and data version. Never blocks on disk.
+    """
+    global dropped
+    if not enabled or scores is None or scores.empty:
+        return
+    start_writer()
+    if not writer.is_alive():
+        dropped += 1  # the store could not be opened, see write_loop
+        return
+    columns = ['score', *COMPONENTS]
+    batch = (now(), snapshot.get_version(), list(scores.index), scores[columns].to_numpy().tolist())
+    try:
+        pending.put_nowait(batch)
+    except queue.Full:
+        dropped += 1
+
+
+def plain(value):
+    return None if pd.isna(value) else float(value)
+
+
+def write_batch(conn, batch):
+    """Appends the rows of a batch whose score or components changed since the actor's last row."""
+    global written
+    recorded_at, data_version, actors, values = batch
+    changed = {}
+    for actor, row in zip(actors, values):
+        row = tuple(plain(value) for value in row)
+        if last_written.get(actor) != row:
+            changed[actor] = row
+    if changed:
+        rows = [(actor, recorded_at, data_version, *row) for actor, row in changed.items()]
+        with conn:
+            conn.executemany(
+                f"INSERT INTO scores (actor, recorded_at, data_version, score, {', '.join(COMPONENTS)}) "
+                f"VALUES ({', '.join('?' * len(rows[0]))})", rows
+            )
+        # only once committed, so a retry of a failed batch writes its rows again
+        last_written.update(changed)
+        written += len(rows)
+
+
+def write_loop():
+    global last_written, dropped
+    try:
+        conn = connect()
+        # the latest row of every actor, so a restart doesn't append unchanged scores again
+        latest = conn.execute(f'''
+            SELECT actor, score, {', '.join(COMPONENTS)} FROM scores
+            WHERE rowid IN (SELECT MAX(rowid) FROM scores GROUP BY actor)
+        ''').fetchall()
+    except Exception as e:
+        print(f'Score history disabled, could not open {store_path}: {e!r}')
+        return
+    last_written = {row[0]: tuple(row[1:]) for row in latest}
+    while True:
+        batch = pending.get()
+        try:
+            for attempt in range(WRITE_ATTEMPTS):
+                try:
+                    write_batch(conn, batch)
+                    break
+                except Exception as e:
+                    if attempt == WRITE_ATTEMPTS - 1:
+                        print(f'Failed to write score history, dropping the batch: {e!r}')
+                        dropped += 1
+                    else:
+                        time.sleep(RETRY_DELAY * 2 ** attempt)
+        finally:
+            pending.task_done()
+
+
+def start_writer():
+    """Starts the background writer thread once."""
+    global writer
+    with writer_lock:
+        if writer is None:
+            writer = threading.Thread(target=write_loop, name='score-history-writer', daemon=True)
+            writer.start()
+            atexit.register(flush)
+
+
+def flush(timeout=10.0):
+    """Waits (at most timeout seconds) until every queued batch is written, or the writer stopped."""
+    deadline = time.monotonic() + timeout
+    while writer is not None and writer.is_alive() and pending.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def reader():
+    """Returns this thread's read-only connection to the store, or None before the writer created it."""
+    conn = getattr(local, 'conn', None)
+    if conn is None:
+        if not store_path.exists():
+            return None
+        conn = local.conn = sqlite3.connect(f'{store_path.resolve().as_uri()}?mode=ro', uri=True, timeout=60)
+    return conn
+
+
+def get_trend(actor, since=None, until=None):
+    """
+    Returns an actor's recorded scores and components, oldest first, optionally between two
+    timestamps (anything pd.Timestamp parses; naive ones are read as UTC).
+    """
+    sql = f"SELECT recorded_at, data_version, score, {', '.join(COMPONENTS)} FROM scores WHERE actor = ?"
+    params = [actor]
+    for bound, operator in ((since, '>='), (until, '<=')):
+        if bound is not None:
+            timestamp = pd.Timestamp(bound)
+            timestamp = timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+            sql += f' AND recorded_at {operator} ?'
+            params.append(timestamp.isoformat(timespec='milliseconds'))
+    conn = reader()
+    if conn is None:
+        # nothing was recorded yet
+        history = pd.DataFrame(columns=['recorded_at', 'data_version', 'score', *COMPONENTS])
+    else:
+        history = pd.read_sql_query(sql + ' ORDER BY recorded_at, rowid', conn, params=params)
+    history['recorded_at'] = pd.to_datetime(history['recorded_at'], utc=True)
+    return history
+
+
+def summarize(history):
+    """First, last, lowest and highest score of a trend, and the change over it."""
+    if history.empty:
+        return {'points': 0}
+    scores = history['score']
+    return {
+        'points': len(history),
+        'first': plain(scores.iloc[0]), 'last': plain(scores.iloc[-1]),
+        'min': plain(scores.min()), 'max': plain(scores.max()),
+        'change': plain(scores.iloc[-1] - scores.iloc[0]),
+        'since': history['recorded_at'].iloc[0].isoformat(), 'until': history['recorded_at'].iloc[-1].isoformat(),
+    }
+
+
+def get_stats():
+    """Rows written, batches queued and batches dropped since startup."""
+    return {'written': written, 'queued': pending.qsize(), 'dropped': dropped}
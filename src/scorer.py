@@ -1,39 +1,11 @@
-import numpy as np
 import pandas as pd
-# Manually defined values for Targeted Sector and Actor Type scoring
-SECTOR_SCORES = {
-    'Professional, Scientific, and Technical Services': 0.6,
-    'Information': 0.9,
-    'Educational Services': 0.5,
-    'Arts, Entertainment, and Recreation':0.3,
-    'Finance and Insurance': 0.9,
-    'Public Administration': 1.0,
-    'Health Care and Social Assistance': 0.9,
-    'Other Services (Except Public Administration)': 0.4,
-    'Retail Trade': 0.6,
-    'Manufacturing': 0.8,
-    'Administrative, Support, Waste Management & Remediation Services': 0.7,
-    'Accomodation & Food Services': 0.5,
-    'Transportation & Warehousing': 0.8,
-    'Utilities': 1.0,
-    'Wholesale Trade': 0.7,
-    'Agriculture, Forestry, Fishing & Hunting': 0.8,
-    'Management of Companies & Enterprises': 0.6,
-    'Real Estate, Rental & Leasing': 0.2,
-    'Mining, Quarrying and Oil/Gas Extraction': 0.8,
-    'Construction': 0.4,
-}
-
-ACTOR_TYPE_SCORES = {
-    'Nation-State': 1.0,
-    'Criminal': 0.8,
-    'Terrorist': 0.6,
-    'Hacktivist': 0.4,
-    'Hobbyist': 0.2,   
-}
-
-
-def get_score_for_threat_actor(complexity_score, veris_impact, cvss_data, frequency_score, sector, actor_type, twmratio, mitigation_ratio):
+# Sector and actor type scores come from the scoring profiles, see scoring_profiles.py
+
+
+def get_score_for_threat_actor(complexity_score, veris_impact, cvss_data, frequency_score, sector_score, actor_type_score, twmratio, mitigation_ratio, verbose=True):
+    # verbose prints every component (off when scoring all actors at once)
+    log = print if verbose else (lambda *args: None)
+
     # impact score
     avg_cvss = cvss_data['cvss'].mean()
     sophistication = veris_impact['severity'].mean()
@@ -43,51 +15,45 @@ def get_score_for_threat_actor(complexity_score, veris_impact, cvss_data, freque
     impact_score =  (sophistication + (avg_cvss * cvss_weight)) / (1 + cvss_weight)
     impact_score /= 10
 
-    print("impact score: (always lie in 1-10)")
+    log("impact score: (always lie in 1-10)")
 
-    print("avg cvss")
-    print(avg_cvss)
+    log("avg cvss")
+    log(avg_cvss)
     
-    print("Complexity Score")
-    print(complexity_score)
-
-    print("sophistication")
-    print(sophistication)
+    log("Complexity Score")
+    log(complexity_score)
 
-    print("impact score")
-    print(impact_score)
-    print("---------")
+    log("sophistication")
+    log(sophistication)
 
-    print("freq  score")
-    print(frequency_score)
-    print("---------")
+    log("impact score")
+    log(impact_score)
+    log("---------")
 
+    log("freq  score")
+    log(frequency_score)
+    log("---------")
 
-    sector_score = sector.apply(lambda x: np.mean([SECTOR_SCORES.get(i, 0) for i in x])).mean()
 
-    print("Sector Score")
-    print(sector_score)
-    print("---------")
+    log("Sector Score")
+    log(sector_score)
+    log("---------")
 
     # actor type score
 
-    actor_type_score = actor_type.apply(lambda x: np.mean([ACTOR_TYPE_SCORES.get(i, 0) for i in x])).mean()
-
-
-
-    print("Actor Type Score")
-    print(actor_type_score)
-    print("---------")
+    log("Actor Type Score")
+    log(actor_type_score)
+    log("---------")
 
     # mitigation score
     mitigation_score = twmratio + mitigation_ratio
 
-    print("Mitigation Score")
-    print(mitigation_score)
-    print('CWE Mitigations')
-    print(mitigation_ratio)
+    log("Mitigation Score")
+    log(mitigation_score)
+    log('CWE Mitigations')
+    log(mitigation_ratio)
 
-    print("---------")
+    log("---------")
 
 
     # Combine the scores using weights (or equal weights if no specific weight is given)
@@ -142,8 +108,8 @@ def get_score_for_threat_actor(complexity_score, veris_impact, cvss_data, freque
     # Update the remaining weight based on total score
     df.loc[df['Label'] == '.', 'Weight'] = 100 - total_score
 
-    print("---------")
+    log("---------")
 
-    print(total_score)
+    log(total_score)
 
     return total_score, df
\ No newline at end of file
@@ -0,0 +1,224 @@
+# scoring_profiles.py
+import json
+import re
+from collections import namedtuple
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import group_data
+import sql_backend
+
+base_path = Path(__file__).resolve().parent.parent
+
+# Named scoring profiles (one per business unit): sector and actor type scores, optionally extending another profile
+profiles_path = base_path / 'score/scoring_profiles.json'
+
+DEFAULT_PROFILE = 'default'
+
+# The NAICS sectors incidents are scored by, with the other spellings found in the data and in older tables
+INDUSTRY_TAXONOMY = {
+    'Agriculture, Forestry, Fishing and Hunting': ['11', 'Agriculture'],
+    'Mining, Quarrying, and Oil and Gas Extraction': ['21', 'Mining', 'Oil and Gas'],
+    'Utilities': ['22', 'Energy'],
+    'Construction': ['23'],
+    'Manufacturing': ['31-33'],
+    'Wholesale Trade': ['42'],
+    'Retail Trade': ['44-45', 'Retail'],
+    'Transportation and Warehousing': ['48-49', 'Transportation'],
+    'Information': ['51', 'Telecommunications'],
+    'Finance and Insurance': ['52', 'Finance', 'Financial Services', 'Banking'],
+    'Real Estate and Rental and Leasing': ['53', 'Real Estate'],
+    'Professional, Scientific, and Technical Services': ['54'],
+    'Management of Companies and Enterprises': ['55'],
+    'Administrative and Support and Waste Management and Remediation Services': ['56'],
+    'Educational Services': ['61', 'Education'],
+    'Health Care and Social Assistance': ['62', 'Health Care', 'Healthcare'],
+    'Arts, Entertainment, and Recreation': ['71'],
+    'Accommodation and Food Services': ['72', 'Accomodation & Food Services', 'Hospitality'],
+    'Other Services (except Public Administration)': ['81'],
+    'Public Administration': ['92', 'Government'],
+}
+SECTORS = list(INDUSTRY_TAXONOMY)
+
+ACTOR_TYPES = ['Nation-State', 'Criminal', 'Terrorist', 'Hacktivist', 'Hobbyist']
+
+# A profile compiled to score arrays indexed by sector / actor type code. The last slot is
+# for values outside the taxonomy ('Undetermined', ...), which score 0 but still count in the mean.
+Profile = namedtuple('Profile', ['name', 'description', 'sector_scores', 'actor_type_scores'])
+
+# Initialize variables to cache the compiled profiles, and the actors with, per actor, which
+# sector and actor type codes appear in their incidents (one boolean row per actor)
+profiles = None
+actors = None
+sector_presence = None
+actor_type_presence = None
+
+
+def load_data():
+    """Compiles the scoring profiles and indexes the sectors and actor types of every actor's incidents."""
+    global profiles
+    profiles = compile_profiles(load_profile_definitions())
+    globals().update(build_presence(load_incident_columns(group_data.incidents_data)))
+
+
+def get_profiles():
+    """Returns the compiled profiles by name."""
+    if profiles is None:
+        load_data()
+    return profiles
+
+
+def taxonomy_key(text):
+    """Spelling-insensitive key: casefolded words, '&' read as 'and', the 'and's and punctuation dropped."""
+    words = re.findall(r'[a-z0-9]+', str(text).casefold().replace('&', ' and '))
+    return ' '.join(word for word in words if word != 'and')
+
+
+# normalized spelling -> code, for sectors and actor types
+SECTOR_CODES = {
+    taxonomy_key(name): code
+    for code, (sector, aliases) in enumerate(INDUSTRY_TAXONOMY.items())
+    for name in [sector, *aliases]
+}
+ACTOR_TYPE_CODES = {taxonomy_key(actor_type): code for code, actor_type in enumerate(ACTOR_TYPES)}
+
+
+def sector_code(industry):
+    """Taxonomy code of an industry spelling, len(SECTORS) if it is outside the taxonomy."""
+    return SECTOR_CODES.get(taxonomy_key(industry), len(SECTORS))
+
+
+def normalize_industry(industry):
+    """Canonical NAICS sector name of an industry spelling, or None."""
+    code = sector_code(industry)
+    return SECTORS[code] if code < len(SECTORS) else None
+
+
+def load_profile_definitions():
+    with open(profiles_path, 'r') as f:
+        return json.load(f)
+
+
+def compile_table(scores, codes, size, kind):
+    """Score array of a {name: score} table; names go through the taxonomy, so a misspelt one is an error."""
+    table = np.zeros(size + 1)
+    for name, score in scores.items():
+        code = codes.get(taxonomy_key(name))
+        if code is None:
+            raise ValueError(f'Unknown {kind} in scoring profile: {name}')
+        table[code] = score
+    return table
+
+
+def compile_profiles(definitions):
+    """Compiles every profile, after merging in the tables of the profile it extends."""
+    def resolve(name, seen=()):
+        if name in seen:
+            raise ValueError(f"Scoring profiles extend each other in a loop: {' -> '.join([*seen, name])}")
+        if name not in definitions:
+            raise ValueError(f'Unknown scoring profile: {name}')
+        definition = definitions[name]
+        if 'extends' not in definition:
+            return dict(definition.get('sectors', {})), dict(definition.get('actor_types', {}))
+        sectors, actor_types = resolve(definition['extends'], (*seen, name))
+        sectors.update(definition.get('sectors', {}))
+        actor_types.update(definition.get('actor_types', {}))
+        return sectors, actor_types
+
+    compiled = {}
+    for name, definition in definitions.items():
+        sectors, actor_types = resolve(name)
+        compiled[name] = Profile(
+            name,
+            definition.get('description', ''),
+            compile_table(sectors, SECTOR_CODES, len(SECTORS), 'sector'),
+            compile_table(actor_types, ACTOR_TYPE_CODES, len(ACTOR_TYPES), 'actor type'),
+        )
+    if DEFAULT_PROFILE not in compiled:
+        raise ValueError(f"Scoring profiles need a '{DEFAULT_PROFILE}' profile")
+    return compiled
+
+
+def load_incident_columns(incidents):
+    """Returns the actor, industry and actor type of every incident."""
+    if sql_backend.enabled:
+        return sql_backend.query(f"SELECT actor, industry, actor_type FROM {sql_backend.resolve_table('incidents')}")
+    return incidents[['actor', 'industry', 'actor_type']]
+
+
+def presence_matrix(actor_codes, value_codes, actor_count, value_count):
+    """Boolean actor x code matrix: which codes appear in each actor's incidents."""
+    presence = np.zeros((actor_count, value_count + 1), dtype=bool)
+    presence[actor_codes, value_codes] = True
+    return presence
+
+
+def build_presence(incidents):
+    """
+    Dictionary encodes the incident industries (through the taxonomy) and actor types, and
+    records which codes each actor has. Missing values are left out, like groupby does.
+    """
+    incident_actors = incidents['actor'].astype(object)
+    actor_index = pd.Index(incident_actors.dropna().unique()).sort_values()
+    actor_codes = actor_index.get_indexer(incident_actors)
+
+    # encode the distinct spellings once, then map every incident through them
+    industries = incidents['industry'].astype(object)
+    industry_labels = pd.Index(industries.dropna().unique())
+    industry_codes = np.array([sector_code(label) for label in industry_labels], dtype=np.int64)
+    actor_types = incidents['actor_type'].astype(object)
+    actor_type_labels = pd.Index(actor_types.dropna().unique())
+    actor_type_codes = np.array([ACTOR_TYPE_CODES.get(taxonomy_key(label), len(ACTOR_TYPES)) for label in actor_type_labels], dtype=np.int64)
+
+    rows = industry_labels.get_indexer(industries)
+    keep = (actor_codes >= 0) & (rows >= 0)
+    sectors = presence_matrix(actor_codes[keep], industry_codes[rows[keep]], len(actor_index), len(SECTORS))
+    rows = actor_type_labels.get_indexer(actor_types)
+    keep = (actor_codes >= 0) & (rows >= 0)
+    types = presence_matrix(actor_codes[keep], actor_type_codes[rows[keep]], len(actor_index), len(ACTOR_TYPES))
+    return {'actors': actor_index, 'sector_presence': sectors, 'actor_type_presence': types}
+
+
+def gather_mean(presence, table):
+    """
+    Mean score of the codes present in each row (NaN for rows without any), as one matrix
+    product; table is a code -> score array, or a code x profile matrix.
+    """
+    counts = presence.sum(axis=1).reshape(-1, *[1] * (table.ndim - 1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, (presence @ table) / counts, np.nan)
+
+
+def score_components(profile=DEFAULT_PROFILE):
+    """Sector and actor type scores of every actor with incidents under a profile, indexed by actor."""
+    profile = get_profiles()[profile]
+    return pd.DataFrame({
+        'sector': gather_mean(sector_presence, profile.sector_scores),
+        'actor_type': gather_mean(actor_type_presence, profile.actor_type_scores),
+    }, index=actors)
+
+
+def score_all_profiles():
+    """Sector and actor type scores of every actor under every profile, as (profile, component) columns."""
+    names = list(get_profiles())
+    sectors = gather_mean(sector_presence, np.column_stack([profiles[name].sector_scores for name in names]))
+    types = gather_mean(actor_type_presence, np.column_stack([profiles[name].actor_type_scores for name in names]))
+    columns = pd.MultiIndex.from_product([names, ['sector', 'actor_type']], names=['profile', 'component'])
+    return pd.DataFrame(np.stack([sectors, types], axis=2).reshape(len(actors), -1), index=actors, columns=columns)
+
+
+def actor_components(actor, profile=DEFAULT_PROFILE, compiled=None, presence=None):
+    """
+    (sector score, actor type score) of one actor under a profile; NaN without incidents.
+    compiled (profiles by name) and presence (as returned by build_presence) default to the loaded ones.
+    """
+    profile = (get_profiles() if compiled is None else compiled)[profile]
+    if presence is None:
+        presence = {'actors': actors, 'sector_presence': sector_presence, 'actor_type_presence': actor_type_presence}
+    position = presence['actors'].get_indexer([actor])[0]
+    if position < 0:
+        return np.nan, np.nan
+    return (
+        gather_mean(presence['sector_presence'][position:position + 1], profile.sector_scores)[0],
+        gather_mean(presence['actor_type_presence'][position:position + 1], profile.actor_type_scores)[0],
+    )
@@ -0,0 +1,152 @@
+# search.py
+import bisect
+from collections import Counter, namedtuple
+from pathlib import Path
+import pandas as pd
+import aliases
+import group_data
+
+base_path = Path(__file__).resolve().parent.parent
+
+# A searchable name: what is shown, the value it selects (canonical group or actor name) and its kind
+Entry = namedtuple('Entry', ['label', 'value', 'kind'])
+
+# Entries with their normalized keys and trigram counts, sorted (key, entry position) pairs
+# (one per word start of every name) for prefix search, and trigram -> entry positions
+SearchIndex = namedtuple('SearchIndex', ['entries', 'keys', 'trigram_counts', 'prefix_keys', 'prefix_entries', 'trigrams'])
+
+# Initialize a variable to cache the search index
+index = None
+
+# Groups rank before their aliases, which rank before actors only seen in incident data
+KIND_ORDER = {'group': 0, 'alias': 1, 'actor': 2}
+
+
+def load_data():
+    """Builds the search index over the loaded groups, their aliases and the actors per country."""
+    global index
+    index = build_index(group_data.get_all_groups(), aliases.load_group_mapping(), load_actor_names())
+
+
+def load_actor_names():
+    """Returns the actor names listed in actors_per_country.csv."""
+    actor_lists = pd.read_csv(base_path / 'data/actors_per_country.csv')['actor_list'].dropna()
+    return sorted({actor.strip() for actors in actor_lists for actor in actors.split(', ') if actor.strip()})
+
+
+def words(label):
+    """Normalized words of a name ('Threat Group-3390' -> ['threat', 'group', '3390'])."""
+    return [aliases.normalize(word) for word in label.replace('-', ' ').split() if aliases.normalize(word)]
+
+
+def trigrams(key):
+    """Character trigrams of a normalized key, padded so short keys still get some."""
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_index(groups, group_mapping, actor_names, alias_index=None):
+    """
+    Indexes canonical group names, their associated groups (aliases) and any other actor names.
+    Each name is reachable by a prefix of its start or of any of its words.
+    """
+    groups = set(groups)
+    entries = [Entry(group, group, 'group') for group in sorted(groups)]
+    seen = {aliases.normalize(group) for group in groups}
+
+    for name, associated in zip(group_mapping['name'], group_mapping['associated groups']):
+        if name in groups and isinstance(associated, str):
+            for alias in associated.split(','):
+                alias = alias.strip()
+                if alias and aliases.normalize(alias) not in seen:
+                    seen.add(aliases.normalize(alias))
+                    entries.append(Entry(alias, name, 'alias'))
+
+    for actor in actor_names:
+        key = aliases.normalize(actor)
+        if key and key not in seen:
+            seen.add(key)
+            group = aliases.resolve(actor, fuzzy=False, alias_index=alias_index)
+            entries.append(Entry(actor, group, 'alias') if group in groups else Entry(actor, actor, 'actor'))
+
+    keys = []
+    trigram_counts = []
+    prefixes = []
+    postings = {}
+    for position, entry in enumerate(entries):
+        entry_words = words(entry.label)
+        # the whole name without separators, then every later word start
+        for start in range(len(entry_words)):
+            prefixes.append((''.join(entry_words[start:]), position))
+        keys.append(''.join(entry_words))
+        entry_trigrams = trigrams(keys[-1])
+        trigram_counts.append(len(entry_trigrams))
+        for trigram in entry_trigrams:
+            postings.setdefault(trigram, []).append(position)
+    prefixes.sort()
+
+    return SearchIndex(
+        entries,
+        keys,
+        trigram_counts,
+        [key for key, _ in prefixes],
+        [position for _, position in prefixes],
+        postings,
+    )
+
+
+def search(query, limit=10):
+    """
+    Returns up to limit matches for a typed query, best first, as dicts with label, value and kind.
+    Prefix matches (of the whole name, then of a later word) rank first; when there are
+    fewer than limit of them, names sharing the most trigrams with the query fill the rest.
+    """
+    if index is None:
+        load_data()
+    key = aliases.normalize(query)
+    if not key:
+        return []
+
+    # rank: 0 exact, 1 name prefix, 2 word prefix, 3 trigram match
+    ranked = {}
+    start = bisect.bisect_left(index.prefix_keys, key)
+    end = bisect.bisect_left(index.prefix_keys, key + '\uffff')
+    for key_at, position in zip(index.prefix_keys[start:end], index.prefix_entries[start:end]):
+        entry_key = index.keys[position]
+        rank = 0 if entry_key == key else 1 if key_at == entry_key else 2
+        ranked[position] = min(rank, ranked.get(position, rank))
+
+    scores = {}
+    if len(ranked) < limit:
+        query_trigrams = trigrams(key)
+        shared = Counter(position for trigram in query_trigrams for position in index.trigrams.get(trigram, ()))
+        for position, count in shared.most_common(limit * 4):
+            # Dice coefficient between the query and the name trigrams
+            score = 2 * count / (len(query_trigrams) + index.trigram_counts[position])
+            if position not in ranked and score >= 0.3:
+                ranked[position] = 3
+                scores[position] = score
+
+    best = sorted(ranked, key=lambda position: (
+        ranked[position],
+        -scores.get(position, 0),
+        KIND_ORDER[index.entries[position].kind],
+        len(index.entries[position].label),
+        index.entries[position].label,
+    ))[:limit]
+    return [index.entries[position]._asdict() for position in best]
+
+
+def get_options(query, limit=10):
+    """
+    Dropdown options for a typed query, one per value; aliases show the group they resolve to.
+    Actors only seen in incident data have no profile page, so they are listed but can't be selected.
+    """
+    options = {}
+    for match in search(query, limit):
+        if match['kind'] == 'actor':
+            options.setdefault(match['value'], {'label': f"{match['label']} (no ATT&CK profile)", 'value': match['value'], 'disabled': True})
+            continue
+        label = match['label'] if match['kind'] != 'alias' else f"{match['label']} ({match['value']})"
+        options.setdefault(match['value'], {'label': label, 'value': match['value']})
+    return list(options.values())
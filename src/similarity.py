@@ -0,0 +1,92 @@
+# similarity.py
+import numpy as np
+import pandas as pd
+import group_data
+from group_data import get_ttps_of_group
+
+# Initialize variables to cache the bit-packed actor x technique matrix
+group_names = None
+technique_index = None
+packed_ttps = None
+ttp_counts = None
+
+# Number of set bits for every possible byte value
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint16)
+
+
+def load_data():
+    """
+    Builds the bit-packed actor x technique matrix used for similarity search.
+    Each group is one row and each technique one bit, so comparing a group against
+    every other group is a handful of vectorized AND + popcount operations.
+    """
+    global group_names, technique_index, packed_ttps, ttp_counts
+    group_names, technique_index, packed_ttps, ttp_counts = build_index(group_data.cached_data)
+
+
+def build_index(group_techniques):
+    """
+    Packs a group -> TTP list mapping into (group names, technique bit positions, packed matrix, TTP counts).
+    """
+    groups = sorted(group_techniques)
+    group_ttps = [set(group_techniques[group]) for group in groups]
+
+    # Assign a stable bit position to every technique used by at least one group
+    techniques = sorted(set().union(*group_ttps)) if group_ttps else []
+    index = {ttp: i for i, ttp in enumerate(techniques)}
+
+    dense = np.zeros((len(groups), len(techniques)), dtype=bool)
+    for row, ttps in enumerate(group_ttps):
+        dense[row, [index[ttp] for ttp in ttps]] = True
+
+    return np.array(groups, dtype=object), index, np.packbits(dense, axis=1), dense.sum(axis=1)
+
+
+def pack_ttps(ttps):
+    """
+    Packs a TTP list into a bit row aligned with the cached matrix.
+    Returns the packed row and the number of distinct TTPs, including the ones no group uses.
+    """
+    ttps = set(ttps)
+    row = np.zeros(len(technique_index), dtype=bool)
+    row[[technique_index[ttp] for ttp in ttps if ttp in technique_index]] = True
+    return np.packbits(row), len(ttps)
+
+
+def get_similar_to_ttps(ttps, k=10, exclude=None):
+    """
+    Returns the top-k groups ranked by Jaccard similarity to an ad-hoc TTP set.
+    """
+    if packed_ttps is None:
+        load_data()
+
+    query, query_count = pack_ttps(ttps)
+
+    # |A n B| via popcount of the AND, |A u B| = |A| + |B| - |A n B|
+    shared = POPCOUNT[packed_ttps & query].sum(axis=1)
+    union = ttp_counts + query_count - shared
+    scores = np.divide(shared, union, out=np.zeros(len(union)), where=union > 0)
+
+    if exclude is not None:
+        scores[group_names == exclude] = -1
+
+    k = min(k, int((scores >= 0).sum()))
+    if k <= 0:
+        return pd.DataFrame(columns=['group', 'similarity', 'shared_ttps'])
+
+    # Partial selection first, then only sort the k winners
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.lexsort((group_names[top], -scores[top]))]
+
+    return pd.DataFrame({
+        'group': group_names[top],
+        'similarity': scores[top],
+        'shared_ttps': shared[top],
+    })
+
+
+def get_similar_groups(group_id, k=10):
+    """
+    Returns the top-k groups whose TTPs are most similar to the given group's TTPs.
+    """
+    return get_similar_to_ttps(get_ttps_of_group(group_id), k=k, exclude=group_id)
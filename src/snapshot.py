@@ -0,0 +1,79 @@
+# snapshot.py
+import functools
+import threading
+import time
+from collections import namedtuple
+
+# The published data version and when it was published; the data itself lives in the module globals
+Snapshot = namedtuple('Snapshot', ['version', 'published_at'])
+
+current = Snapshot(0, time.time())
+
+# Sequence counter around the module global assignments: odd while a publish is in progress
+sequence = 0
+write_lock = threading.Lock()
+
+
+def get_snapshot():
+    """Returns the latest published snapshot."""
+    return current
+
+
+def get_version():
+    """Returns the data version, bumped by every publish."""
+    return current.version
+
+
+def publish(updates, swap=None):
+    """
+    Publishes new cache values, given as {module: {global name: value}}, all at once.
+    The values are built aside beforehand, so publishing only assigns the module globals the
+    extract_*/get_* functions read, inside the odd sequence window that read_consistent retries on.
+    swap (e.g. sql_backend.swap_staged) runs first in the same window; if it raises, nothing is published.
+    """
+    global current, sequence
+    with write_lock:
+        sequence += 1
+        try:
+            if swap is not None:
+                swap()
+            for module, names in updates.items():
+                for name, value in names.items():
+                    setattr(module, name, value)
+            current = Snapshot(current.version + 1, time.time())
+        finally:
+            sequence += 1
+    return current
+
+
+def read_consistent(fn, *args, retries=3):
+    """
+    Runs fn(*args) and returns its result only if no publish happened meanwhile,
+    retrying otherwise, so a request never mixes old and new module globals.
+    A torn read usually fails (a key or position missing from the other version),
+    so an exception is only raised if no publish happened during the call either.
+    """
+    for _ in range(retries):
+        start = sequence
+        if start % 2 == 0:
+            try:
+                result = fn(*args)
+            except Exception:
+                if sequence == start:
+                    raise
+                continue
+            if sequence == start:
+                return result
+        else:
+            time.sleep(0.001)  # a publish only assigns references, it is over almost immediately
+    # the data keeps changing under us, run once more while holding off publishers
+    with write_lock:
+        return fn(*args)
+
+
+def consistent(fn):
+    """Decorator running every call of fn (a route or callback reading the caches) through read_consistent."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return read_consistent(functools.partial(fn, *args, **kwargs))
+    return wrapper
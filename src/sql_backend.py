@@ -0,0 +1,158 @@
+# sql_backend.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+base_path = Path(__file__).resolve().parent.parent
+
+# Optional embedded SQLite backend, enabled with TAS_BACKEND=sqlite.
+# The loaders then ingest their data into indexed tables and the extract_*/get_*
+# functions run parameterized queries instead of filtering in-memory DataFrames.
+enabled = os.environ.get('TAS_BACKEND', 'pandas').lower() == 'sqlite'
+db_path = Path(os.environ.get('TAS_DB_PATH', base_path / 'data/threat_scorer.db'))
+
+# sqlite3 connections can't be shared between Flask's threads, so keep one per thread
+local = threading.local()
+
+# pandas dtypes of every ingested table, to give query results the same dtypes as the pandas path
+table_dtypes = {}
+
+# Tables a hot reload is rebuilding, as table -> (shadow table, dtypes). The reload's steps write
+# and read the shadow tables; everyone else keeps reading the live ones until swap_staged renames
+# them into place, inside the snapshot publish.
+staged = {}
+staging_lock = threading.Lock()
+generation = None
+
+
+def connection():
+    """Returns this thread's connection to the backend database."""
+    conn = getattr(local, 'conn', None)
+    if conn is None:
+        # the loaders ingest from several threads at once, so wait for the write lock rather than failing
+        conn = local.conn = sqlite3.connect(db_path, timeout=60)
+        conn.execute('PRAGMA journal_mode=WAL')
+    return conn
+
+
+def is_staging():
+    return getattr(local, 'staging', False)
+
+
+def resolve_table(name):
+    """The table this thread reads for name: the reload's shadow table inside a staged step, else the live one."""
+    if is_staging() and name in staged:
+        return staged[name][0]
+    return name
+
+
+def get_dtypes(name):
+    """The pandas dtypes of the table this thread reads for name."""
+    if is_staging() and name in staged:
+        return staged[name][1]
+    return table_dtypes.get(name)
+
+
+def ingest(table, df, indexes=(), if_exists='replace', index_label=None):
+    """
+    Writes a DataFrame into a table and creates the given indexes.
+    index_label keeps the DataFrame index as a column (to give identical results back).
+    Inside a staged step the data goes to the table's shadow table instead.
+    """
+    name = table
+    if is_staging():
+        with staging_lock:
+            if if_exists == 'replace' or name not in staged:
+                staged[name] = (f'{name}__staged_{generation}', None)
+            table = staged[name][0]
+    conn = connection()
+    df.to_sql(table, conn, if_exists=if_exists, index=index_label is not None, index_label=index_label)
+    if if_exists == 'replace':
+        dtypes = (df.reset_index(names=index_label) if index_label else df).dtypes.to_dict()
+        if table == name:
+            table_dtypes[name] = dtypes
+        else:
+            with staging_lock:
+                staged[name] = (table, dtypes)
+    for column in indexes:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ("{column}")')
+    conn.commit()
+
+
+def begin_staging():
+    """Starts a staging session: from now on staged steps write shadow tables."""
+    global generation
+    discard_staged()
+    # shadow names are unique per reload, so the index names they leave on the live tables never clash
+    generation = f'{time.time_ns() // 1000000:x}'
+
+
+def staged_step(step):
+    """Wraps a reload step so the tables it ingests (and then reads) are shadow tables."""
+    def run(state):
+        local.staging = True
+        try:
+            return step(state)
+        finally:
+            local.staging = False
+    return run
+
+
+def swap_staged():
+    """Renames the shadow tables over the live ones in one transaction; pass to snapshot.publish."""
+    if not staged:
+        return
+    conn = connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for name, (shadow, _) in staged.items():
+            conn.execute(f'DROP TABLE IF EXISTS {name}')
+            conn.execute(f'ALTER TABLE {shadow} RENAME TO {name}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    table_dtypes.update({name: dtypes for name, (_, dtypes) in staged.items()})
+    staged.clear()
+
+
+def discard_staged():
+    """Drops the shadow tables of a reload that is not published."""
+    if not staged:
+        return
+    conn = connection()
+    for shadow, _ in staged.values():
+        conn.execute(f'DROP TABLE IF EXISTS {shadow}')
+    conn.commit()
+    staged.clear()
+
+
+def query(sql, params=(), parse_dates=None, dtypes=None):
+    """
+    Runs a parameterized query and returns the result as a DataFrame (NULL -> NaN, like read_csv).
+    dtypes (column -> dtype) restores pandas dtypes SQLite can't carry, e.g. on empty results.
+    """
+    df = pd.read_sql_query(sql, connection(), params=params, parse_dates=parse_dates)
+    text_columns = df.select_dtypes(object).columns
+    df[text_columns] = df[text_columns].where(df[text_columns].notna(), np.nan)
+    if dtypes:
+        df = df.astype({column: dtype for column, dtype in dtypes.items() if column in df.columns})
+    return df
+
+
+def select_in(table, column, values, order_by='rowid', parse_dates=None):
+    """
+    Returns the rows of a table whose column is in values, in insertion order.
+    The values are bound as one JSON array parameter, so list length never hits SQLite's variable limit.
+    """
+    return query(
+        f'SELECT * FROM {resolve_table(table)} WHERE "{column}" IN (SELECT value FROM json_each(?)) ORDER BY {order_by}',
+        (json.dumps(list(values)),),
+        parse_dates=parse_dates,
+        dtypes=get_dtypes(table)
+    )
@@ -1,18 +1,16 @@
 # veris_data.py
 import pandas as pd
 from pathlib import Path 
+import memory
 
 base_path = Path(__file__).resolve().parent.parent
 
 # Initialize a variable to cache the loaded data
 cached_data = None
 
-def load_data():
-    """Load the VERIS data and cache it for reuse."""
-    
-    global cached_data
-    if cached_data is None:
-        cached_data = load_veris_data()  # Cache the processed data for future calls
+def build_cache():
+    """Load the VERIS data into its cached form without touching the module cache."""
+    return tuple(memory.compact_frame(df, 'veris') for df in load_veris_data())
 
 
 def load_veris_data():
@@ -42,41 +40,3 @@ def load_veris_data():
     veris_df_attribute.loc[:, 'capability_group'] = veris_df_attribute['capability_group'].str.replace('attribute.', '', regex=False)
 
     return veris_df_action, veris_df_attribute
-
-def extract_veris_data(ttps):
-    """Extract and process VERIS data based on provided TTPs."""
-    global cached_data
-    if cached_data is None:
-        cached_data = load_veris_data()
-
-    veris_df_action, veris_df_attribute = cached_data
-
-    # Filter veris data based on supplied TTPs
-    veris_df = veris_df_action.loc[veris_df_action['attack_object_id'].isin(ttps)].reset_index(drop=True)
-    veris_df_attribute = veris_df_attribute.loc[veris_df_attribute['attack_object_id'].isin(ttps)].reset_index(drop=True)
-
-    # Group by attack_object_id and calculate the average severity
-    average_severity = veris_df.groupby('attack_object_id')['severity'].mean().reset_index()
-
-    # Define severity categories
-    bins = [0, 4.0, 6.0, 7.5, 10.0]
-    labels = ['Low', 'Moderate', 'High', 'Critical']
-
-    # Rename columns for clarity
-    average_severity.columns = ['ttp', 'severity']
-
-    # Create a new column for severity levels
-    average_severity['severity_level'] = pd.cut(average_severity['severity'], bins=bins, labels=labels, right=True)
-
-    # Count occurrences of each severity level
-    severity_counts = average_severity['severity_level'].value_counts().reset_index();
-    severity_counts.columns = ['severity_level', 'count']
-
-    # order based on Low Moderate High critical
-    severity_order = pd.CategoricalDtype(['Low', 'Moderate', 'High', 'Critical'], ordered=True)
-    severity_counts['severity_level'] = severity_counts['severity_level'].astype(severity_order)
-
-    severity_counts = severity_counts.sort_values('severity_level', ignore_index=True)
-
-    # Return the processed data
-    return average_severity, severity_counts, veris_df_attribute.groupby('capability_group')['capability_id'].count().reset_index()